@@ -0,0 +1,263 @@
+# api.py
+# Async HTTP API (ASGI) for the planner and the chat/doctor flows.
+#
+#   uvicorn api:app --host 0.0.0.0 --port 8000 --workers 4
+#
+# Every request is self-contained: callers send the inputs (and, for the
+# doctor, the conversation context) they want answered, so any worker can
+# serve any request. Blocking work runs in Starlette's thread pool.
+import itertools
+import math
+import time
+
+from starlette.applications import Starlette
+from starlette.concurrency import iterate_in_threadpool, run_in_threadpool
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+
+from consultation import DOCTOR_MODEL, DOCTOR_TYPES
+from food_db import NUTRIENTS, foods
+from gemini_client import generate_text, get_model, stream_generate
+from instrumentation import registry, span
+from knowledge_base import retrieve
+from meal_catalog import DIETS, GOALS
+from meal_optimizer import ACTIVITY_FACTORS
+from planner import (build_health_report, bmi_status, calculate_bmi, current_week, generate_exercise_plan,
+                     generate_meal_plan, generate_target_meal_plan)
+from prompts import CHAT_MODEL, build_chat_prompt, build_doctor_prompt
+from response_cache import context_key, response_cache
+
+
+class BadRequest(Exception):
+    pass
+
+
+PLAN_MODES = ("Quick", "Calorie Target")
+STRESS_LEVELS = ("Low", "Medium", "High")
+SEXES = ("Prefer not to say", "Female", "Male")
+CHAT_ISSUES = ("None", "Diabetes", "PCOS", "Weight Loss", "Weight Gain", "Thyroid", "General Wellness")
+CHAT_DIETS = ("General",) + tuple(DIETS)  # the chat page sends "General" until a preference is set
+
+
+def _number(payload, name, default=None, positive=False):
+    value = payload.get(name, default)
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value):
+        raise BadRequest(f"'{name}' must be a number")
+    if positive and value <= 0:
+        raise BadRequest(f"'{name}' must be positive")
+    return value
+
+
+def _choice(payload, name, choices, default=None):
+    value = payload.get(name, default)
+    if not isinstance(value, str) or value not in choices:
+        raise BadRequest(f"'{name}' must be one of: {', '.join(choices)}")
+    return value
+
+
+def _sex(payload):
+    sex = payload.get("sex")
+    return None if sex is None else _choice(payload, "sex", SEXES)
+
+
+def _text(payload, name, default=None):
+    value = payload.get(name, default)
+    if not isinstance(value, str) or not value.strip():
+        raise BadRequest(f"'{name}' is required")
+    return value
+
+
+def endpoint(fn):
+    """Parse the JSON body, time the request and map bad input to 400, upstream failures to 502."""
+    async def handler(request):
+        with span("api", route=request.url.path) as s:
+            payload = dict(request.query_params)
+            if request.method == "POST":
+                try:
+                    payload = await request.json()
+                except ValueError:
+                    s.end(ok=False)
+                    return JSONResponse({"error": "body must be JSON"}, status_code=400)
+                if not isinstance(payload, dict):
+                    s.end(ok=False)
+                    return JSONResponse({"error": "body must be a JSON object"}, status_code=400)
+            try:
+                return await fn(payload)
+            except BadRequest as e:
+                s.end(ok=False)
+                return JSONResponse({"error": str(e)}, status_code=400)
+            except Exception as e:
+                s.end(ok=False)
+                return JSONResponse({"error": f"Error fetching Gemini response: {e}"}, status_code=502)
+    return handler
+
+
+_END = object()
+
+
+async def _stream_response(chunks, on_done=None, headers=None):
+    # Wait for the first chunk before answering, so an upstream failure
+    # still becomes a 502 instead of a 200 with a broken body
+    chunks = iter(chunks)
+    first = await run_in_threadpool(next, chunks, _END)
+    head = [] if first is _END else [first]
+
+    def run():
+        parts = []
+        for text in itertools.chain(head, chunks):
+            parts.append(text)
+            yield text
+        if on_done is not None:
+            on_done("".join(parts))
+    return StreamingResponse(iterate_in_threadpool(run()), media_type="text/plain; charset=utf-8",
+                             headers=headers)
+
+
+# -------------------------
+# Planner
+# -------------------------
+@endpoint
+async def bmi(payload):
+    value = calculate_bmi(_number(payload, "weight", positive=True), _number(payload, "height", positive=True))
+    status, note = bmi_status(value)
+    return JSONResponse({"bmi": value, "status": status, "note": note})
+
+
+def _plan_version(payload):
+    week = payload.get("week")
+    week = current_week() if week is None else int(_number(payload, "week"))
+    revision = int(_number(payload, "revision", 0))
+    if revision < 0:
+        raise BadRequest("'revision' must be 0 or more")
+    return week, revision
+
+
+async def _meal_plan(payload, week, revision):
+    preference, goal = _choice(payload, "meal_pref", DIETS), _choice(payload, "goal", GOALS)
+    result = {"week": week, "revision": revision}
+    if _choice(payload, "plan_mode", PLAN_MODES, "Quick") != "Calorie Target":
+        plan = await run_in_threadpool(generate_meal_plan, preference, goal, week, revision)
+        return JSONResponse(dict(result, meal_plan=plan))
+    plan, target, totals, on_target = await run_in_threadpool(
+        generate_target_meal_plan, preference, goal, _number(payload, "age", positive=True),
+        _number(payload, "weight", positive=True), _number(payload, "height", positive=True),
+        _choice(payload, "activity_level", ACTIVITY_FACTORS), _sex(payload), week, revision)
+    return JSONResponse(dict(result, meal_plan=plan, kcal_target=target, day_totals=totals,
+                             day_on_target=on_target, on_target=all(on_target)))
+
+
+@endpoint
+async def meal_plan(payload):
+    return await _meal_plan(payload, *_plan_version(payload))
+
+
+@endpoint
+async def regenerate_meal_plan(payload):
+    # Same profile and week, next revision: a different but still reproducible plan
+    week, revision = _plan_version(payload)
+    return await _meal_plan(payload, week, revision + 1)
+
+
+@endpoint
+async def exercise_plan(payload):
+    return JSONResponse({"exercises": generate_exercise_plan(_choice(payload, "activity_level", ACTIVITY_FACTORS))})
+
+
+@endpoint
+async def report(payload):
+    result = await run_in_threadpool(
+        build_health_report, _number(payload, "age", positive=True), _number(payload, "height", positive=True),
+        _number(payload, "weight", positive=True), _choice(payload, "activity_level", ACTIVITY_FACTORS),
+        _choice(payload, "meal_pref", DIETS), _choice(payload, "goal", GOALS),
+        _number(payload, "sleep_hours", 7, positive=True), _choice(payload, "stress_level", STRESS_LEVELS, "Medium"),
+        _choice(payload, "plan_mode", PLAN_MODES, "Quick"), _sex(payload), *_plan_version(payload))
+    return JSONResponse(result)
+
+
+@endpoint
+async def food_search(payload):
+    try:
+        limit = min(int(payload.get("limit", 5)), 20)
+    except (TypeError, ValueError):
+        raise BadRequest("'limit' must be an integer")
+    if limit < 1:
+        raise BadRequest("'limit' must be at least 1")
+    results = []
+    for i, score in foods.search(_text(payload, "q"), limit=limit):
+        values = (round(float(v), 1) for v in foods.values[i])
+        results.append(dict(zip(NUTRIENTS, values), name=foods.name[i], score=score))
+    return JSONResponse({"results": results})
+
+
+# -------------------------
+# Chat & doctors
+# -------------------------
+@endpoint
+async def chat(payload):
+    query = _text(payload, "query")
+    issue = _choice(payload, "issue", CHAT_ISSUES, "None")
+    meal_pref = _choice(payload, "meal_pref", CHAT_DIETS, "General")
+    goal = _choice(payload, "goal", GOALS, "Maintain")
+    activity_level = _choice(payload, "activity_level", ACTIVITY_FACTORS, "Moderately Active")
+    cache_context = context_key(issue, meal_pref, goal, activity_level)
+
+    # Both may block (shared cache tier, index load on first use)
+    cached = await run_in_threadpool(response_cache.get, query, cache_context)
+    if cached is not None:
+        if payload.get("stream"):
+            return PlainTextResponse(cached, headers={"X-NutriX-Cache": "hit"})
+        return JSONResponse({"answer": cached, "cached": True})
+
+    passages, retrieval_seconds = await run_in_threadpool(retrieve, query, issue)
+    retrieval_ms = round(retrieval_seconds * 1000, 2)
+    prompt = build_chat_prompt(query, issue, meal_pref, goal, activity_level, passages)
+    if payload.get("stream"):
+        return await _stream_response(stream_generate(get_model(CHAT_MODEL), prompt),
+                                      on_done=lambda answer: response_cache.put(query, cache_context, answer),
+                                      headers={"X-NutriX-Cache": "miss", "X-NutriX-Retrieval-Ms": str(retrieval_ms)})
+    start = time.perf_counter()
+    answer = await run_in_threadpool(generate_text, CHAT_MODEL, prompt)
+    await run_in_threadpool(response_cache.put, query, cache_context, answer)
+    return JSONResponse({"answer": answer, "cached": False, "retrieval_ms": retrieval_ms,
+                         "generation_ms": round((time.perf_counter() - start) * 1000, 2)})
+
+
+@endpoint
+async def doctor(payload):
+    doc_type = _text(payload, "doc_type")
+    if doc_type not in DOCTOR_TYPES:
+        raise BadRequest(f"'doc_type' must be one of {', '.join(DOCTOR_TYPES)}")
+    prompt = build_doctor_prompt(doc_type, _text(payload, "question"))
+    # The caller owns the conversation; it sends its token-budgeted context along
+    context = payload.get("context") or ""
+    if context:
+        prompt = f"{context}\n\n{prompt}"
+    if payload.get("stream"):
+        return await _stream_response(stream_generate(get_model(DOCTOR_MODEL), prompt))
+    answer = await run_in_threadpool(generate_text, DOCTOR_MODEL, prompt)
+    return JSONResponse({"answer": answer})
+
+
+# -------------------------
+# Ops
+# -------------------------
+async def healthz(request):
+    return JSONResponse({"ok": True})
+
+
+async def metrics(request):
+    return PlainTextResponse(registry.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+app = Starlette(routes=[
+    Route("/healthz", healthz),
+    Route("/metrics", metrics),
+    Route("/v1/bmi", bmi, methods=["POST"]),
+    Route("/v1/meal-plan", meal_plan, methods=["POST"]),
+    Route("/v1/meal-plan/regenerate", regenerate_meal_plan, methods=["POST"]),
+    Route("/v1/exercise-plan", exercise_plan, methods=["POST"]),
+    Route("/v1/report", report, methods=["POST"]),
+    Route("/v1/foods/search", food_search),
+    Route("/v1/chat", chat, methods=["POST"]),
+    Route("/v1/doctor", doctor, methods=["POST"]),
+])
@@ -0,0 +1,84 @@
+# api_client.py
+# Thin client for the NutriX HTTP API (api.py), used by the Streamlit app when NUTRIX_API_URL is set.
+import os
+import threading
+import time
+
+import requests
+
+API_URL = os.getenv("NUTRIX_API_URL", "").rstrip("/")
+TIMEOUT = float(os.getenv("NUTRIX_API_TIMEOUT", "120"))
+
+_local = threading.local()
+
+
+class ApiError(Exception):
+    pass
+
+
+def _session():
+    # One keep-alive session per thread (Streamlit runs each session's script in its own thread)
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = requests.Session()
+    return session
+
+
+def _post(path, payload, stream=False):
+    try:
+        resp = _session().post(f"{API_URL}{path}", json=payload, stream=stream, timeout=TIMEOUT)
+    except requests.RequestException as e:
+        raise ApiError(f"NutriX API unreachable: {e}") from e
+    if resp.status_code != 200:
+        try:
+            message = resp.json().get("error", resp.text)
+        except ValueError:
+            message = resp.text
+        raise ApiError(f"{resp.status_code}: {message}")
+    return resp
+
+
+def _stream(path, payload, stats):
+    # Same bookkeeping as gemini_client's streaming, measured at the client
+    stats.start()
+    resp = _post(path, dict(payload, stream=True), stream=True)
+    with resp:
+        for text in resp.iter_content(chunk_size=None, decode_unicode=True):
+            if not text:
+                continue
+            if stats.first_token_at is None:
+                stats.first_token_at = time.perf_counter()
+            stats.chunks += 1
+            stats.chars += len(text)
+            yield text
+    stats.finished_at = time.perf_counter()
+
+
+def health_report(age, height, weight, activity_level, meal_pref, goal,
+                  sleep_hours=7, stress_level="Medium", plan_mode="Quick", sex=None, week=None, revision=0):
+    return _post("/v1/report", {
+        "age": age, "height": height, "weight": weight, "activity_level": activity_level,
+        "meal_pref": meal_pref, "goal": goal, "sleep_hours": sleep_hours,
+        "stress_level": stress_level, "plan_mode": plan_mode, "sex": sex,
+        "week": week, "revision": revision,
+    }).json()
+
+
+def chat(query, issue, meal_pref, goal, activity_level):
+    """Returns (answer, served_from_cache)."""
+    body = _post("/v1/chat", {"query": query, "issue": issue, "meal_pref": meal_pref,
+                              "goal": goal, "activity_level": activity_level}).json()
+    return body["answer"], body["cached"]
+
+
+def chat_stream(query, issue, meal_pref, goal, activity_level, stats):
+    return _stream("/v1/chat", {"query": query, "issue": issue, "meal_pref": meal_pref,
+                                "goal": goal, "activity_level": activity_level}, stats)
+
+
+def doctor(doc_type, question, context=""):
+    return _post("/v1/doctor", {"doc_type": doc_type, "question": question, "context": context}).json()["answer"]
+
+
+def doctor_stream(doc_type, question, context, stats):
+    return _stream("/v1/doctor", {"doc_type": doc_type, "question": question, "context": context}, stats)
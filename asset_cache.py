@@ -0,0 +1,112 @@
+# asset_cache.py
+# Decode-once cache for the app's static images, stored pre-resized as compact encoded bytes.
+import hashlib
+import io
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+from PIL import Image
+
+from instrumentation import registry, span
+from shared_cache import shared_cache
+
+BASE_DIR = Path(__file__).parent
+
+
+class AssetCache:
+    """LRU cache of resized, re-encoded images bounded by total encoded bytes.
+
+    Entries are keyed by (path, width, file mtime) so an edited image is
+    picked up on the next request, plus the shared tier's "asset" generation
+    so an invalidation reaches this cache too. With ``shared`` set, local misses are
+    looked up there by content hash before decoding, so each image is decoded
+    once per deployment rather than once per replica.
+    """
+
+    def __init__(self, max_bytes=8 * 1024 * 1024, image_format="WEBP", quality=90, shared=None):
+        self.max_bytes = max_bytes
+        self.image_format = image_format
+        self.quality = quality
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> bytes
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _encode(self, path, width):
+        with span("image_decode"), Image.open(path) as img:
+            img.load()
+            if img.mode not in ("RGB", "RGBA"):
+                img = img.convert("RGBA" if "transparency" in img.info or img.mode in ("LA", "PA") else "RGB")
+            if width and img.width > width:
+                height = round(img.height * width / img.width)
+                img = img.resize((width, height), Image.LANCZOS)
+            buf = io.BytesIO()
+            img.save(buf, format=self.image_format, quality=self.quality, method=4)
+            return buf.getvalue()
+
+    def get(self, path, width=None):
+        """Return encoded bytes for ``path`` scaled down to ``width`` px (never upscaled)."""
+        path = Path(path)
+        if not path.is_absolute():
+            path = BASE_DIR / path
+        generation = self.shared.generation("asset") if self.shared is not None else 0
+        key = (str(path), width, os.stat(path).st_mtime_ns, generation)
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = self._load(path, width)
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = data
+                self._bytes += len(data)
+                while self._bytes > self.max_bytes and len(self._entries) > 1:
+                    _, old = self._entries.popitem(last=False)
+                    self._bytes -= len(old)
+                    self.evictions += 1
+        return data
+
+    def _load(self, path, width):
+        if self.shared is None:
+            return self._encode(path, width)
+        # Content hash, not path/mtime: checkouts on different nodes share entries
+        digest = hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+        shared_key = (digest, width, self.image_format, self.quality)
+        data = self.shared.get("asset", shared_key)
+        if data is None:
+            data = self._encode(path, width)
+            self.shared.set("asset", shared_key, data)
+        return data
+
+    def warm(self, items):
+        """Pre-load ``(path, width)`` pairs, skipping files that are missing."""
+        for path, width in items:
+            try:
+                self.get(path, width)
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+# One cache per process, shared by every Streamlit session.
+asset_cache = AssetCache(max_bytes=int(os.getenv("NUTRIX_ASSET_CACHE_BYTES", str(8 * 1024 * 1024))),
+                         shared=shared_cache if shared_cache.enabled else None)
+registry.register_collector("nutrix_asset_cache", asset_cache.stats)
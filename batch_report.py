@@ -0,0 +1,202 @@
+# batch_report.py
+# Headless bulk health reports: stream members from CSV/JSONL and write one report per row.
+#
+#   python batch_report.py members.csv -o reports.jsonl --workers 4
+#
+# Input columns: id (optional), age, height (cm), weight (kg), activity_level,
+# meal_pref, goal, sex (optional; only used with --plan-mode target).
+#
+# Rows that can't be reported on (missing or non-numeric fields, unknown
+# activity level, goal or preference, unparseable JSON) don't stop the batch:
+# they go to a rejects file (default <output>.rejects.jsonl) with their row
+# number and the reason, and the remaining rows are still processed.
+import argparse
+import csv
+import itertools
+import json
+import math
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import planner
+from meal_catalog import DIETS, GOALS
+from meal_optimizer import ACTIVITY_FACTORS
+
+OUTPUT_FIELDS = ["id", "bmi", "status", "meal_plan", "exercises", "kcal_target", "on_target"]
+REJECT_FIELDS = ["row", "error", "input"]
+NUMERIC_FIELDS = ("age", "height", "weight")
+SEXES = ("Prefer not to say", "Female", "Male")
+
+
+def read_rows(path):
+    """Yield input rows as dicts without loading the whole file (unparseable JSON lines as raw strings)."""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith((".jsonl", ".ndjson")):
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        yield line.rstrip("\n")
+        else:
+            yield from csv.DictReader(f)
+
+
+def row_error(row, plan_mode="quick"):
+    """Why ``row`` can't be reported on, or None if it is valid."""
+    if not isinstance(row, dict):
+        return "not a JSON object"
+    for name in NUMERIC_FIELDS:
+        try:
+            value = float(row.get(name))
+        except (TypeError, ValueError):
+            return f"'{name}' must be a number"
+        if not math.isfinite(value) or value <= 0:
+            return f"'{name}' must be positive"
+    for name, choices in (("activity_level", ACTIVITY_FACTORS), ("meal_pref", DIETS), ("goal", GOALS)):
+        if row.get(name) not in choices:
+            return f"'{name}' must be one of: {', '.join(choices)}"
+    if plan_mode == "target" and row.get("sex") and row["sex"] not in SEXES:
+        return f"'sex' must be one of: {', '.join(SEXES)}"
+    return None
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def plans_for(rows, plan_mode="quick", seed=None):
+    if seed is not None:
+        planner.seed_plans(seed)
+    out = []
+    for row in rows:
+        kcal_target = on_target = None
+        if plan_mode == "target":
+            meal_plan, kcal_target, _, days = planner.generate_target_meal_plan(
+                row["meal_pref"], row["goal"], float(row["age"]), float(row["weight"]),
+                float(row["height"]), row["activity_level"], row.get("sex") or None)
+            on_target = all(days)
+        else:
+            meal_plan = planner.generate_meal_plan(row["meal_pref"], row["goal"])
+        out.append((meal_plan, planner.generate_exercise_plan(row["activity_level"]), kcal_target, on_target))
+    return out
+
+
+def build_reports(chunk, pool, plan_mode, sub_batch, seed=None, indexes=None):
+    # ``indexes``: input row numbers of ``chunk`` (the default id of rows without one)
+    weights = np.array([float(r["weight"]) for r in chunk])
+    heights = np.array([float(r["height"]) for r in chunk])
+    bmis = planner.calculate_bmi_many(weights, heights)
+    categories = planner.classify_bmi_many(bmis)
+
+    batches = [chunk[i:i + sub_batch] for i in range(0, len(chunk), sub_batch)]
+    if pool is None:
+        plans = [plans_for(b, plan_mode, seed) for b in batches]
+    else:
+        plans = pool.map(plans_for, batches, [plan_mode] * len(batches), [seed] * len(batches))
+    plans = [p for batch in plans for p in batch]
+
+    indexes = range(len(chunk)) if indexes is None else indexes
+    for i, row, bmi, cat, plan in zip(indexes, chunk, bmis, categories, plans):
+        meal_plan, exercises, kcal_target, on_target = plan
+        yield {
+            "id": row.get("id", i),
+            "bmi": float(bmi),
+            "status": planner.BMI_CATEGORIES[cat][1],
+            "meal_plan": meal_plan,
+            "exercises": exercises,
+            "kcal_target": kcal_target,
+            "on_target": on_target,
+        }
+
+
+class ReportWriter:
+    def __init__(self, path, fields=OUTPUT_FIELDS):
+        self.path = path
+        self.f = open(path, "w", newline="", encoding="utf-8")
+        self.csv = None
+        if not path.endswith((".jsonl", ".ndjson")):
+            self.csv = csv.DictWriter(self.f, fieldnames=fields)
+            self.csv.writeheader()
+
+    def write(self, report):
+        if self.csv is None:
+            self.f.write(json.dumps(report, ensure_ascii=False) + "\n")
+        else:
+            self.csv.writerow({k: json.dumps(v, ensure_ascii=False) if isinstance(v, (list, dict)) else v
+                               for k, v in report.items()})
+
+    def close(self):
+        self.f.close()
+
+
+def default_rejects_path(output_path):
+    return os.path.splitext(output_path)[0] + ".rejects.jsonl"
+
+
+def run(input_path, output_path, workers=None, chunk_size=2000, sub_batch=250, plan_mode="quick", seed=None,
+        rejects_path=None):
+    """Process ``input_path`` into ``output_path``; returns (reports, rejected rows, seconds)."""
+    workers = os.cpu_count() if workers is None else workers
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    # Plans are seeded per profile and week, so output never depends on scheduling
+    writer = ReportWriter(output_path)
+    rejects = ReportWriter(rejects_path or default_rejects_path(output_path), REJECT_FIELDS)
+    reports = rejected = 0
+    start = time.perf_counter()
+    try:
+        for chunk in chunked(enumerate(read_rows(input_path)), chunk_size):
+            indexes, valid = [], []
+            for index, row in chunk:
+                error = row_error(row, plan_mode)
+                if error is None:
+                    indexes.append(index)
+                    valid.append(row)
+                else:
+                    rejects.write({"row": index, "error": error, "input": row})
+                    rejected += 1
+            if valid:
+                for report in build_reports(valid, pool, plan_mode, sub_batch, seed, indexes):
+                    writer.write(report)
+                reports += len(valid)
+    finally:
+        writer.close()
+        rejects.close()
+        if pool is not None:
+            pool.shutdown()
+    return reports, rejected, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate NutriX health reports for a CSV/JSONL cohort.")
+    parser.add_argument("input", help="members .csv or .jsonl")
+    parser.add_argument("-o", "--output", required=True, help="reports .jsonl or .csv")
+    parser.add_argument("--workers", type=int, default=None, help="plan worker processes (default: CPU count, 1 = in-process)")
+    parser.add_argument("--chunk-size", type=int, default=2000, help="rows read and vectorized at a time")
+    parser.add_argument("--sub-batch", type=int, default=250, help="rows per worker task")
+    parser.add_argument("--plan-mode", choices=["quick", "target"], default="quick")
+    parser.add_argument("--seed", type=int, default=None, help="salt for the per-profile plan seeds")
+    parser.add_argument("--rejects", default=None,
+                        help="invalid rows with the reason (.jsonl or .csv; default: <output>.rejects.jsonl)")
+    args = parser.parse_args(argv)
+
+    rejects_path = args.rejects or default_rejects_path(args.output)
+    rows, rejected, seconds = run(args.input, args.output, args.workers, args.chunk_size, args.sub_batch,
+                                  args.plan_mode, args.seed, rejects_path)
+    rate = rows / seconds if seconds else float("inf")
+    print(f"{rows} rows in {seconds:.2f}s ({rate:,.0f} rows/s)", file=sys.stderr)
+    if rejected:
+        print(f"{rejected} invalid rows skipped; see {rejects_path}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
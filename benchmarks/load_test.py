@@ -0,0 +1,196 @@
+# benchmarks/load_test.py
+# Closed-loop load test for the NutriX HTTP API: N concurrent clients for a fixed duration.
+#
+#   python benchmarks/load_test.py                          # spawn `uvicorn api:app` (fake Gemini) and test it
+#   python benchmarks/load_test.py --workers 4 -c 64        # 4 server processes, 64 clients
+#   python benchmarks/load_test.py --url http://host:8000   # test an already running server
+#   python benchmarks/load_test.py --scale 1 2 4 --shared-cache sqlite:///data/cache.db
+#                                                           # throughput as workers are added
+#
+# Each client keeps one keep-alive connection and sends its next request as
+# soon as the previous answer arrives, so requests/s is measured at a fixed
+# concurrency. Chat questions are unique by default so they miss the cache;
+# --question-pool N draws them from N distinct questions instead, which shows
+# how much a shared cache tier saves when workers would otherwise each miss.
+import argparse
+import itertools
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+
+import numpy as np
+import requests
+
+ROOT = Path(__file__).resolve().parent.parent
+
+ACTIVITY_LEVELS = ["Sedentary", "Lightly Active", "Moderately Active", "Active", "Very Active"]
+DIETS = ["Vegan", "Vegetarian", "Non-Veg", "Eggetarian"]
+GOALS = ["Weight Loss", "Weight Gain", "Maintain"]
+DOCTORS = ["Homeopathic", "Ayurvedic", "Allopathic"]
+
+
+def _payloads(scenario, unique, question_pool=0):
+    counter = itertools.count()
+
+    def bmi():
+        n = next(counter)
+        return "/v1/bmi", {"weight": 50 + n % 60, "height": 150 + n % 50}
+
+    def report():
+        n = next(counter)
+        return "/v1/report", {"age": 30, "height": 170, "weight": 70,
+                              "activity_level": ACTIVITY_LEVELS[n % 5], "meal_pref": DIETS[n % 4],
+                              "goal": GOALS[n % 3], "plan_mode": "Calorie Target" if n % 2 else "Quick"}
+
+    def chat():
+        n = next(counter)
+        if question_pool:
+            query = f"what should I eat before a run {n % question_pool}"
+        else:
+            query = f"what should I eat before a run {n if unique else ''}".strip()
+        return "/v1/chat", {"query": query, "issue": "None", "meal_pref": DIETS[n % 4], "goal": GOALS[n % 3]}
+
+    def doctor():
+        n = next(counter)
+        return "/v1/doctor", {"doc_type": DOCTORS[n % 3], "question": f"I have a mild headache ({n})"}
+
+    scenarios = {"bmi": [bmi], "report": [report], "chat": [chat], "doctor": [doctor],
+                 "mix": [bmi, report, report, chat, doctor]}
+    makers = itertools.cycle(scenarios[scenario])
+    lock = threading.Lock()
+
+    def next_request():
+        with lock:
+            return next(makers)()
+    return next_request
+
+
+def _client(url, next_request, deadline, latencies, statuses, lock):
+    session = requests.Session()
+    local_lat, local_status = [], Counter()
+    while time.perf_counter() < deadline:
+        path, payload = next_request()
+        t = time.perf_counter()
+        try:
+            status = session.post(url + path, json=payload, timeout=120).status_code
+        except requests.RequestException:
+            status = "conn_error"
+        local_lat.append(time.perf_counter() - t)
+        local_status[status] += 1
+    with lock:
+        latencies.extend(local_lat)
+        statuses.update(local_status)
+
+
+def run(url, scenario, concurrency, duration, unique=True, question_pool=0):
+    next_request = _payloads(scenario, unique, question_pool)
+    latencies, statuses, lock = [], Counter(), threading.Lock()
+    start = time.perf_counter()
+    deadline = start + duration
+    threads = [threading.Thread(target=_client, args=(url, next_request, deadline, latencies, statuses, lock))
+               for _ in range(concurrency)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    wall = time.perf_counter() - start
+    lat = np.array(latencies) * 1000
+    p50, p95, p99 = np.percentile(lat, [50, 95, 99]) if lat.size else (0.0, 0.0, 0.0)
+    return {
+        "scenario": scenario,
+        "concurrency": concurrency,
+        "requests": int(lat.size),
+        "requests_per_s": round(lat.size / wall, 1),
+        "p50_ms": round(float(p50), 1),
+        "p95_ms": round(float(p95), 1),
+        "p99_ms": round(float(p99), 1),
+        "errors": sum(n for status, n in statuses.items() if status != 200),
+        "statuses": {str(k): v for k, v in statuses.items()},
+    }
+
+
+def _free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(workers, model_latency, shared_cache=None):
+    """Spawn uvicorn against the fake model with the Gemini rate limit lifted."""
+    port = _free_port()
+    env = dict(os.environ, NUTRIX_FAKE_GEMINI="1", NUTRIX_GEMINI_RPS="1000000",
+               NUTRIX_GEMINI_BURST="1000000", NUTRIX_FAKE_LATENCY=str(model_latency))
+    if shared_cache:
+        env["NUTRIX_SHARED_CACHE"] = shared_cache
+    proc = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(port),
+                             "--workers", str(workers), "--log-level", "warning"],
+                            cwd=ROOT, env=env)
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(200):
+        try:
+            if requests.get(url + "/healthz", timeout=1).ok:
+                return proc, url
+        except requests.RequestException:
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("API server did not start")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load-test the NutriX HTTP API.")
+    parser.add_argument("--url", help="test a running server instead of spawning one")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn worker processes when spawning")
+    parser.add_argument("--scale", type=int, nargs="+", metavar="N",
+                        help="spawn a fresh server per worker count and compare throughput")
+    parser.add_argument("--shared-cache", help="NUTRIX_SHARED_CACHE for spawned servers (e.g. sqlite:///data/cache.db)")
+    parser.add_argument("-c", "--concurrency", type=int, default=32)
+    parser.add_argument("-d", "--duration", type=float, default=10.0, help="seconds per scenario")
+    parser.add_argument("--scenario", nargs="*", default=["bmi", "report", "chat", "doctor", "mix"],
+                        choices=["bmi", "report", "chat", "doctor", "mix"])
+    parser.add_argument("--model-latency", type=float, default=0.3, help="fake Gemini first-token delay (s)")
+    parser.add_argument("--repeat-questions", action="store_true", help="reuse chat questions (cache hits)")
+    parser.add_argument("--question-pool", type=int, default=0, help="draw chat questions from N distinct ones")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    if args.scale and args.url:
+        parser.error("--scale spawns its own servers; it can't be combined with --url")
+    steps = args.scale or [args.workers]
+    results = []
+    print(f"{'workers':>7} {'scenario':<10} {'conc':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} "
+          f"{'errors':>7}")
+    for workers in steps:
+        proc, url = ((None, args.url.rstrip("/")) if args.url
+                     else start_server(workers, args.model_latency, args.shared_cache))
+        try:
+            for scenario in args.scenario:
+                r = run(url, scenario, args.concurrency, args.duration, unique=not args.repeat_questions,
+                        question_pool=args.question_pool)
+                r["workers"] = workers
+                results.append(r)
+                print(f"{workers:>7} {scenario:<10} {r['concurrency']:>5} {r['requests_per_s']:>9.1f} "
+                      f"{r['p50_ms']:>9.1f} {r['p95_ms']:>9.1f} {r['p99_ms']:>9.1f} {r['errors']:>7}")
+        finally:
+            if proc is not None:
+                proc.terminate()
+                proc.wait()
+    if len(steps) > 1:
+        # Throughput relative to the first step, per scenario
+        base = {r["scenario"]: r["requests_per_s"] for r in results if r["workers"] == steps[0]}
+        for r in results:
+            r["speedup"] = round(r["requests_per_s"] / base[r["scenario"]], 2) if base[r["scenario"]] else None
+        print("speedup vs", steps[0], "worker(s):",
+              ", ".join(f"{r['scenario']}@{r['workers']}={r['speedup']}x" for r in results if r["workers"] != steps[0]))
+    if args.json:
+        Path(args.json).write_text(json.dumps({"url": args.url, "workers": steps, "shared_cache": args.shared_cache,
+                                               "cpus": os.cpu_count(), "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
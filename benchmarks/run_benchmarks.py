@@ -0,0 +1,303 @@
+# benchmarks/run_benchmarks.py
+# Offline benchmarks for the planner and chat hot paths (no network; Gemini is mocked).
+#
+#   python benchmarks/run_benchmarks.py                       # print results
+#   python benchmarks/run_benchmarks.py --save base.json      # save a baseline
+#   python benchmarks/run_benchmarks.py --compare base.json   # diff against it
+#
+# Each benchmark reports p50/p95/p99 latency, throughput and the peak traced
+# memory of a separate tracemalloc pass, so tracing doesn't skew the timings.
+# Very fast calls are timed in batches; their percentiles are per-call batch means.
+import argparse
+import atexit
+import itertools
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# Mock Gemini and lift the gateway's rate limit before the app modules are imported
+os.environ["NUTRIX_FAKE_GEMINI"] = "1"
+os.environ.setdefault("NUTRIX_GEMINI_RPS", "1000000")
+os.environ.setdefault("NUTRIX_GEMINI_BURST", "1000000")
+
+import numpy as np  # noqa: E402
+
+import gemini_client  # noqa: E402
+import planner  # noqa: E402
+from meal_catalog import catalog, GOALS, MEALS, DIETS  # noqa: E402
+from knowledge_base import get_index  # noqa: E402
+from progress_log import ProgressLog, progress_summary, synthetic_history, write_entries  # noqa: E402
+from prompts import CHAT_MODEL, build_chat_prompt  # noqa: E402
+from response_cache import ResponseCache, context_key  # noqa: E402
+
+ACTIVITY_LEVELS = ["Sedentary", "Lightly Active", "Moderately Active", "Active", "Very Active"]
+ISSUES = ["None", "Diabetes", "PCOS", "Weight Loss", "Weight Gain", "Thyroid", "General Wellness"]
+
+
+def _cycle(items):
+    it = itertools.cycle(items)
+    return lambda: next(it)
+
+
+def _clear_plan_caches():
+    for fn in (planner._quick_pool_plan, planner._target_pool_plan, planner._target_plan):
+        fn.cache_clear()
+
+
+def _plan_inputs(cached, combos):
+    """Cycle ``combos``; for misses, also empty the plan memos and move to a new revision every call.
+
+    Misses measure what a new profile costs (plan-table lookup when
+    data/plan_tables.npz is built, live generation otherwise); hits measure
+    the memoized path.
+    """
+    combos = _cycle(combos)
+    revisions = itertools.count()
+
+    def next_inputs():
+        if cached:
+            return combos(), 0
+        _clear_plan_caches()
+        return combos(), next(revisions)
+    return next_inputs
+
+
+def bench_meal_plan(cached):
+    inputs = _plan_inputs(cached, list(itertools.product(DIETS, GOALS)))
+
+    def run():
+        (diet, goal), revision = inputs()
+        return planner.generate_meal_plan(diet, goal, 202601, revision)
+    return run
+
+
+def bench_meal_slots():
+    # All 48 goal x meal slot x preference lookups
+    rng = np.random.default_rng(0)
+    combos = _cycle(list(itertools.product(GOALS, MEALS, DIETS)))
+
+    def run():
+        ids = catalog.rows_for(*combos())
+        return catalog.label[ids[rng.integers(0, len(ids), size=7)]]
+    return run
+
+
+def bench_target_plan(cached):
+    inputs = _plan_inputs(cached, list(itertools.product(DIETS, GOALS, ACTIVITY_LEVELS)))
+
+    def run():
+        (diet, goal, level), revision = inputs()
+        return planner.generate_target_meal_plan(diet, goal, 30, 70, 170, level, week=202601, revision=revision)
+    return run
+
+
+def bench_exercise_plan():
+    levels = _cycle(ACTIVITY_LEVELS)
+    return lambda: planner.generate_exercise_plan(levels())
+
+
+def bench_bmi():
+    rng = np.random.default_rng(0)
+    pairs = _cycle(list(zip(rng.integers(30, 200, 1000).tolist(), rng.integers(120, 220, 1000).tolist())))
+    return lambda: planner.calculate_bmi(*pairs())
+
+
+def bench_report(cached):
+    inputs = _plan_inputs(cached, list(itertools.product(ACTIVITY_LEVELS, DIETS, GOALS)))
+
+    def run():
+        (level, diet, goal), revision = inputs()
+        return planner.build_health_report(30, 170, 70, level, diet, goal, week=202601, revision=revision)
+    return run
+
+
+def bench_retrieval():
+    index = get_index()
+    queries = _cycle(list(itertools.product(
+        ["what snacks are safe", "how much protein do I need", "can I drink juice", "is rice ok at night"],
+        ISSUES)))
+
+    def run():
+        query, issue = queries()
+        return index.search(query, issue, k=3)
+    return run
+
+
+def bench_progress():
+    """Load and analyze a five-year daily progress log."""
+    root = tempfile.mkdtemp(prefix="nutrix-progress-")
+    atexit.register(shutil.rmtree, root, True)
+    log = ProgressLog("0" * 32, root=root)
+    write_entries(log, synthetic_history(5 * 365))
+
+    def run():
+        return progress_summary(log.load(), goal_weight=70.0)
+    return run
+
+
+def bench_chat(model_latency, cache_hits):
+    """Prompt build + cache lookup + mocked model call through the gateway."""
+    gemini_client.model_pool = gemini_client.ModelPool(
+        factory=lambda name, cfg: gemini_client.FakeModel(name, first_token_delay=model_latency, chunk_delay=0))
+    cache = ResponseCache(max_entries=1024)
+    counter = itertools.count()
+    issues = _cycle(ISSUES)
+
+    def run():
+        n = next(counter)
+        query = "what should I eat for breakfast" if cache_hits else f"what should I eat for breakfast {n}"
+        issue = "Diabetes" if cache_hits else issues()
+        ctx = context_key(issue, "Vegan", "Maintain", "Moderately Active")
+        answer = cache.get(query, ctx)
+        if answer is None:
+            prompt = build_chat_prompt(query, issue, "Vegan", "Maintain", "Moderately Active")
+            answer = gemini_client.generate_text(CHAT_MODEL, prompt)
+            cache.put(query, ctx, answer)
+        return answer
+    return run
+
+
+def _batch_size(fn, min_sample=50e-6):
+    # Time sub-microsecond calls in batches so timer overhead doesn't dominate
+    batch = 1
+    while True:
+        t = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        if time.perf_counter() - t >= min_sample or batch >= 1024:
+            return batch
+        batch *= 2
+
+
+def measure(make_fn, iterations, warmup, memory_iterations):
+    fn = make_fn()
+    for _ in range(warmup):
+        fn()
+    batch = _batch_size(fn)
+    samples = max(1, iterations // batch)
+    times = np.empty(samples)
+    start = time.perf_counter()
+    for i in range(samples):
+        t = time.perf_counter()
+        for _ in range(batch):
+            fn()
+        times[i] = (time.perf_counter() - t) / batch
+    wall = time.perf_counter() - start
+
+    fn = make_fn()
+    tracemalloc.start()
+    for _ in range(memory_iterations):
+        fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(times, [50, 95, 99]) * 1e6
+    return {
+        "iterations": samples * batch,
+        "batch": batch,
+        "p50_us": round(float(p50), 2),
+        "p95_us": round(float(p95), 2),
+        "p99_us": round(float(p99), 2),
+        "mean_us": round(float(times.mean() * 1e6), 2),
+        "throughput_per_s": round(samples * batch / wall, 1),
+        "peak_mem_kb": round(peak / 1024, 1),
+    }
+
+
+def benchmarks(args):
+    return {
+        "generate_meal_plan_miss": (lambda: bench_meal_plan(False), args.iterations),
+        "generate_meal_plan_hit": (lambda: bench_meal_plan(True), args.iterations),
+        "meal_slot_lookup": (bench_meal_slots, args.iterations),
+        "generate_target_meal_plan_miss": (lambda: bench_target_plan(False), max(1, args.iterations // 20)),
+        "generate_target_meal_plan_hit": (lambda: bench_target_plan(True), args.iterations),
+        "generate_exercise_plan": (bench_exercise_plan, args.iterations),
+        "calculate_bmi": (bench_bmi, args.iterations),
+        "build_health_report_miss": (lambda: bench_report(False), args.iterations),
+        "build_health_report_hit": (lambda: bench_report(True), args.iterations),
+        "knowledge_retrieval": (bench_retrieval, args.iterations),
+        "progress_5y": (bench_progress, args.iterations),
+        "chat_uncached": (lambda: bench_chat(args.model_latency, False), args.chat_iterations),
+        "chat_cached": (lambda: bench_chat(args.model_latency, True), args.iterations),
+    }
+
+
+def environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                                capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "processor": platform.processor() or platform.machine(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print p50/p95 deltas vs. a saved baseline; returns names that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<28} {'p50 Δ':>9} {'p95 Δ':>9}")
+    for name, result in results.items():
+        base = baseline["results"].get(name)
+        if not base:
+            continue
+        d50 = result["p50_us"] / base["p50_us"] - 1 if base["p50_us"] else 0.0
+        d95 = result["p95_us"] / base["p95_us"] - 1 if base["p95_us"] else 0.0
+        flag = "  REGRESSION" if d50 > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:<28} {d50:+9.1%} {d95:+9.1%}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline NutriX benchmarks.")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--chat-iterations", type=int, default=50)
+    parser.add_argument("--model-latency", type=float, default=0.05, help="mocked Gemini latency in seconds")
+    parser.add_argument("--only", nargs="*", help="run only these benchmarks")
+    parser.add_argument("--save", help="write results as a JSON baseline")
+    parser.add_argument("--compare", help="compare against a JSON baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="p50 slowdown flagged as a regression")
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f"{'benchmark':<28} {'p50 µs':>10} {'p95 µs':>10} {'p99 µs':>10} {'ops/s':>10} {'peak KB':>9}")
+    for name, (make_fn, iterations) in benchmarks(args).items():
+        if args.only and name not in args.only:
+            continue
+        r = measure(make_fn, iterations, warmup=min(50, iterations), memory_iterations=min(200, iterations))
+        results[name] = r
+        print(f"{name:<28} {r['p50_us']:10.1f} {r['p95_us']:10.1f} {r['p99_us']:10.1f} "
+              f"{r['throughput_per_s']:10.0f} {r['peak_mem_kb']:9.1f}")
+    max_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    print(f"\nprocess max RSS: {max_rss_kb / 1024:.1f} MB")
+
+    report = {"environment": environment(), "max_rss_kb": max_rss_kb, "results": results}
+    if args.save:
+        Path(args.save).parent.mkdir(parents=True, exist_ok=True)
+        Path(args.save).write_text(json.dumps(report, indent=2))
+    if args.compare:
+        baseline = json.loads(Path(args.compare).read_text())
+        if compare(results, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
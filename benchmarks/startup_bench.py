@@ -0,0 +1,97 @@
+# benchmarks/startup_bench.py
+# Cold-start and per-rerun latency of the Streamlit app, page by page.
+#
+#   python benchmarks/startup_bench.py [--reruns 5] [--json out.json]
+#
+# * import: `python -X importtime` cumulative time for the app's own modules and
+#   whether google.generativeai gets imported with them.
+# * cold: first script run of each page in a fresh interpreter (AppTest).
+# * rerun: median of the following reruns of the same page.
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = ["Home", "Health Planner", "NutriX Chat", "Doctors", "Help & Contact"]
+APP_MODULES = ["gemini_client", "planner", "response_cache", "chat_history", "asset_cache", "report_jobs"]
+
+
+def import_times(modules):
+    """Cumulative import time (ms) per module, parsed from -X importtime output."""
+    code = "; ".join(f"import {m}" for m in modules)
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT,
+                          capture_output=True, text=True, env={**os.environ, "PYTHONPATH": str(ROOT)})
+    if proc.returncode:
+        raise RuntimeError(proc.stderr[-2000:])
+    cumulative = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cum, name = line[len("import time:"):].split("|")
+        if not cum.strip().isdigit():
+            continue  # header line
+        cumulative[name.strip()] = int(cum) / 1000
+    return {
+        "modules_ms": {m: cumulative.get(m) for m in modules},
+        "genai_imported": "google.generativeai" in cumulative,
+        "genai_ms": cumulative.get("google.generativeai"),
+    }
+
+
+_PAGE_SCRIPT = """
+import json, sys, time
+from streamlit.testing.v1 import AppTest
+page, reruns = sys.argv[1], int(sys.argv[2])
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.session_state["main_navigation"] = page
+t = time.perf_counter(); at.run(); cold = time.perf_counter() - t
+times = []
+for _ in range(reruns):
+    t = time.perf_counter(); at.run(); times.append(time.perf_counter() - t)
+print(json.dumps({{"cold_ms": cold * 1000, "rerun_ms": [x * 1000 for x in times],
+                  "genai_loaded": "google.generativeai" in sys.modules,
+                  "errors": [str(e.value) for e in at.exception]}}))
+"""
+
+
+def page_times(page, reruns):
+    script = _PAGE_SCRIPT.format(app=str(ROOT / "app.py"))
+    proc = subprocess.run([sys.executable, "-c", script, page, str(reruns)], cwd=ROOT,
+                          capture_output=True, text=True, env={**os.environ, "PYTHONPATH": str(ROOT)})
+    if proc.returncode:
+        raise RuntimeError(proc.stderr[-2000:])
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["rerun_median_ms"] = statistics.median(result["rerun_ms"]) if result["rerun_ms"] else None
+    return result
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure app import, cold-start and rerun latency per page.")
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--json", help="also write results to this file")
+    args = parser.parse_args(argv)
+
+    report = {"import": import_times(APP_MODULES), "pages": {}}
+    imp = report["import"]
+    print("module imports (cumulative ms):")
+    for module, ms in imp["modules_ms"].items():
+        print(f"  {module:<16} {ms:8.1f}" if ms is not None else f"  {module:<16} {'-':>8}")
+    print(f"  google.generativeai imported: {imp['genai_imported']} ({imp['genai_ms'] or 0:.0f} ms)")
+
+    print(f"\n{'page':<16} {'cold ms':>9} {'rerun ms':>9}  genai loaded")
+    for page in PAGES:
+        result = page_times(page, args.reruns)
+        report["pages"][page] = result
+        print(f"{page:<16} {result['cold_ms']:9.0f} {result['rerun_median_ms']:9.1f}  {result['genai_loaded']}"
+              + (f"  ERRORS: {result['errors']}" if result["errors"] else ""))
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+# benchmarks/stub_gemini_server.py
+# Local stand-in for the Gemini REST API, for exercising the gateway and load tests offline.
+#
+#   python benchmarks/stub_gemini_server.py --port 8089 --latency 0.5 --error-rate 0.2
+#   GEMINI_API_ENDPOINT=http://127.0.0.1:8089 GEMINI_API_KEY=stub streamlit run app.py
+#
+# Serves :generateContent and :streamGenerateContent for any model. A share of
+# requests (--error-rate) is answered with HTTP 429 to exercise retries.
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _candidate(text):
+    return {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]},
+                            "finishReason": "STOP", "index": 0}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    latency = 0.2
+    error_rate = 0.0
+    chunks = 8
+    counts = {"requests": 0, "rate_limited": 0}
+    lock = threading.Lock()
+
+    def log_message(self, fmt, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _question(self, request):
+        texts = [part["text"] for content in request.get("contents", [])
+                 for part in content.get("parts", []) if "text" in part]
+        lines = texts[-1].strip().splitlines() if texts else []
+        return lines[-1].strip() if lines else ""
+
+    def do_GET(self):
+        if self.path.startswith("/stats"):
+            with self.lock:
+                self._send_json(200, dict(self.counts))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "not found"}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        request = json.loads(self.rfile.read(length) or b"{}")
+        with self.lock:
+            self.counts["requests"] += 1
+            limited = random.random() < self.error_rate
+            if limited:
+                self.counts["rate_limited"] += 1
+        if limited:
+            self._send_json(429, {"error": {"code": 429, "message": "Resource has been exhausted (stub)",
+                                            "status": "RESOURCE_EXHAUSTED"}})
+            return
+
+        answer = (f"(stub answer) You asked: {self._question(request)[:200]}. "
+                  "Eat a balanced plate of vegetables, protein and whole grains.")
+        if ":streamGenerateContent" in self.path:
+            self._stream(answer)
+        elif ":generateContent" in self.path:
+            time.sleep(self.latency)
+            self._send_json(200, _candidate(answer))
+        else:
+            self._send_json(404, {"error": {"code": 404, "message": "not found"}})
+
+    def _stream(self, answer):
+        # The REST transport reads streamed responses as one JSON array
+        size = max(1, -(-len(answer) // self.chunks))
+        pieces = [answer[i:i + size] for i in range(0, len(answer), size)]
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        def write(data):
+            data = data.encode()
+            self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            self.wfile.flush()
+
+        write("[")
+        for i, piece in enumerate(pieces):
+            time.sleep(self.latency / len(pieces))
+            write(("," if i else "") + json.dumps(_candidate(piece)))
+        write("]")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+def serve(port=8089, latency=0.2, error_rate=0.0, chunks=8):
+    StubHandler.latency = latency
+    StubHandler.error_rate = error_rate
+    StubHandler.chunks = chunks
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local Gemini REST stub.")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per answer")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered with 429")
+    parser.add_argument("--chunks", type=int, default=8, help="pieces per streamed answer")
+    args = parser.parse_args(argv)
+    server = serve(args.port, args.latency, args.error_rate, args.chunks)
+    print(f"Gemini stub listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+# chat_history.py
+# Bounded chat history: recent turns verbatim, older turns folded into a rolling summary.
+import re
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+MAX_TURNS = 200  # turns kept per conversation (session stores trim to the same bound)
+
+
+def estimate_tokens(text):
+    # ~4 characters per token for English text; good enough for budgeting
+    return max(1, len(text) // 4) if text else 0
+
+
+def extractive_summary(summary, turns, max_tokens=300):
+    """Default summarizer: first sentence of each turn appended to the old summary, tail-trimmed."""
+    lines = [summary] if summary else []
+    for speaker, text in turns:
+        first = _SENTENCE_RE.split(text.strip(), maxsplit=1)[0]
+        lines.append(f"{speaker}: {first[:200]}")
+    merged = "\n".join(lines)
+    max_chars = max_tokens * 4
+    return merged[-max_chars:] if len(merged) > max_chars else merged
+
+
+class ChatHistory:
+    """Chat turns for one conversation, with a token budget for the model context.
+
+    ``turns`` keeps at most ``max_turns`` (speaker, text) pairs for display.
+    ``context()`` returns the rolling summary plus the newest turns that fit in
+    ``token_budget``; whenever the verbatim part grows past the budget the
+    oldest turns are folded into the summary with ``summarize_fn``.
+    ``on_append(speaker, text)``, if set, is called for every new turn
+    (session_store uses it to persist turns as they happen).
+    """
+
+    def __init__(self, token_budget=1500, summary_tokens=300, max_turns=MAX_TURNS, summarize_fn=extractive_summary):
+        self.token_budget = token_budget
+        self.summary_tokens = summary_tokens
+        self.max_turns = max_turns
+        self.summarize_fn = summarize_fn
+        self.turns = []
+        self.summary = ""
+        self._verbatim_start = 0  # index of the first turn not yet folded into the summary
+        self._verbatim_tokens = 0
+        self.prompt_tokens = []   # estimated prompt tokens sent per model call
+        self.on_append = None
+
+    def __len__(self):
+        return len(self.turns)
+
+    def __iter__(self):
+        return iter(self.turns)
+
+    def append(self, speaker, text):
+        self.turns.append((speaker, text))
+        if self.on_append is not None:
+            self.on_append(speaker, text)
+        self._verbatim_tokens += estimate_tokens(text)
+        self._compact()
+        if len(self.turns) > self.max_turns:
+            drop = len(self.turns) - self.max_turns
+            for _, text in self.turns[self._verbatim_start:drop]:
+                self._verbatim_tokens -= estimate_tokens(text)
+            del self.turns[:drop]
+            self._verbatim_start = max(0, self._verbatim_start - drop)
+
+    def _compact(self):
+        budget = self.token_budget - estimate_tokens(self.summary)
+        if self._verbatim_tokens <= budget:
+            return
+        fold_end = self._verbatim_start
+        tokens = self._verbatim_tokens
+        # Always keep the newest turn verbatim
+        while fold_end < len(self.turns) - 1 and tokens > budget:
+            tokens -= estimate_tokens(self.turns[fold_end][1])
+            fold_end += 1
+        folded = self.turns[self._verbatim_start:fold_end]
+        if folded:
+            self.summary = self.summarize_fn(self.summary, folded, self.summary_tokens)
+            self._verbatim_start = fold_end
+            self._verbatim_tokens = tokens
+
+    def context(self):
+        parts = []
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+        recent = self.turns[self._verbatim_start:]
+        if recent:
+            parts.append("Recent conversation:\n" + "\n".join(f"{s}: {t}" for s, t in recent))
+        return "\n\n".join(parts)
+
+    def build_prompt(self, prompt):
+        context = self.context()
+        full = f"{context}\n\n{prompt}" if context else prompt
+        self.record_prompt(full)
+        return full
+
+    def record_prompt(self, prompt):
+        self.prompt_tokens.append(estimate_tokens(prompt))
+        del self.prompt_tokens[:-self.max_turns]
+
+    def page_count(self, page_size):
+        return max(1, -(-len(self.turns) // page_size))
+
+    def page(self, page, page_size):
+        """Turns on ``page`` (1 = newest), in chronological order."""
+        end = len(self.turns) - (page - 1) * page_size
+        return self.turns[max(0, end - page_size):max(0, end)]
@@ -0,0 +1,122 @@
+# consultation.py
+# "Compare all doctors": one question, every doctor persona answering at once.
+#
+# Each persona's answer is streamed on its own worker thread; chunks are
+# handed back through one queue so the caller (the Streamlit script thread,
+# which owns the UI) can render every column as its text arrives. Wall time
+# is roughly the slowest single answer instead of the sum of all of them.
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from gemini_client import StreamStats, get_model, stream_generate
+from instrumentation import span
+from prompts import build_doctor_prompt
+
+DOCTOR_TYPES = ["Homeopathic", "Ayurvedic", "Allopathic"]
+DOCTOR_MODEL = "models/gemini-2.5-flash"
+PERSONA_TIMEOUT = float(os.getenv("NUTRIX_DOCTOR_TIMEOUT", "60"))  # seconds per persona
+
+
+class PersonaAnswer:
+    """One persona's answer so far; ``status`` is streaming -> done | error | timeout | cancelled."""
+
+    def __init__(self, persona):
+        self.persona = persona
+        self.status = "streaming"
+        self.chunks = []
+        self.error = None
+        self.stats = StreamStats()
+
+    @property
+    def text(self):
+        return "".join(self.chunks)
+
+    @property
+    def finished(self):
+        return self.status != "streaming"
+
+
+def local_stream(persona, question, context, stats):
+    """Stream one persona's answer straight from Gemini (no HTTP API)."""
+    prompt = build_doctor_prompt(persona, question)
+    if context:
+        prompt = f"{context}\n\n{prompt}"
+    return stream_generate(get_model(DOCTOR_MODEL), prompt, stats)
+
+
+# Shared across sessions; three personas per consultation
+_executor = ThreadPoolExecutor(max_workers=int(os.getenv("NUTRIX_DOCTOR_WORKERS", "12")),
+                               thread_name_prefix="doctor")
+
+
+def _pump(persona, open_stream, events, cancel):
+    # Worker thread: forward chunks until the stream ends or the persona is cancelled
+    stats = StreamStats()
+    try:
+        chunks = open_stream(persona, stats)
+        for text in chunks:
+            if cancel.is_set():
+                getattr(chunks, "close", lambda: None)()
+                events.put((persona, "cancelled", None, stats))
+                return
+            events.put((persona, "chunk", text, stats))
+        events.put((persona, "done", None, stats))
+    except Exception as e:
+        events.put((persona, "error", e, stats))
+
+
+def consult_all(question, context="", personas=DOCTOR_TYPES, open_stream=None, timeout=PERSONA_TIMEOUT,
+                cancel=None):
+    """Ask every persona concurrently; yields ``{persona: PersonaAnswer}`` after each update.
+
+    ``open_stream(persona, stats)`` returns that persona's chunk iterator
+    (defaults to :func:`local_stream`). A persona still streaming after
+    ``timeout`` seconds is marked ``"timeout"`` and cancelled; setting the
+    ``cancel`` event stops every persona that hasn't finished. Cancelled
+    workers stop at their next chunk.
+    """
+    if open_stream is None:
+        open_stream = lambda persona, stats: local_stream(persona, question, context, stats)  # noqa: E731
+    cancel = cancel or threading.Event()
+    events = queue.Queue()
+    answers = {p: PersonaAnswer(p) for p in personas}
+    stops = {p: threading.Event() for p in personas}
+    deadline = time.perf_counter() + timeout
+    pending = set(personas)
+
+    def stop(status):
+        for p in pending:
+            stops[p].set()
+            answers[p].status = status
+        pending.clear()
+
+    with span("doctor_fanout", personas=len(personas)):
+        for p in personas:
+            _executor.submit(_pump, p, open_stream, events, stops[p])
+        try:
+            while pending:
+                if cancel.is_set() or time.perf_counter() >= deadline:
+                    stop("cancelled" if cancel.is_set() else "timeout")
+                    yield answers
+                    break
+                try:
+                    persona, kind, payload, stats = events.get(timeout=max(0.001, min(0.1, deadline - time.perf_counter())))
+                except queue.Empty:
+                    continue
+                if persona not in pending:
+                    continue
+                answer = answers[persona]
+                answer.stats = stats
+                if kind == "chunk":
+                    answer.chunks.append(payload)
+                else:
+                    answer.status = kind
+                    answer.error = payload
+                    pending.discard(persona)
+                yield answers
+        finally:
+            # The caller stopped listening (e.g. a Streamlit rerun): let the workers go
+            stop("cancelled")
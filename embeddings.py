@@ -0,0 +1,40 @@
+# embeddings.py
+# Cheap local text embeddings (feature hashing of words and character trigrams).
+# Good enough to spot near-duplicate questions without calling a remote model.
+import re
+import zlib
+
+import numpy as np
+
+DEFAULT_DIM = 256
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _features(text):
+    words = _WORD_RE.findall(text.lower())
+    feats = list(words)
+    for word in words:
+        padded = f" {word} "
+        feats.extend(padded[i:i + 3] for i in range(len(padded) - 2))
+    return feats
+
+
+def hash_embed(text, dim=DEFAULT_DIM):
+    """Return an L2-normalised float32 vector for ``text``."""
+    feats = _features(text)
+    vec = np.zeros(dim, dtype=np.float32)
+    if not feats:
+        return vec
+    hashes = np.fromiter((zlib.crc32(f.encode()) for f in feats), dtype=np.uint32, count=len(feats))
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    np.add.at(vec, hashes % dim, signs)
+    norm = np.linalg.norm(vec)
+    if norm:
+        vec /= norm
+    return vec
+
+
+def hash_embed_many(texts, dim=DEFAULT_DIM):
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+    return np.vstack([hash_embed(t, dim) for t in texts])
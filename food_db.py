@@ -0,0 +1,132 @@
+# food_db.py
+# Local food composition table (data/foods.csv) with fast name lookup.
+#
+# Values are per reference serving of each catalog dish (``kcal`` column),
+# estimated from typical home recipes. Catalog rows with a different kcal
+# for the same dish are scaled linearly from that reference.
+import bisect
+import csv
+import re
+from pathlib import Path
+
+import numpy as np
+
+FOODS_PATH = Path(__file__).parent / "data" / "foods.csv"
+
+NUTRIENTS = ["kcal", "protein_g", "carbs_g", "fat_g", "fiber_g", "sodium_mg"]
+NUTRIENT_LABELS = {"kcal": ("Energy", "kcal"), "protein_g": ("Protein", "g"), "carbs_g": ("Carbs", "g"),
+                   "fat_g": ("Fat", "g"), "fiber_g": ("Fiber", "g"), "sodium_mg": ("Sodium", "mg")}
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def _normalize(text):
+    return " ".join(_WORD_RE.findall(text.lower()))
+
+
+def _trigrams(text):
+    padded = f"  {_normalize(text)} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FoodStore:
+    """Nutrients as one ``(foods, len(NUTRIENTS))`` float32 matrix, plus a name index.
+
+    ``per_kcal`` holds the same rows divided by each dish's reference kcal,
+    so any portion's nutrients are a single multiply.
+    """
+
+    def __init__(self, names, values):
+        self.name = np.array(names, dtype=object)
+        self.values = np.asarray(values, dtype=np.float32).reshape(len(names), len(NUTRIENTS))
+        self.per_kcal = self.values / self.values[:, :1]
+        self.ids = {_normalize(n): i for i, n in enumerate(names)}
+        # Prefix search runs over the sorted normalized names; fuzzy search over trigrams
+        order = sorted(range(len(names)), key=lambda i: _normalize(names[i]))
+        self._sorted_keys = [_normalize(names[i]) for i in order]
+        self._sorted_ids = np.array(order, dtype=np.int32)
+        grams = {}
+        self._gram_count = np.empty(len(names), dtype=np.float32)
+        for i, n in enumerate(names):
+            tg = _trigrams(n)
+            self._gram_count[i] = len(tg)
+            for g in tg:
+                grams.setdefault(g, []).append(i)
+        self._grams = {g: np.array(ids, dtype=np.int32) for g, ids in grams.items()}
+
+    @classmethod
+    def load(cls, path=FOODS_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)  # header
+            rows = [(r[0], [float(v) for v in r[1:]]) for r in reader]
+        return cls([n for n, _ in rows], [v for _, v in rows])
+
+    def __len__(self):
+        return len(self.name)
+
+    def get(self, name):
+        """Row id for an exact (case/punctuation-insensitive) name, or None."""
+        return self.ids.get(_normalize(name))
+
+    def _trigram_scores(self, text):
+        # Shared-trigram counts per food, summed with one scatter-add
+        tg = [self._grams[g] for g in _trigrams(text) if g in self._grams]
+        counts = np.zeros(len(self.name), dtype=np.float32)
+        if tg:
+            np.add.at(counts, np.concatenate(tg), 1.0)
+        return counts
+
+    def search(self, query, limit=5, min_score=0.3):
+        """Best name matches for ``query``: prefix hits first, then trigram (Dice) similarity.
+
+        Returns a list of (row id, score) with scores in [0, 1].
+        """
+        key = _normalize(query)
+        if not key:
+            return []
+        lo = bisect.bisect_left(self._sorted_keys, key)
+        hi = bisect.bisect_left(self._sorted_keys, key + "\uffff")
+        hits = [(int(i), 1.0) for i in self._sorted_ids[lo:hi][:limit]]
+        if len(hits) < limit:
+            shared = self._trigram_scores(key)
+            dice = 2 * shared / (self._gram_count + len(_trigrams(key)))
+            seen = {i for i, _ in hits}
+            for i in np.argsort(-dice)[:limit + len(hits)]:
+                if len(hits) >= limit or dice[i] < min_score:
+                    break
+                if int(i) not in seen:
+                    hits.append((int(i), round(float(dice[i]), 3)))
+        return hits
+
+    def mentioned_in(self, text, limit=3, min_containment=0.8):
+        """Foods whose names (nearly) appear in free text, longest names first."""
+        if not text.strip():
+            return []
+        containment = self._trigram_scores(text) / self._gram_count
+        ids = np.flatnonzero(containment >= min_containment)
+        ids = sorted(ids.tolist(), key=lambda i: (-len(self.name[i]), -containment[i]))
+        # Drop names contained in a longer match ("Poha" inside "Poha with boiled egg")
+        picked = []
+        for i in ids:
+            key = _normalize(self.name[i])
+            if not any(key in _normalize(self.name[j]) for j in picked):
+                picked.append(i)
+        return picked[:limit]
+
+    def nutrients(self, ids, kcal):
+        """Nutrients for foods ``ids`` served at ``kcal`` each (arrays broadcast); shape ``ids.shape + (6,)``."""
+        return self.per_kcal[np.asarray(ids)] * np.asarray(kcal, dtype=np.float32)[..., None]
+
+    def describe(self, i):
+        v = self.values[i]
+        return (f"{self.name[i]} (per ~{v[0]:.0f} kcal serving): {v[1]:.0f} g protein, {v[2]:.0f} g carbs, "
+                f"{v[3]:.0f} g fat, {v[4]:.0f} g fiber, {v[5]:.0f} mg sodium")
+
+
+def format_nutrients(row, keys=("protein_g", "carbs_g", "fat_g", "fiber_g", "sodium_mg")):
+    """``row`` is a dict keyed by NUTRIENTS; returns e.g. "Protein 62 g · Carbs 180 g · ..."."""
+    return " · ".join(f"{NUTRIENT_LABELS[k][0]} {row[k]:.0f} {NUTRIENT_LABELS[k][1]}" for k in keys)
+
+
+foods = FoodStore.load()
@@ -0,0 +1,232 @@
+# gemini_client.py
+# Helpers for calling Gemini, including progressive (streamed) output.
+import os
+import threading
+import time
+
+from gemini_gateway import gateway
+from instrumentation import registry, span
+
+# Set NUTRIX_FAKE_GEMINI=1 to run the app against the local fake model (no network).
+USE_FAKE_MODEL = os.getenv("NUTRIX_FAKE_GEMINI", "") not in ("", "0", "false")
+
+
+# -------------------------
+# Client configuration
+# -------------------------
+_configure_lock = threading.Lock()
+_configured_key = None
+_genai = None
+
+
+def load_sdk():
+    """Import google.generativeai on first use.
+
+    The SDK (with gRPC and protobuf) takes about a second to import, and the
+    Home, Health Planner and Help pages never call Gemini.
+    """
+    global _genai
+    if _genai is None:
+        with _configure_lock:
+            if _genai is None:
+                import google.generativeai as genai
+                _genai = genai
+    return _genai
+
+
+def configure_gemini(api_key=None):
+    """Configure the SDK once per process.
+
+    ``genai.configure`` drops the SDK's cached clients, so calling it on every
+    Streamlit rerun threw away the open gRPC/HTTP connection. Configuring once
+    keeps one default client (and its keep-alive channel) shared by all models.
+    """
+    global _configured_key
+    api_key = api_key or os.getenv("GEMINI_API_KEY")
+    genai = load_sdk()
+    with _configure_lock:
+        if _configured_key is not None and _configured_key == api_key:
+            return
+        options = {"api_key": api_key}
+        transport = os.getenv("GEMINI_TRANSPORT")  # "grpc" (default) or "rest"
+        endpoint = os.getenv("GEMINI_API_ENDPOINT")  # e.g. http://127.0.0.1:8089 for the local stub server
+        if endpoint:
+            options["client_options"] = {"api_endpoint": endpoint}
+            transport = transport or "rest"
+        if transport:
+            options["transport"] = transport
+        genai.configure(**options)
+        _configured_key = api_key
+
+
+# -------------------------
+# Model pool
+# -------------------------
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _build_model(model_name, generation_config=None):
+    if USE_FAKE_MODEL:
+        return FakeModel(model_name, first_token_delay=float(os.getenv("NUTRIX_FAKE_LATENCY", "0.3")))
+    configure_gemini()
+    return load_sdk().GenerativeModel(model_name, generation_config=generation_config)
+
+
+class ModelPool:
+    """Thread-safe registry of model objects keyed by model name and generation config."""
+
+    def __init__(self, factory=_build_model):
+        self._factory = factory
+        self._models = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, model_name, generation_config=None):
+        key = (model_name, _freeze(generation_config))
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self.hits += 1
+                return model
+            self.misses += 1
+            model = self._factory(model_name, generation_config)
+            self._models[key] = model
+            return model
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._models)}
+
+
+# One pool per process, shared by every Streamlit session.
+model_pool = ModelPool()
+registry.register_collector("nutrix_model_pool", lambda: model_pool.stats())
+
+
+def get_model(model_name="gemini-2.5-flash", generation_config=None):
+    return model_pool.get(model_name, generation_config)
+
+
+def generate_text(model_name, contents, key=None):
+    """Blocking generate through the gateway.
+
+    Text prompts are coalesced on (model, prompt); pass ``key`` for other
+    contents (e.g. a content hash for images).
+    """
+    model = get_model(model_name)
+    if key is None and isinstance(contents, str):
+        key = (model_name, contents)
+    with span("model_call", model=model_name):
+        return gateway.call(lambda: model.generate_content(contents).text, key=key)
+
+
+# -------------------------
+# Streaming
+# -------------------------
+class StreamStats:
+    """Timing for one streamed answer: time-to-first-token and total time."""
+
+    def __init__(self):
+        self.started_at = None
+        self.first_token_at = None
+        self.finished_at = None
+        self.chunks = 0
+        self.chars = 0
+
+    def start(self):
+        self.started_at = time.perf_counter()
+
+    @property
+    def ttft(self):
+        if self.started_at is None or self.first_token_at is None:
+            return None
+        return self.first_token_at - self.started_at
+
+    @property
+    def total(self):
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+
+def _iter_text(response, stats):
+    for chunk in response:
+        try:
+            text = chunk.text
+        except ValueError:
+            # Chunks without text parts (e.g. a trailing safety/finish chunk) raise here
+            continue
+        if not text:
+            continue
+        if stats.first_token_at is None:
+            stats.first_token_at = time.perf_counter()
+        stats.chunks += 1
+        stats.chars += len(text)
+        yield text
+    stats.finished_at = time.perf_counter()
+
+
+def stream_generate(model, prompt, stats=None):
+    """Yield answer text chunks from ``model.generate_content`` as they arrive."""
+    if stats is None:
+        stats = StreamStats()
+    with span("model_stream", model=getattr(model, "model_name", "unknown")):
+        stats.start()
+        response = gateway.open_stream(lambda: model.generate_content(prompt, stream=True))
+        yield from _iter_text(response, stats)
+
+
+# -------------------------
+# Local fake model (offline testing)
+# -------------------------
+class FakeResponse:
+    def __init__(self, text):
+        self.text = text
+
+
+class FakeModel:
+    """Stand-in for ``genai.GenerativeModel`` that answers locally with fixed delays."""
+
+    def __init__(self, model_name="fake", reply=None, first_token_delay=0.3,
+                 chunk_delay=0.05, chunk_size=16):
+        self.model_name = model_name
+        self.reply = reply
+        self.first_token_delay = first_token_delay
+        self.chunk_delay = chunk_delay
+        self.chunk_size = chunk_size
+
+    def _answer(self, contents):
+        if self.reply is not None:
+            return self.reply
+        if isinstance(contents, (list, tuple)):
+            contents = " ".join(c for c in contents if isinstance(c, str))
+        lines = str(contents).strip().splitlines()
+        question = lines[-1].strip() if lines else ""
+        return (f"(offline answer) You asked: {question[:200]}. "
+                "Eat a balanced plate of vegetables, protein and whole grains, "
+                "stay hydrated and keep active every day.")
+
+    def _pieces(self, text):
+        time.sleep(self.first_token_delay)
+        for i in range(0, len(text), self.chunk_size):
+            if i:
+                time.sleep(self.chunk_delay)
+            yield FakeResponse(text[i:i + self.chunk_size])
+
+    def generate_content(self, contents, stream=False, **kwargs):
+        text = self._answer(contents)
+        if stream:
+            return self._pieces(text)
+        time.sleep(self.first_token_delay + self.chunk_delay * (len(text) // self.chunk_size))
+        return FakeResponse(text)
+
@@ -0,0 +1,181 @@
+# gemini_gateway.py
+# One gateway for every upstream model call: token-bucket rate limiting,
+# jittered exponential backoff, and single-flight coalescing of identical requests.
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+from instrumentation import Histogram, registry
+
+# HTTP statuses worth retrying (google.api_core exceptions carry them in ``.code``)
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+def is_retryable(exc):
+    code = getattr(exc, "code", None)
+    if isinstance(code, int):
+        return code in RETRYABLE_STATUS
+    return isinstance(exc, (ConnectionError, TimeoutError))
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens/second, bursts of up to ``capacity``."""
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self._clock = clock
+        self._tokens = float(capacity)
+        self._updated = clock()
+        self._cond = threading.Condition()
+        self.waiting = 0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, timeout=None):
+        deadline = None if timeout is None else self._clock() + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                while True:
+                    self._refill()
+                    if self._tokens >= 1:
+                        self._tokens -= 1
+                        return True
+                    wait = (1 - self._tokens) / self.rate
+                    if deadline is not None:
+                        remaining = deadline - self._clock()
+                        if remaining <= 0:
+                            return False
+                        wait = min(wait, remaining)
+                    self._cond.wait(wait)
+            finally:
+                self.waiting -= 1
+
+
+class GeminiGateway:
+    def __init__(self, rate=5.0, burst=10, max_retries=4, base_delay=0.5, max_delay=20.0,
+                 acquire_timeout=60.0, sleep=time.sleep):
+        self.bucket = TokenBucket(rate, burst)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.acquire_timeout = acquire_timeout
+        self._sleep = sleep
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future shared by coalesced callers
+        self.active = 0
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.calls = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.failures = 0
+
+    def _backoff(self, attempt):
+        # "Full jitter": uniform in [0, min(max_delay, base * 2^attempt)]
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def _attempt(self, fn):
+        attempt = 0
+        while True:
+            if not self.bucket.acquire(self.acquire_timeout):
+                raise RateLimitTimeout("Timed out waiting for a Gemini rate-limit token")
+            try:
+                return fn()
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retries += 1
+                self._sleep(self._backoff(attempt))
+                attempt += 1
+
+    def _execute(self, fn):
+        with self._lock:
+            self.calls += 1
+            self.active += 1
+        start = time.perf_counter()
+        try:
+            return self._attempt(fn)
+        except Exception:
+            with self._lock:
+                self.failures += 1
+            raise
+        finally:
+            self.latency.observe(time.perf_counter() - start)
+            with self._lock:
+                self.active -= 1
+
+    def call(self, fn, key=None):
+        """Run ``fn()`` through the limiter with retries.
+
+        Callers passing the same hashable ``key`` while a call is in flight
+        wait for that call's result instead of going upstream again.
+        """
+        if key is None:
+            return self._execute(fn)
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.coalesced += 1
+        if not leader:
+            return future.result()
+        try:
+            result = self._execute(fn)
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def open_stream(self, fn):
+        """Start a streaming call; retries cover opening the stream and its first chunk."""
+        def first_chunk():
+            iterator = iter(fn())
+            try:
+                return iterator, [next(iterator)]
+            except StopIteration:
+                return iterator, []
+
+        iterator, head = self._execute(first_chunk)
+        yield from head
+        yield from iterator
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.bucket.waiting,
+                "active": self.active,
+                "inflight_keys": len(self._inflight),
+                "calls": self.calls,
+                "coalesced": self.coalesced,
+                "retries": self.retries,
+                "failures": self.failures,
+                "latency": self.latency.snapshot(),
+            }
+
+
+# One gateway per process, shared by every Streamlit session.
+gateway = GeminiGateway(
+    rate=float(os.getenv("NUTRIX_GEMINI_RPS", "5")),
+    burst=int(os.getenv("NUTRIX_GEMINI_BURST", "10")),
+    max_retries=int(os.getenv("NUTRIX_GEMINI_RETRIES", "4")),
+)
+registry.register_collector("nutrix_gateway", gateway.stats)
+registry.register_histogram("nutrix_gateway_call_seconds", gateway.latency)
@@ -0,0 +1,198 @@
+# instrumentation.py
+# Timing spans, counters and histograms with a Prometheus text exporter.
+import bisect
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Histogram:
+    """Cumulative-bucket histogram (Prometheus layout)."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.total = 0.0
+        self.n = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self.counts[bisect.bisect_left(self.buckets, value)] += 1
+            self.total += value
+            self.n += 1
+
+    def snapshot(self):
+        with self._lock:
+            cumulative, running = [], 0
+            for bound, count in zip(self.buckets + (float("inf"),), self.counts):
+                running += count
+                cumulative.append((bound, running))
+            return {"buckets": cumulative, "sum": self.total, "count": self.n}
+
+
+def _labels(labels):
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(labels, extra=()):
+    items = list(labels) + list(extra)
+    if not items:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+class Registry:
+    def __init__(self, recent_spans=200):
+        self._lock = threading.Lock()
+        self._counters = {}    # (name, labels) -> float
+        self._histograms = {}  # (name, labels) -> Histogram
+        self._collectors = []  # (prefix, fn returning {name: number})
+        self.recent = deque(maxlen=recent_spans)
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _labels(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+        hist.observe(value)
+
+    def register_histogram(self, name, hist, **labels):
+        with self._lock:
+            self._histograms[(name, _labels(labels))] = hist
+
+    def register_collector(self, prefix, fn):
+        """Export ``fn()``'s numeric values as gauges named ``<prefix>_<key>``."""
+        with self._lock:
+            self._collectors.append((prefix, fn))
+
+    def record_span(self, name, seconds, ok, labels):
+        self.observe("nutrix_span_seconds", seconds, span=name, **labels)
+        if not ok:
+            self.inc("nutrix_span_errors_total", span=name, **labels)
+        self.recent.append({"span": name, "ms": round(seconds * 1000, 2), "ok": ok,
+                            "at": time.strftime("%H:%M:%S"), **labels})
+
+    def render_prometheus(self):
+        with self._lock:
+            counters = dict(self._counters)
+            histograms = dict(self._histograms)
+            collectors = list(self._collectors)
+        lines = []
+        for name in sorted({n for n, _ in counters}):
+            lines.append(f"# TYPE {name} counter")
+            for (n, labels), value in sorted(counters.items()):
+                if n == name:
+                    lines.append(f"{name}{_format_labels(labels)} {value}")
+        for name in sorted({n for n, _ in histograms}):
+            lines.append(f"# TYPE {name} histogram")
+            for (n, labels), hist in sorted(histograms.items(), key=lambda kv: kv[0]):
+                if n != name:
+                    continue
+                snap = hist.snapshot()
+                for bound, count in snap["buckets"]:
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels, [('le', le)])} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {snap['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {snap['count']}")
+        for prefix, fn in collectors:
+            try:
+                values = fn()
+            except Exception:
+                continue
+            for key, value in sorted(values.items()):
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                lines.append(f"# TYPE {prefix}_{key} gauge")
+                lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry(recent_spans=int(os.getenv("NUTRIX_RECENT_SPANS", "200")))
+
+
+class Span:
+    def __init__(self, name, labels, reg):
+        self.name = name
+        self.labels = labels
+        self.registry = reg
+        self.start = time.perf_counter()
+        self.seconds = None
+
+    def end(self, ok=True):
+        if self.seconds is None:
+            self.seconds = time.perf_counter() - self.start
+            self.registry.record_span(self.name, self.seconds, ok, self.labels)
+        return self.seconds
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end(ok=exc_type is None)
+        return False
+
+
+def span(name, **labels):
+    """Time a block: ``with span("plan", mode="quick"): ...``; or call ``.end()`` yourself."""
+    return Span(name, labels, registry)
+
+
+# -------------------------
+# Exporters
+# -------------------------
+_exporter_lock = threading.Lock()
+_exporter = None
+_last_file_export = 0.0
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, fmt, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = registry.render_prometheus().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_exporter(port, host="127.0.0.1"):
+    """Serve /metrics from a daemon thread; safe to call on every rerun."""
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = ThreadingHTTPServer((host, port), _MetricsHandler)
+            _exporter.daemon_threads = True
+            threading.Thread(target=_exporter.serve_forever, name="metrics-exporter", daemon=True).start()
+    return _exporter
+
+
+def export_to_file(path, min_interval=5.0):
+    """Write the Prometheus text to ``path`` (atomically), at most every ``min_interval`` s."""
+    global _last_file_export
+    now = time.monotonic()
+    if now - _last_file_export < min_interval:
+        return False
+    _last_file_export = now
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(registry.render_prometheus())
+    os.replace(tmp, path)
+    return True
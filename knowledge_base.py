@@ -0,0 +1,282 @@
+# knowledge_base.py
+# Retrieval over vetted nutrition guidance (data/knowledge/*.md) for grounding NutriX Chat.
+#
+#   python knowledge_base.py build            # re-embed only files/chunks that changed
+#   python knowledge_base.py build --full     # re-embed everything
+#   python knowledge_base.py search "snacks for diabetes" --issue Diabetes
+#
+# Each markdown file starts with "# <issue>" (matching the chat's issue list);
+# every "## section" becomes one passage. Passages are embedded with the local
+# hashing embedder and searched by brute-force cosine similarity, which is
+# well under a millisecond at this corpus size.
+import argparse
+import hashlib
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+import numpy as np
+
+from embeddings import hash_embed
+from instrumentation import span
+
+KB_DIR = Path(__file__).parent / "data" / "knowledge"
+INDEX_PATH = Path(__file__).parent / "data" / "knowledge_index.npz"
+EMBED_DIM = 512
+MAX_CHUNK_WORDS = 120
+MIN_SCORE = 0.14  # below this, hashed-token matches are mostly shared filler words
+GENERAL_ISSUE = "General Wellness"
+INDEX_VERSION = 1
+# A missing, outdated or corrupt index file is rebuilt rather than failing chat
+LOAD_ERRORS = (OSError, ValueError, KeyError, zipfile.BadZipFile)
+
+_SENTENCE_RE = re.compile(r"(?<=[.!?])\s+")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+STOPWORDS = frozenset("""
+a about an and are as at be by can do does for from how i in is it me my of on or should so that the
+this to what when which with you your
+""".split())
+
+
+def _embed(text, dim=EMBED_DIM):
+    # Drop stopwords so question phrasing ("how much should I ...") doesn't dominate the hash features
+    return hash_embed(" ".join(w for w in _WORD_RE.findall(text.lower()) if w not in STOPWORDS), dim)
+
+
+def chunk_markdown(text, max_words=MAX_CHUNK_WORDS):
+    """Return (issue, [passage, ...]); long sections are split on sentence boundaries."""
+    issue, passages = None, []
+    heading, body = None, []
+
+    def flush():
+        if heading is None or not body:
+            return
+        words, piece = 0, []
+        for sentence in _SENTENCE_RE.split(" ".join(body)):
+            n = len(sentence.split())
+            if piece and words + n > max_words:
+                passages.append(f"{heading}: {' '.join(piece)}")
+                words, piece = 0, []
+            piece.append(sentence)
+            words += n
+        if piece:
+            passages.append(f"{heading}: {' '.join(piece)}")
+
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith("## "):
+            flush()
+            heading, body = line[3:].strip(), []
+        elif line.startswith("# ") and issue is None:
+            issue = line[2:].strip()
+        elif line:
+            body.append(line)
+    flush()
+    return issue, passages
+
+
+def _chunk_hash(issue, passage):
+    return hashlib.sha1(f"{issue}\n{passage}".encode("utf-8")).hexdigest()[:16]
+
+
+def _file_hash(path):
+    return hashlib.sha256(path.read_bytes()).hexdigest()
+
+
+class KnowledgeIndex:
+    """Passages with their embeddings as one ``(N, dim)`` float32 matrix.
+
+    ``vectors`` are stored unweighted so they can be reused across builds;
+    search runs against an IDF-weighted copy derived from the current corpus.
+    """
+
+    def __init__(self, vectors, text, issue, source, chunk, manifest):
+        self.vectors = vectors
+        self.text = text
+        self.issue = issue
+        self.source = source
+        self.chunk = chunk
+        self.manifest = manifest  # source file name -> sha256 of its contents
+        df = (vectors != 0).sum(axis=0)
+        self.idf = (np.log((1 + len(vectors)) / (1 + df)) + 1).astype(np.float32)
+        weighted = vectors * self.idf
+        norms = np.linalg.norm(weighted, axis=1, keepdims=True)
+        self._weighted = weighted / np.where(norms == 0, 1, norms)
+
+    @classmethod
+    def empty(cls, dim=EMBED_DIM):
+        blank = np.array([], dtype=str)
+        return cls(np.zeros((0, dim), dtype=np.float32), blank, blank, blank, blank, {})
+
+    @classmethod
+    def load(cls, path=INDEX_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != INDEX_VERSION:
+                raise ValueError(f"Index version {meta.get('version')} != {INDEX_VERSION}")
+            return cls(data["vectors"], data["text"], data["issue"], data["source"], data["chunk"],
+                       meta["manifest"])
+
+    def save(self, path=INDEX_PATH):
+        # Unique temp name: replicas building the index at once never write into each other's file
+        path = Path(path)
+        meta = json.dumps({"version": INDEX_VERSION, "manifest": self.manifest})
+        with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.stem + ".", suffix=".tmp.npz",
+                                         delete=False) as tmp:
+            np.savez(tmp, vectors=self.vectors, text=self.text, issue=self.issue, source=self.source,
+                     chunk=self.chunk, meta=np.array(meta))
+        os.replace(tmp.name, path)
+
+    def __len__(self):
+        return len(self.text)
+
+    @property
+    def dim(self):
+        return self.vectors.shape[1]
+
+    def search(self, query, issue=None, k=3, min_score=MIN_SCORE):
+        """Top-``k`` (score, passage, issue) for ``query``.
+
+        Only general guidance is considered, plus that issue's passages when
+        a specific ``issue`` is given; advice for conditions the user didn't
+        choose never comes back.
+        """
+        if not len(self):
+            return []
+        q = _embed(query, self.dim) * self.idf
+        norm = np.linalg.norm(q)
+        if not norm:
+            return []
+        scores = self._weighted @ (q / norm)
+        allowed = self.issue == GENERAL_ISSUE
+        if issue and issue != "None":
+            allowed |= self.issue == issue
+        scores = np.where(allowed, scores, -1.0)
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(float(scores[i]), str(self.text[i]), str(self.issue[i])) for i in top if scores[i] >= min_score]
+
+
+def build_index(kb_dir=KB_DIR, previous=None, full=False):
+    """Index every ``*.md`` in ``kb_dir``, reusing ``previous`` wherever it is still valid.
+
+    Passages whose text is unchanged keep their stored vectors; only new or
+    edited passages are embedded. Returns (index, stats).
+    """
+    start = time.perf_counter()
+    previous = None if full else previous
+    reuse = {}
+    if previous is not None and previous.dim == EMBED_DIM:
+        reuse = {c: previous.vectors[i] for i, c in enumerate(previous.chunk)}
+    rows = []  # (vector, text, issue, source, chunk)
+    manifest = {}
+    stats = {"files": 0, "changed_files": 0, "passages": 0, "embedded": 0, "reused": 0}
+    for path in sorted(Path(kb_dir).glob("*.md")):
+        digest = _file_hash(path)
+        manifest[path.name] = digest
+        stats["files"] += 1
+        if previous is None or previous.manifest.get(path.name) != digest:
+            stats["changed_files"] += 1
+        issue, passages = chunk_markdown(path.read_text(encoding="utf-8"))
+        issue = issue or path.stem.replace("_", " ").title()
+        for passage in passages:
+            chunk = _chunk_hash(issue, passage)
+            vector = reuse.get(chunk)
+            if vector is None:
+                vector = _embed(passage, EMBED_DIM)
+                stats["embedded"] += 1
+            else:
+                stats["reused"] += 1
+            rows.append((vector, passage, issue, path.name, chunk))
+    stats["passages"] = len(rows)
+    stats["removed_files"] = len(set(previous.manifest) - set(manifest)) if previous is not None else 0
+    if not rows:
+        index = KnowledgeIndex.empty()
+        index.manifest = manifest
+    else:
+        vectors, text, issue, source, chunk = zip(*rows)
+        index = KnowledgeIndex(np.vstack(vectors).astype(np.float32), np.array(text), np.array(issue),
+                               np.array(source), np.array(chunk), manifest)
+    stats["seconds"] = round(time.perf_counter() - start, 4)
+    return index, stats
+
+
+def is_stale(index, kb_dir=KB_DIR):
+    current = {p.name: _file_hash(p) for p in Path(kb_dir).glob("*.md")}
+    return current != index.manifest
+
+
+# -------------------------
+# Process-wide index
+# -------------------------
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_index():
+    """Load the saved index once per process, refreshing it first if the corpus changed."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    index = KnowledgeIndex.load(INDEX_PATH)
+                except LOAD_ERRORS:
+                    index = None
+                if index is None or is_stale(index):
+                    index, _ = build_index(previous=index)
+                    try:
+                        index.save(INDEX_PATH)
+                    except OSError:
+                        pass  # read-only deploy; keep the in-memory index
+                _index = index
+    return _index
+
+
+def retrieve(query, issue=None, k=3):
+    """Return (passages, seconds) for the chat prompt; timed separately from generation."""
+    with span("retrieval", issue=issue or "None") as s:
+        hits = get_index().search(query, issue, k)
+    return [text for _, text, _ in hits], s.seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query the NutriX knowledge index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="(re)build the index incrementally")
+    build.add_argument("--full", action="store_true", help="re-embed every passage")
+    build.add_argument("--kb-dir", default=str(KB_DIR))
+    build.add_argument("--index", default=str(INDEX_PATH))
+    search = sub.add_parser("search", help="show the passages retrieved for a question")
+    search.add_argument("query")
+    search.add_argument("--issue", default=None)
+    search.add_argument("-k", type=int, default=3)
+    search.add_argument("--index", default=str(INDEX_PATH))
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        try:
+            previous = KnowledgeIndex.load(args.index)
+        except LOAD_ERRORS:
+            previous = None
+        index, stats = build_index(args.kb_dir, previous, full=args.full)
+        index.save(args.index)
+        print(json.dumps(stats), file=sys.stderr)
+    else:
+        index = KnowledgeIndex.load(args.index)
+        start = time.perf_counter()
+        hits = index.search(args.query, args.issue, args.k)
+        print(f"{len(hits)} passages in {(time.perf_counter() - start) * 1000:.2f} ms", file=sys.stderr)
+        for score, text, issue in hits:
+            print(f"[{score:.2f}] ({issue}) {text}")
+
+
+if __name__ == "__main__":
+    main()
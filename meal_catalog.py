@@ -0,0 +1,75 @@
+# meal_catalog.py
+# Meal catalog loaded once per process from data/meals.csv into columnar arrays.
+import csv
+from pathlib import Path
+
+import numpy as np
+
+from food_db import foods
+
+CATALOG_PATH = Path(__file__).parent / "data" / "meals.csv"
+
+GOALS = ["Weight Loss", "Weight Gain", "Maintain"]
+MEALS = ["Breakfast", "Lunch", "Snack", "Dinner"]
+DIETS = ["Vegan", "Vegetarian", "Non-Veg", "Eggetarian"]
+
+
+class MealCatalog:
+    """Columnar meal table with rows pre-indexed by (goal, meal, diet).
+
+    ``name``/``label`` are object arrays, ``kcal`` is int16 and ``goal``,
+    ``meal`` and ``diet`` hold small integer codes into GOALS/MEALS/DIETS.
+    """
+
+    def __init__(self, rows):
+        self.name = np.array([r[3] for r in rows], dtype=object)
+        self.kcal = np.array([r[4] for r in rows], dtype=np.int16)
+        self.goal = np.array([GOALS.index(r[0]) for r in rows], dtype=np.uint8)
+        self.meal = np.array([MEALS.index(r[1]) for r in rows], dtype=np.uint8)
+        self.diet = np.array([DIETS.index(r[2]) for r in rows], dtype=np.uint8)
+        # Row -> food_db id; every catalog dish must have a composition entry
+        missing = sorted({n for n in self.name if foods.get(n) is None})
+        if missing:
+            raise KeyError(f"No nutrient data for: {', '.join(missing)}")
+        self.food = np.array([foods.get(n) for n in self.name], dtype=np.int16)
+        # Display strings keep the original "Poha (~180 kcal)" format
+        self.label = np.array([f"{n} (~{k} kcal)" for n, k in zip(self.name, self.kcal)], dtype=object)
+        self.index = {}
+        for g, goal in enumerate(GOALS):
+            for m, meal in enumerate(MEALS):
+                for d, diet in enumerate(DIETS):
+                    mask = (self.goal == g) & (self.meal == m) & (self.diet == d)
+                    self.index[(goal, meal, diet)] = np.flatnonzero(mask).astype(np.int16)
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH):
+        with open(path, newline="", encoding="utf-8") as f:
+            reader = csv.reader(f)
+            next(reader)  # header
+            rows = [(goal, meal, diet, name, int(kcal)) for goal, meal, diet, name, kcal in reader]
+        return cls(rows)
+
+    def __len__(self):
+        return len(self.name)
+
+    def rows_for(self, goal, meal, diet):
+        return self.index[(goal, meal, diet)]
+
+    def sample_week(self, goal, diet, rng, days=7):
+        """Return a ``(days, len(MEALS))`` array of row ids, one random item per slot."""
+        picks = np.empty((days, len(MEALS)), dtype=np.int16)
+        for m, meal in enumerate(MEALS):
+            ids = self.index[(goal, meal, diet)]
+            picks[:, m] = ids[rng.integers(0, len(ids), size=days)]
+        return picks
+
+    def week_labels(self, picks):
+        labels = self.label[picks]
+        return [dict(zip(MEALS, day)) for day in labels.tolist()]
+
+    def day_nutrients(self, picks, portions=1.0):
+        """``(days, len(NUTRIENTS))`` totals for a ``(days, meals)`` pick array, summed per day."""
+        return foods.nutrients(self.food[picks], self.kcal[picks] * portions).sum(axis=1)
+
+
+catalog = MealCatalog.load()
@@ -0,0 +1,101 @@
+# meal_optimizer.py
+# Calorie-target weekly meal planning over the preloaded meal catalog.
+from functools import lru_cache
+
+import numpy as np
+
+from meal_catalog import catalog, MEALS
+
+ACTIVITY_FACTORS = {
+    "Sedentary": 1.2,
+    "Lightly Active": 1.375,
+    "Moderately Active": 1.55,
+    "Active": 1.725,
+    "Very Active": 1.9,
+}
+GOAL_ADJUSTMENT = {"Weight Loss": -500, "Weight Gain": 400, "Maintain": 0}
+MIN_DAILY_KCAL = 1200
+TARGET_TOLERANCE = 0.05  # a day is on target within ±5% of the energy target
+
+# Serving multipliers the optimizer may apply per meal slot
+PORTIONS = np.array([1.0, 1.5, 2.0, 2.5], dtype=np.float32)
+
+
+def bmr_mifflin(age, weight, height, sex=None):
+    """Mifflin-St Jeor basal metabolic rate in kcal/day (weight kg, height cm)."""
+    offset = {"Male": 5, "Female": -161}.get(sex, -78)  # midpoint when sex is not given
+    return 10 * weight + 6.25 * height - 5 * age + offset
+
+
+def daily_energy_target(age, weight, height, activity_level, goal, sex=None):
+    tdee = bmr_mifflin(age, weight, height, sex) * ACTIVITY_FACTORS.get(activity_level, 1.55)
+    return max(MIN_DAILY_KCAL, int(round(tdee + GOAL_ADJUSTMENT.get(goal, 0))))
+
+
+@lru_cache(maxsize=None)
+def _candidates(goal, diet):
+    # Every one-item-per-slot combination and every portion assignment, built once per (goal, diet)
+    slot_ids = [catalog.rows_for(goal, meal, diet) for meal in MEALS]
+    grids = np.meshgrid(*[np.arange(len(ids)) for ids in slot_ids], indexing="ij")
+    local = np.stack([g.ravel() for g in grids], axis=1)                     # (C, 4) positions per slot
+    rows = np.stack([slot_ids[s][local[:, s]] for s in range(len(MEALS))], axis=1)
+    kcal = catalog.kcal[rows].astype(np.float32)                            # (C, 4)
+    pgrid = np.meshgrid(*[PORTIONS] * len(MEALS), indexing="ij")
+    portions = np.stack([g.ravel() for g in pgrid], axis=1)                 # (S, 4)
+    return local, rows, kcal, portions
+
+
+def days_on_target(day_totals, target, tolerance=TARGET_TOLERANCE):
+    """Per-day flags: daily kcal within ``tolerance`` of ``target``."""
+    return np.abs(np.asarray(day_totals, dtype=np.float64) - target) <= tolerance * target
+
+
+def optimize_week(goal, diet, target, tolerance=TARGET_TOLERANCE, days=7, rng=None, variety_weight=0.5):
+    """Pick ``days`` x 4 meals whose daily kcal lands within ``tolerance`` of ``target``.
+
+    All candidate combinations are scored at once: the best portion assignment
+    per combination is an argmin over the (C, S) totals matrix, and each day
+    adds a repetition penalty from per-slot usage counts before taking the argmin.
+    Returns (row ids, portions, daily totals, on-target flags) as arrays; a
+    day is flagged off target when no combination the catalog offers for this
+    goal and diet gets within ``tolerance`` (very high or low targets).
+    """
+    if rng is None:
+        rng = np.random.default_rng()
+    local, rows, kcal, portions = _candidates(goal, diet)
+    totals = kcal @ portions.T                                               # (C, S)
+
+    # Relative error per (combination, portion set); prefer plain servings on near-ties
+    error = np.abs(totals - target) / target + 0.002 * (portions.sum(axis=1) - len(MEALS))
+    best_portion = np.argmin(error, axis=1)
+    best_error = error[np.arange(len(error)), best_portion]
+    fit = np.maximum(best_error - tolerance, 0.0) * 10.0 + best_error
+
+    usage = np.zeros((len(MEALS), local.max() + 1), dtype=np.float32)
+    slots = np.arange(len(MEALS))
+    picks = np.empty((days, len(MEALS)), dtype=np.int16)
+    chosen_portions = np.empty((days, len(MEALS)), dtype=np.float32)
+    day_totals = np.empty(days, dtype=np.float32)
+    for day in range(days):
+        repeats = usage[slots, local].sum(axis=1)
+        score = fit + variety_weight * repeats + rng.random(len(fit)) * 1e-3
+        c = int(np.argmin(score))
+        picks[day] = rows[c]
+        chosen_portions[day] = portions[best_portion[c]]
+        day_totals[day] = totals[c, best_portion[c]]
+        usage[slots, local[c]] += 1
+    return picks, chosen_portions, day_totals, days_on_target(day_totals, target, tolerance)
+
+
+def week_labels(picks, portions):
+    week = []
+    for day_rows, day_portions in zip(picks.tolist(), portions.tolist()):
+        day_plan = {}
+        for meal, row, portion in zip(MEALS, day_rows, day_portions):
+            if portion == 1.0:
+                day_plan[meal] = catalog.label[row]
+            else:
+                kcal = int(round(catalog.kcal[row] * portion))
+                day_plan[meal] = f"{catalog.name[row]} ×{portion:g} (~{kcal} kcal)"
+        week.append(day_plan)
+    return week
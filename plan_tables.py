@@ -0,0 +1,235 @@
+# plan_tables.py
+# Precomputed weekly meal plans, so a Health Planner report is a table lookup.
+#
+#   python plan_tables.py build            # writes data/plan_tables.npz (about a minute)
+#   python plan_tables.py build --jobs 8
+#   python plan_tables.py info
+#
+# For every diet x goal there is a pool of Quick plans, and for every 50 kcal
+# energy-target bucket a pool of Calorie Target plans. A plan is stored as its
+# (7, 4) catalog row ids (plus portion indexes for target plans). Labels and
+# nutrients come from the in-memory catalog at lookup time. Every stored plan
+# passed validation at build time.
+#
+# Each pool entry is a pure function of (seed, diet, goal, bucket, index):
+# quick_entry() / target_entry() compute it, and the tables only store the
+# results. Without a usable artifact (not built, stale, or
+# NUTRIX_PLAN_TABLES=off) the planner computes the same entries live, so
+# a deployment that never ran `build` serves the same plans, only slower.
+import argparse
+import hashlib
+import json
+import os
+import sys
+import tempfile
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+from food_db import FOODS_PATH
+from meal_catalog import CATALOG_PATH, DIETS, GOALS, MEALS, catalog
+from meal_optimizer import MIN_DAILY_KCAL, PORTIONS, TARGET_TOLERANCE, optimize_week
+
+TABLES_PATH = Path(__file__).parent / "data" / "plan_tables.npz"
+TABLES_VERSION = 2
+QUICK_POOL = 52   # about one plan per week of the year before a profile repeats
+TARGET_POOL = 4
+TARGET_STEP = 50  # kcal
+TARGET_MAX = 4000
+MAX_SLOT_REPEATS = 2  # a dish appears at most twice per meal slot in a week
+MAX_ATTEMPTS = 20
+DAYS = 7
+
+
+def catalog_digest():
+    h = hashlib.sha256()
+    for path in (CATALOG_PATH, FOODS_PATH):
+        h.update(path.read_bytes())
+    return h.hexdigest()[:16]
+
+
+def target_buckets():
+    return np.arange(MIN_DAILY_KCAL, TARGET_MAX + 1, TARGET_STEP)
+
+
+def _varied(picks):
+    return all(np.unique(picks[:, m], return_counts=True)[1].max() <= MAX_SLOT_REPEATS
+               for m in range(len(MEALS)))
+
+
+def pool_order(slot, size):
+    """Entries tried for ``slot``: its own, then the following ones (wrapping) if it is invalid."""
+    first = slot % size
+    return [(first + i) % size for i in range(size)]
+
+
+def target_bucket(target):
+    """Index of the nearest energy-target bucket, or None outside the tables' range."""
+    b = int(round((target - MIN_DAILY_KCAL) / TARGET_STEP))
+    return b if 0 <= b < len(target_buckets()) else None
+
+
+# -------------------------
+# Pool entries
+# -------------------------
+def quick_entry(diet, goal, index, seed=0):
+    """(7, 4) row ids of Quick plan ``index`` in the diet x goal pool."""
+    rng = np.random.default_rng([seed, DIETS.index(diet), GOALS.index(goal), 0, index])
+    for _ in range(MAX_ATTEMPTS):
+        picks = catalog.sample_week(goal, diet, rng, DAYS)
+        if _varied(picks):
+            break
+    return picks
+
+
+def target_entry(diet, goal, bucket, index, seed=0):
+    """(row ids, portions) of Calorie Target plan ``index`` for ``bucket``, or None if it misses the target."""
+    target = int(target_buckets()[bucket])
+    rng = np.random.default_rng([seed, DIETS.index(diet), GOALS.index(goal), 1, bucket, index])
+    for _ in range(3):
+        picks, portions, _, on_target = optimize_week(goal, diet, target, TARGET_TOLERANCE, DAYS, rng=rng)
+        if on_target.all():
+            return picks, portions
+    return None
+
+
+# -------------------------
+# Build
+# -------------------------
+def _build_quick(combo, seed):
+    diet, goal = combo
+    return np.stack([quick_entry(diet, goal, i, seed) for i in range(QUICK_POOL)]).astype(np.int16)
+
+
+def _build_target(combo, seed):
+    diet, goal = combo
+    shape = (len(target_buckets()), TARGET_POOL, DAYS, len(MEALS))
+    picks = np.zeros(shape, dtype=np.int16)
+    portions = np.zeros(shape, dtype=np.uint8)
+    valid = np.zeros(shape[:2], dtype=bool)
+    for b in range(shape[0]):
+        for i in range(TARGET_POOL):
+            found = target_entry(diet, goal, b, i, seed)
+            if found is not None:
+                picks[b, i], valid[b, i] = found[0], True
+                portions[b, i] = np.searchsorted(PORTIONS, found[1])
+    return picks, portions, valid
+
+
+def build_tables(seed=0, jobs=None):
+    """Return the arrays and metadata of a fresh table set, plus build stats."""
+    start = time.perf_counter()
+    combos = [(diet, goal) for diet in DIETS for goal in GOALS]
+    jobs = jobs or os.cpu_count() or 1
+    if jobs > 1:
+        with ProcessPoolExecutor(jobs) as pool:
+            quick = list(pool.map(_build_quick, combos, [seed] * len(combos)))
+            target = list(pool.map(_build_target, combos, [seed] * len(combos)))
+    else:
+        quick = [_build_quick(c, seed) for c in combos]
+        target = [_build_target(c, seed) for c in combos]
+    arrays = {
+        "quick_picks": np.stack(quick),
+        "target_picks": np.stack([t[0] for t in target]),
+        "target_portions": np.stack([t[1] for t in target]),
+        "target_valid": np.stack([t[2] for t in target]),
+    }
+    meta = {"version": TABLES_VERSION, "catalog": catalog_digest(), "diets": DIETS, "goals": GOALS,
+            "target_min": MIN_DAILY_KCAL, "target_step": TARGET_STEP, "target_max": TARGET_MAX, "seed": seed}
+    stats = {"combos": len(combos), "quick_plans": int(arrays["quick_picks"].shape[0] * QUICK_POOL),
+             "target_plans": int(arrays["target_valid"].sum()),
+             "invalid_target_plans": int((~arrays["target_valid"]).sum()),
+             "seconds": round(time.perf_counter() - start, 2)}
+    return arrays, meta, stats
+
+
+def save_tables(arrays, meta, path=TABLES_PATH):
+    # Unique temp name: concurrent builds never write into each other's file
+    path = Path(path)
+    with tempfile.NamedTemporaryFile(dir=path.parent, prefix=path.stem + ".", suffix=".tmp.npz",
+                                     delete=False) as tmp:
+        np.savez_compressed(tmp, meta=np.array(json.dumps(meta)), **arrays)
+    os.replace(tmp.name, path)
+
+
+# -------------------------
+# Lookup
+# -------------------------
+class PlanTables:
+    def __init__(self, arrays, meta):
+        self.meta = meta
+        self.quick_picks = arrays["quick_picks"]
+        self.target_picks = arrays["target_picks"]
+        self.target_portions = arrays["target_portions"]
+        self.target_valid = arrays["target_valid"]
+        self._combo = {(d, g): i * len(GOALS) + j for i, d in enumerate(DIETS) for j, g in enumerate(GOALS)}
+
+    @classmethod
+    def load(cls, path=TABLES_PATH):
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != TABLES_VERSION:
+                raise ValueError(f"Plan tables version {meta.get('version')} != {TABLES_VERSION}")
+            if meta.get("catalog") != catalog_digest():
+                raise ValueError("Plan tables were built for a different meal catalog")
+            return cls({k: data[k] for k in data.files if k != "meta"}, meta)
+
+    def quick(self, diet, goal, slot):
+        """(7, 4) row ids, or None for combinations outside the tables."""
+        combo = self._combo.get((diet, goal))
+        if combo is None:
+            return None
+        pool = self.quick_picks[combo]
+        return pool[slot % len(pool)]
+
+    def target(self, diet, goal, bucket, slot):
+        """(row ids, portions) of the first valid entry in pool_order(slot), or None if there is none."""
+        combo = self._combo.get((diet, goal))
+        if combo is None or bucket is None or not 0 <= bucket < self.target_picks.shape[1]:
+            return None
+        for i in pool_order(slot, self.target_valid.shape[2]):
+            if self.target_valid[combo, bucket, i]:
+                return self.target_picks[combo, bucket, i], PORTIONS[self.target_portions[combo, bucket, i]]
+        return None
+
+
+def load_tables(path=None):
+    """Tables from ``NUTRIX_PLAN_TABLES`` (default data/plan_tables.npz), or None if unusable."""
+    setting = path or os.getenv("NUTRIX_PLAN_TABLES", str(TABLES_PATH))
+    if setting in ("", "0", "off", "false"):
+        return None
+    try:
+        return PlanTables.load(setting)
+    except (OSError, ValueError, KeyError, zipfile.BadZipFile):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or inspect the precomputed meal plan tables.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="precompute every plan pool")
+    build.add_argument("--out", default=str(TABLES_PATH))
+    build.add_argument("--seed", type=int, default=0)
+    build.add_argument("--jobs", type=int, default=None, help="worker processes (default: all CPUs)")
+    info = sub.add_parser("info", help="describe an existing artifact")
+    info.add_argument("--path", default=str(TABLES_PATH))
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        arrays, meta, stats = build_tables(args.seed, args.jobs)
+        save_tables(arrays, meta, args.out)
+        stats["bytes"] = Path(args.out).stat().st_size
+        print(json.dumps(stats), file=sys.stderr)
+    else:
+        start = time.perf_counter()
+        tables = PlanTables.load(args.path)
+        print(json.dumps(dict(tables.meta, load_ms=round((time.perf_counter() - start) * 1000, 2),
+                              bytes=Path(args.path).stat().st_size,
+                              target_plans=int(tables.target_valid.sum()))))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+# planner.py
+# Health Planner logic shared by the Streamlit app and headless tools.
+import datetime
+import hashlib
+import os
+from functools import lru_cache
+
+import numpy as np
+
+from instrumentation import registry, span
+
+from food_db import NUTRIENTS
+from meal_catalog import catalog
+from meal_optimizer import (daily_energy_target, days_on_target, optimize_week,
+                            week_labels as optimizer_week_labels)
+from plan_tables import (QUICK_POOL, TARGET_POOL, catalog_digest, load_tables, pool_order, quick_entry,
+                         target_bucket, target_entry)
+from shared_cache import shared_cache
+
+# Upper BMI bound (exclusive), status, note
+BMI_CATEGORIES = [
+    (18.5, "Underweight", "Risk of nutritional deficiencies."),
+    (24.9, "Normal", "Healthy weight."),
+    (29.9, "Overweight", "Elevated risk of lifestyle diseases."),
+    (float("inf"), "Obese", "High risk of cardiovascular and metabolic issues."),
+]
+_BMI_BOUNDS = np.array([bound for bound, _, _ in BMI_CATEGORIES[:-1]])
+
+LIFESTYLE_TIPS = [
+    "Stay hydrated: Aim for 2.5–3 liters/day.",
+    "Include protein in every meal for satiety & muscle repair.",
+    "Reduce processed foods & added sugars.",
+    "Engage in 30–40 minutes of activity daily.",
+    "Maintain a consistent sleep schedule.",
+]
+
+def calculate_bmi(weight, height):
+    height_m = height / 100
+    return round(weight / (height_m**2), 1)
+
+# Plans are seeded from (profile, week, revision), so the same inputs always
+# give the same plan; results are memoized per process across sessions.
+# A (profile, week, revision) picks a slot in a pool of plans; each pool entry
+# is computed by plan_tables.quick_entry / target_entry, or read from
+# data/plan_tables.npz when it has been built: the same plan either way, the
+# table is only faster. Reports say which path served them ("plan_source").
+# Computed plans also go to the shared cache tier, if configured, keyed on
+# the catalog they were built from.
+# The shared tier's "plan" generation is part of every memoized key, so
+# `shared_cache.py invalidate plan` also retires this process's cached plans.
+PLAN_CACHE_SIZE = int(os.getenv("NUTRIX_PLAN_CACHE_SIZE", "4096"))
+_plan_salt = 0
+plan_tables = load_tables()
+_catalog_version = catalog_digest()
+# Without the tables (`python plan_tables.py build`) every plan is computed live;
+# plan_cache_stats() reports tables_loaded and how many plans each path served.
+_plan_sources = {"table": 0, "live": 0}
+
+def seed_plans(seed=None):
+    # Salt mixed into every plan seed (batch_report --seed); None restores the default
+    global _plan_salt
+    _plan_salt = seed or 0
+
+def current_week(today=None):
+    # ISO year and week as one number, e.g. 202642
+    year, week, _ = (today or datetime.date.today()).isocalendar()
+    return year * 100 + week
+
+def plan_seed(profile, week, revision=0):
+    key = repr((profile, week, revision, _plan_salt)).encode()
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+def _freeze_week(labels, nutrients):
+    # Cached plans are shared by every caller, so keep them immutable
+    return (tuple(tuple(day.items()) for day in labels),
+            tuple(tuple(round(float(v), 1) for v in day) for day in nutrients))
+
+def _shared_plan(key, build):
+    # Second level behind the lru_caches: a plan computed by any replica
+    if not shared_cache.enabled:
+        return build()
+    key = (_catalog_version,) + key
+    data = shared_cache.get_json("plan", key)
+    if data is not None:
+        labels, nutrients = data
+        return (tuple(tuple((meal, label) for meal, label in day) for day in labels),
+                tuple(tuple(day) for day in nutrients))
+    plan = build()
+    shared_cache.set_json("plan", key, plan)
+    return plan
+
+def _tables_for(salt):
+    # Tables hold the entries for the seed they were built with
+    return plan_tables if plan_tables is not None and plan_tables.meta.get("seed", 0) == salt else None
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _quick_pool_plan(preference, goal, slot, salt, generation=0):
+    # (labels, nutrients, source) of Quick pool entry ``slot``
+    tables = _tables_for(salt)
+    picks = tables.quick(preference, goal, slot) if tables is not None else None
+    if picks is not None:
+        return _freeze_week(catalog.week_labels(picks), catalog.day_nutrients(picks)) + ("table",)
+
+    def build():
+        entry = quick_entry(preference, goal, slot, salt)
+        return _freeze_week(catalog.week_labels(entry), catalog.day_nutrients(entry))
+    return _shared_plan(("quick", preference, goal, slot, salt), build) + ("live",)
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _target_pool_plan(preference, goal, bucket, slot, salt, generation=0):
+    # (labels, nutrients, source) of the first valid entry from ``slot`` on, or None if the pool has none
+    tables = _tables_for(salt)
+    if tables is not None:
+        found = tables.target(preference, goal, bucket, slot)
+        if found is None:
+            return None
+        picks, portions = found
+        return _freeze_week(optimizer_week_labels(picks, portions),
+                            catalog.day_nutrients(picks, portions)) + ("table",)
+
+    def build():
+        for i in pool_order(slot, TARGET_POOL):
+            found = target_entry(preference, goal, bucket, i, salt)
+            if found is not None:
+                picks, portions = found
+                return _freeze_week(optimizer_week_labels(picks, portions), catalog.day_nutrients(picks, portions))
+        return None
+    plan = _shared_plan(("target", preference, goal, bucket, slot, salt), build)
+    return None if plan is None else plan + ("live",)
+
+@lru_cache(maxsize=PLAN_CACHE_SIZE)
+def _target_plan(preference, goal, target, seed, generation=0):
+    # Energy targets outside the pools' range (or a pool with no valid plan)
+    def build():
+        picks, portions, _, _ = optimize_week(goal, preference, target, rng=np.random.default_rng(seed))
+        return _freeze_week(optimizer_week_labels(picks, portions), catalog.day_nutrients(picks, portions))
+    return _shared_plan(("target_exact", preference, goal, target, seed), build) + ("live",)
+
+def _count_source(plan):
+    _plan_sources[plan[2]] += 1
+    return plan
+
+def _quick_week(preference, goal, week, revision):
+    week = current_week() if week is None else week
+    # Consecutive revisions walk through the pool, so "regenerate" always changes the plan
+    slot = (plan_seed((preference, goal), week) + revision) % QUICK_POOL
+    return _count_source(_quick_pool_plan(preference, goal, slot, _plan_salt, shared_cache.generation("plan")))
+
+def _target_week(preference, goal, target, week, revision):
+    week = current_week() if week is None else week
+    generation = shared_cache.generation("plan")
+    bucket = target_bucket(target)
+    if bucket is not None:
+        slot = (plan_seed((preference, goal, target), week) + revision) % TARGET_POOL
+        plan = _target_pool_plan(preference, goal, bucket, slot, _plan_salt, generation)
+        if plan is not None:
+            return _count_source(plan)
+    seed = plan_seed((preference, goal, target), week, revision)
+    return _count_source(_target_plan(preference, goal, target, seed, generation))
+
+def _nutrient_rows(nutrients):
+    return [dict(zip(NUTRIENTS, day)) for day in nutrients]
+
+def plan_cache_stats():
+    infos = [f.cache_info() for f in (_quick_pool_plan, _target_pool_plan, _target_plan)]
+    return {"hits": sum(i.hits for i in infos), "misses": sum(i.misses for i in infos),
+            "size": sum(i.currsize for i in infos), "max_size": len(infos) * PLAN_CACHE_SIZE,
+            "tables_loaded": int(plan_tables is not None),
+            "table_plans": _plan_sources["table"], "live_plans": _plan_sources["live"]}
+
+registry.register_collector("nutrix_plan_cache", plan_cache_stats)
+
+def generate_meal_plan(preference, goal, week=None, revision=0):
+    # Generate 7-day meal plan: index lookup + array sampling over the preloaded catalog.
+    # ``revision`` > 0 asks for a different plan for the same profile and week.
+    labels, _, _ = _quick_week(preference, goal, week, revision)
+    return [dict(day) for day in labels]
+
+def generate_target_meal_plan(preference, goal, age, weight, height, activity_level, sex=None,
+                              week=None, revision=0):
+    # Calorie-target mode: returns (week plan, daily kcal target, planned kcal per day, day on target?).
+    # Profiles with the same energy target share a plan.
+    target = daily_energy_target(age, weight, height, activity_level, goal, sex)
+    labels, nutrients, _ = _target_week(preference, goal, target, week, revision)
+    totals = [day[0] for day in nutrients]
+    return [dict(day) for day in labels], target, totals, days_on_target(totals, target).tolist()
+
+def generate_exercise_plan(level):
+    mapping = {
+        "Sedentary": [
+            "Light walking – 20 min", "Stretching – 15 min", "Yoga breathing – 10 min",
+            "Neck & shoulder mobility – 5 min", "Ankle mobility – 5 min", "Wall push-ups – 2x10",
+            "Seated leg raises – 2x10"
+        ],
+        "Lightly Active": [
+            "Brisk walking – 30 min", "Yoga – 20 min", "Bodyweight squats – 3x12",
+            "Push-ups – 3x10", "Plank – 3x30 sec", "Glute bridges – 3x12",
+            "Cat-cow stretch – 10 reps"
+        ],
+        "Moderately Active": [
+            "Jogging – 25 min", "Jump rope – 10 min", "Push-ups – 3x12",
+            "Lunges – 3x12 per leg", "Plank – 3x45 sec", "Bicycle crunches – 3x15",
+            "Mountain climbers – 3x20"
+        ],
+        "Active": [
+            "Running – 30 min", "Pull-ups – 3x8", "Weighted squats – 4x10",
+            "Deadlifts – 4x10", "Bench press – 4x10", "Shoulder press – 3x12",
+            "Burpees – 3x15", "Plank to push-up – 3x10"
+        ],
+        "Very Active": [
+            "HIIT – 20 min (30s on/30s off)", "Sprints – 10x100m",
+            "Power cleans – 4x8", "Deadlifts – 4x8", "Front squats – 4x10",
+            "Pull-ups – 4x12", "Dips – 3x15", "Box jumps – 3x12", "Battle ropes – 3x45s",
+            "Farmer’s carry – 3x40m"
+        ]
+    }
+    return mapping.get(level, ["Walking – 20 min", "Stretching – 10 min"])
+
+def bmi_status(bmi):
+    for bound, status, note in BMI_CATEGORIES:
+        if bmi < bound:
+            return status, note
+
+def calculate_bmi_many(weights, heights):
+    # Vectorized calculate_bmi over arrays of weights (kg) and heights (cm)
+    height_m = np.asarray(heights, dtype=np.float64) / 100
+    return np.round(np.asarray(weights, dtype=np.float64) / height_m**2, 1)
+
+def classify_bmi_many(bmis):
+    # Index into BMI_CATEGORIES for each BMI (same thresholds as bmi_status)
+    return np.searchsorted(_BMI_BOUNDS, bmis, side="right")
+
+def build_health_report(age, height, weight, activity_level, meal_pref, goal,
+                        sleep_hours=7, stress_level="Medium", plan_mode="Quick", sex=None,
+                        week=None, revision=0):
+    # Everything the "Generate Health Report" button shows, as plain data
+    bmi = calculate_bmi(weight, height)
+    status, note = bmi_status(bmi)
+    kcal_target, day_totals, day_on_target = None, None, None
+    week = current_week() if week is None else week
+    with span("plan", mode=plan_mode):
+        if plan_mode == "Calorie Target":
+            kcal_target = daily_energy_target(age, weight, height, activity_level, goal, sex)
+            labels, nutrients, source = _target_week(meal_pref, goal, kcal_target, week, revision)
+            day_totals = [day[0] for day in nutrients]
+            # Targets the catalog can't reach (e.g. very high ones) still get the closest plan, flagged
+            day_on_target = days_on_target(day_totals, kcal_target).tolist()
+        else:
+            labels, nutrients, source = _quick_week(meal_pref, goal, week, revision)
+        meal_plan = [dict(day) for day in labels]
+    return {
+        "bmi": bmi,
+        "status": status,
+        "status_note": note,
+        "meal_plan": meal_plan,
+        "kcal_target": kcal_target,
+        "day_totals": day_totals,
+        "day_on_target": day_on_target,
+        "on_target": None if day_on_target is None else all(day_on_target),
+        "day_nutrients": _nutrient_rows(nutrients),
+        "exercises": generate_exercise_plan(activity_level),
+        "sleep_hours": sleep_hours,
+        "stress_level": stress_level,
+        "goal": goal,
+        "tips": list(LIFESTYLE_TIPS),
+        "plan_week": week,
+        "plan_revision": revision,
+        "plan_source": source,
+    }
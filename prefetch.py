@@ -0,0 +1,207 @@
+# prefetch.py
+# Speculative answers for the follow-up questions NutriX Chat suggests.
+#
+# After each chat answer the page offers a few follow-ups. The top
+# NUTRIX_PREFETCH_TOP of them are answered in the background while the user
+# reads, and the answers go into the response cache, so clicking one is a
+# cache hit. Follow-ups are standalone questions built from the chat context
+# (issue, diet, goal), so users with the same context share them and they are
+# often already cached (nothing is fetched then).
+#
+# Prefetching never competes with live traffic:
+#   - at most NUTRIX_PREFETCH_WORKERS calls run at once, and only a few more may wait;
+#   - NUTRIX_PREFETCH_PER_MINUTE caps the calls (token bucket; no token means skip, not wait);
+#   - nothing is prefetched while live calls are queued for a gateway token.
+# NUTRIX_PREFETCH=off disables it.
+import os
+import threading
+from collections import Counter, OrderedDict
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+import api_client
+from gemini_client import generate_text
+from gemini_gateway import TokenBucket, gateway
+from instrumentation import registry, span
+from knowledge_base import retrieve
+from prompts import CHAT_MODEL, build_chat_prompt
+from response_cache import context_key, normalize_prompt, response_cache
+
+PREFETCH_ENABLED = os.getenv("NUTRIX_PREFETCH", "on") not in ("0", "off", "false")
+SUGGESTIONS = 3
+CLAIM_TIMEOUT = 15.0  # seconds a click waits for a prefetch that is still running
+
+# (topic, template, words that mean the user already asked about it)
+FOLLOWUPS = [
+    ("recipe", "Give me a simple {diet}recipe {for_issue}", ("recipe", "cook")),
+    ("snacks", "What are healthy {diet}snacks {for_issue}?", ("snack",)),
+    ("protein", "How much protein do I need per day {for_goal}?", ("protein",)),
+    ("avoid", "Which foods should I avoid {for_issue}?", ("avoid", "limit")),
+    ("meal_plan", "Can you suggest a one-day {diet}meal plan {for_goal}?", ("meal plan", "diet plan")),
+]
+ISSUE_PHRASES = {"None": "for everyday health", "Diabetes": "for diabetes", "PCOS": "for PCOS",
+                 "Weight Loss": "for weight loss", "Weight Gain": "for healthy weight gain",
+                 "Thyroid": "for thyroid health", "General Wellness": "for general wellness"}
+GOAL_PHRASES = {"Weight Loss": "to lose weight", "Weight Gain": "to gain weight", "Maintain": "to maintain my weight"}
+DIET_WORDS = {"Vegan": "vegan ", "Vegetarian": "vegetarian ", "Non-Veg": "non-vegetarian ",
+              "Eggetarian": "eggetarian "}
+
+
+def answer_question(question, issue, meal_pref, goal, activity_level):
+    """Answer a chat question the way the chat page does (through the API when one is configured)."""
+    if api_client.API_URL:
+        return api_client.chat(question, issue, meal_pref, goal, activity_level)[0]
+    passages, _ = retrieve(question, issue)
+    return generate_text(CHAT_MODEL, build_chat_prompt(question, issue, meal_pref, goal, activity_level, passages))
+
+
+class Prefetcher:
+    """Background answers for suggested follow-ups, plus hit/waste accounting.
+
+    Hit rate: share of suggestion clicks answered by a prefetch. Wasted
+    rate: share of prefetched answers nobody has claimed (yet).
+    """
+
+    def __init__(self, fetch_fn=answer_question, cache=response_cache, workers=2, per_minute=20,
+                 burst=6, max_pending=4, top=2, enabled=True, busy=lambda: gateway.bucket.waiting > 0,
+                 max_tracked=1024):
+        self.fetch_fn = fetch_fn
+        self.cache = cache
+        self.top = top
+        self.enabled = enabled
+        self.max_pending = max_pending
+        self.max_tracked = max_tracked
+        self._busy = busy
+        self.budget = TokenBucket(per_minute / 60.0, burst)
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="prefetch")
+        self._lock = threading.Lock()
+        self._pending = {}            # cache key -> Future of a running prefetch
+        self._ready = OrderedDict()   # cache key -> claimed yet?
+        self.topic_clicks = Counter()
+        self.scheduled = 0
+        self.prefetched = 0
+        self.claimed = 0
+        self.clicks = 0
+        self.hits = 0
+        self.pending_hits = 0
+        self.skipped_cached = 0
+        self.skipped_busy = 0
+        self.skipped_queue = 0
+        self.skipped_budget = 0
+        self.errors = 0
+
+    # Suggestions
+    def suggest(self, query, issue, meal_pref, goal, k=SUGGESTIONS):
+        """Up to ``k`` (topic, question) follow-ups, most clicked topics first, minus what was just asked."""
+        asked = normalize_prompt(query)
+        fill = {"diet": DIET_WORDS.get(meal_pref, ""), "for_issue": ISSUE_PHRASES.get(issue, "for everyday health"),
+                "for_goal": GOAL_PHRASES.get(goal, "to stay healthy")}
+        with self._lock:
+            clicks = dict(self.topic_clicks)
+        order = sorted(range(len(FOLLOWUPS)), key=lambda i: -clicks.get(FOLLOWUPS[i][0], 0))
+        return [(FOLLOWUPS[i][0], FOLLOWUPS[i][1].format(**fill)) for i in order
+                if not any(word in asked for word in FOLLOWUPS[i][2])][:k]
+
+    # Background answers
+    def schedule(self, suggestions, issue, meal_pref, goal, activity_level):
+        """Start prefetching the top suggestions; returns how many calls were started."""
+        if not self.enabled:
+            return 0
+        ctx = context_key(issue, meal_pref, goal, activity_level)
+        started = 0
+        for _, question in suggestions[:self.top]:
+            key = (normalize_prompt(question), ctx)
+            with self._lock:
+                if key in self._pending or key in self._ready:
+                    continue
+            if self.cache.get(question, ctx, record=False) is not None:
+                with self._lock:
+                    self.skipped_cached += 1
+                continue
+            with self._lock:
+                if self._busy():
+                    self.skipped_busy += 1
+                    continue
+                if len(self._pending) >= self.max_pending:
+                    self.skipped_queue += 1
+                    continue
+                if not self.budget.acquire(timeout=0):
+                    self.skipped_budget += 1
+                    continue
+                self.scheduled += 1
+                self._pending[key] = self._executor.submit(
+                    self._run, key, question, ctx, (question, issue, meal_pref, goal, activity_level))
+            started += 1
+        return started
+
+    def _run(self, key, question, ctx, args):
+        try:
+            with span("prefetch"):
+                answer = self.fetch_fn(*args)
+            self.cache.put(question, ctx, answer)
+            with self._lock:
+                self.prefetched += 1
+                self._ready[key] = False
+                while len(self._ready) > self.max_tracked:
+                    self._ready.popitem(last=False)
+            return answer
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return None
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def claim(self, question, issue, meal_pref, goal, activity_level, topic=None, timeout=CLAIM_TIMEOUT):
+        """Call before answering a question. Waits for a still-running prefetch of it,
+        and returns True if a prefetched answer is now in the cache."""
+        key = (normalize_prompt(question), context_key(issue, meal_pref, goal, activity_level))
+        with self._lock:
+            if topic is not None:
+                self.clicks += 1
+                self.topic_clicks[topic] += 1
+            future = self._pending.get(key)
+        if future is not None:
+            try:
+                future.result(timeout)
+            except FutureTimeout:
+                return False
+        with self._lock:
+            if self._ready.get(key) is not False:
+                return False
+            self._ready[key] = True
+            self.claimed += 1
+            if topic is not None:
+                self.hits += 1
+                self.pending_hits += future is not None
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": int(self.enabled),
+                "pending": len(self._pending),
+                "scheduled": self.scheduled,
+                "prefetched": self.prefetched,
+                "claimed": self.claimed,
+                "clicks": self.clicks,
+                "hits": self.hits,
+                "pending_hits": self.pending_hits,
+                "hit_rate": self.hits / self.clicks if self.clicks else 0.0,
+                "wasted_rate": 1 - self.claimed / self.prefetched if self.prefetched else 0.0,
+                "skipped_cached": self.skipped_cached,
+                "skipped_busy": self.skipped_busy,
+                "skipped_queue": self.skipped_queue,
+                "skipped_budget": self.skipped_budget,
+                "errors": self.errors,
+            }
+
+
+# One prefetcher per process, shared by every Streamlit session.
+prefetcher = Prefetcher(
+    workers=int(os.getenv("NUTRIX_PREFETCH_WORKERS", "2")),
+    per_minute=float(os.getenv("NUTRIX_PREFETCH_PER_MINUTE", "20")),
+    top=int(os.getenv("NUTRIX_PREFETCH_TOP", "2")),
+    enabled=PREFETCH_ENABLED,
+)
+registry.register_collector("nutrix_prefetch", prefetcher.stats)
@@ -0,0 +1,228 @@
+# progress_log.py
+# Per-user progress log (weight, sleep, stress, BMI) stored as yearly NumPy segments.
+#
+#   data/progress/<session id>/2026.npy    366 fixed slots, one per calendar day
+#
+# Logging a day writes that day's slot in place through a memory map; nothing
+# else in the file is rewritten, so a log is append-only in time and each
+# write touches a single 17-byte row. Five years of history is five files of
+# about 6 KB each.
+#
+#   python progress_log.py <session id> demo --years 5    # synthetic history
+#   python progress_log.py <session id> show
+#
+# Set NUTRIX_PROGRESS_DIR to a shared volume when running replicas.
+import argparse
+import datetime
+import json
+import math
+import os
+import re
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+PROGRESS_DIR = Path(os.getenv("NUTRIX_PROGRESS_DIR", str(Path(__file__).parent / "data" / "progress")))
+ENTRY_DTYPE = np.dtype([("day", "<i4"), ("weight", "<f4"), ("sleep", "<f4"), ("bmi", "<f4"), ("stress", "i1")])
+SEGMENT_DAYS = 366
+EMPTY_DAY = -1
+STRESS_LEVELS = ["Low", "Medium", "High"]
+TREND_WINDOW = 28         # days of history behind the weight trend
+MAX_PROJECTION_DAYS = 3 * 365
+
+_EPOCH = datetime.date(1970, 1, 1)
+_SESSION_RE = re.compile(r"^[0-9a-f]{8,64}$")  # session ids are uuid4 hex; never a path
+
+
+def day_number(date):
+    return (date - _EPOCH).days
+
+
+def to_date(day):
+    return _EPOCH + datetime.timedelta(days=int(day))
+
+
+class ProgressLog:
+    def __init__(self, session_id, root=None):
+        if not _SESSION_RE.match(session_id):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        self.dir = Path(root or PROGRESS_DIR) / session_id
+
+    def _path(self, year):
+        return self.dir / f"{year}.npy"
+
+    def _create_segment(self, year):
+        # Build the empty segment aside and link it into place, so two replicas
+        # creating the same year at once can't clobber each other's first entry
+        self.dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.dir, suffix=".tmp")
+        os.close(fd)
+        try:
+            seg = np.lib.format.open_memmap(tmp, mode="w+", dtype=ENTRY_DTYPE, shape=(SEGMENT_DAYS,))
+            seg["day"] = EMPTY_DAY
+            seg.flush()
+            del seg
+            try:
+                os.link(tmp, self._path(year))
+            except FileExistsError:
+                pass
+        finally:
+            os.unlink(tmp)
+
+    def log(self, date, weight, sleep_hours, stress_level, bmi):
+        """Record (or correct) the entry for ``date``."""
+        path = self._path(date.year)
+        if not path.exists():
+            self._create_segment(date.year)
+        seg = np.load(path, mmap_mode="r+")
+        seg[date.timetuple().tm_yday - 1] = (day_number(date), weight, sleep_hours, bmi,
+                                             STRESS_LEVELS.index(stress_level))
+        seg.flush()
+
+    def years(self):
+        if not self.dir.is_dir():
+            return []
+        return sorted(int(p.stem) for p in self.dir.glob("*.npy") if p.stem.isdigit())
+
+    def load(self, since=None):
+        """Logged days in date order as one structured array (optionally from ``since`` on)."""
+        parts = []
+        for year in self.years():
+            if since is not None and year < since.year:
+                continue
+            seg = np.load(self._path(year), mmap_mode="r")
+            parts.append(seg[seg["day"] != EMPTY_DAY])
+        entries = np.concatenate(parts) if parts else np.empty(0, ENTRY_DTYPE)
+        if since is not None:
+            entries = entries[entries["day"] >= day_number(since)]
+        return entries
+
+
+# -------------------------
+# Analysis
+# -------------------------
+def daily_series(entries, field):
+    """(first day, values) on a dense daily grid from the first to the last entry; NaN on unlogged days."""
+    days = entries["day"]
+    values = np.full(int(days[-1] - days[0]) + 1, np.nan, dtype=np.float64)
+    values[days - days[0]] = entries[field]
+    return int(days[0]), values
+
+
+def moving_average(values, window):
+    """Trailing ``window``-day mean that skips NaN gaps (NaN where the window holds no entries)."""
+    valid = ~np.isnan(values)
+    sums = np.concatenate(([0.0], np.cumsum(np.where(valid, values, 0.0))))
+    counts = np.concatenate(([0], np.cumsum(valid)))
+    end = np.arange(1, len(values) + 1)
+    start = np.maximum(end - window, 0)
+    n = counts[end] - counts[start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(n > 0, (sums[end] - sums[start]) / n, np.nan)
+
+
+def linear_trend(days, values, window=TREND_WINDOW):
+    """Least-squares slope (units per day) over the last ``window`` days, or None with too few points."""
+    recent = days >= days[-1] - window + 1
+    x = days[recent].astype(np.float64)
+    y = values[recent].astype(np.float64)
+    if len(x) < 3 or np.ptp(x) == 0:
+        return None
+    x -= x.mean()
+    return float((x * (y - y.mean())).sum() / (x * x).sum())
+
+
+def project_goal_date(current, goal, slope, today):
+    """Date the trend reaches ``goal``, or None if it is moving away or would take too long."""
+    if slope is None or goal is None or abs(slope) < 1e-4 or (goal - current) * slope <= 0:
+        return None
+    days = (goal - current) / slope
+    if days > MAX_PROJECTION_DAYS:
+        return None
+    return today + datetime.timedelta(days=math.ceil(days))
+
+
+def progress_summary(entries, goal_weight=None, today=None):
+    """Everything the Progress card shows, computed with array operations over the whole log."""
+    today = today or datetime.date.today()
+    first, weights = daily_series(entries, "weight")
+    _, sleep = daily_series(entries, "sleep")
+    slope = linear_trend(entries["day"], entries["weight"])
+    current = float(entries["weight"][-1])
+    last_week = entries["day"] > entries["day"][-1] - 7
+    return {
+        "first_day": first,
+        "weights": weights,
+        "weight_ma7": moving_average(weights, 7),
+        "weight_ma30": moving_average(weights, 30),
+        "sleep_ma7": moving_average(sleep, 7),
+        "entries": len(entries),
+        "current_weight": current,
+        "current_bmi": float(entries["bmi"][-1]),
+        "weekly_change": slope * 7 if slope is not None else None,
+        "goal_date": project_goal_date(current, goal_weight, slope, today),
+        "avg_sleep_7d": float(entries["sleep"][last_week].mean()),
+        "stress_7d": STRESS_LEVELS[int(np.bincount(entries["stress"][last_week], minlength=3).argmax())],
+    }
+
+
+# -------------------------
+# Demo data
+# -------------------------
+def synthetic_history(days, end=None, start_weight=82.0, height=170, seed=0):
+    """Plausible daily entries ending at ``end`` (weight drifts down with noise; ~10% of days skipped)."""
+    end = end or datetime.date.today()
+    rng = np.random.default_rng(seed)
+    day = np.arange(day_number(end) - days + 1, day_number(end) + 1, dtype=np.int32)
+    entries = np.zeros(days, dtype=ENTRY_DTYPE)
+    entries["day"] = day
+    drift = np.cumsum(rng.normal(-0.006, 0.05, days))
+    entries["weight"] = start_weight + drift + rng.normal(0, 0.3, days)
+    entries["sleep"] = np.clip(rng.normal(7.0, 0.8, days), 4, 12)
+    entries["stress"] = rng.choice(3, days, p=[0.5, 0.35, 0.15])
+    entries["bmi"] = entries["weight"] / (height / 100) ** 2
+    return entries[rng.random(days) > 0.1]
+
+
+def write_entries(log, entries):
+    """Bulk-write entries (e.g. an import) segment by segment."""
+    for year in range(to_date(entries["day"][0]).year, to_date(entries["day"][-1]).year + 1):
+        first = day_number(datetime.date(year, 1, 1))
+        rows = entries[(entries["day"] >= first) & (entries["day"] < day_number(datetime.date(year + 1, 1, 1)))]
+        if not len(rows):
+            continue
+        if not log._path(year).exists():
+            log._create_segment(year)
+        seg = np.load(log._path(year), mmap_mode="r+")
+        seg[rows["day"] - first] = rows
+        seg.flush()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect a progress log or fill one with demo data.")
+    parser.add_argument("session_id")
+    sub = parser.add_subparsers(dest="command", required=True)
+    demo = sub.add_parser("demo", help="write synthetic daily history ending today")
+    demo.add_argument("--years", type=float, default=5)
+    sub.add_parser("show", help="summarize the log")
+    args = parser.parse_args(argv)
+
+    log = ProgressLog(args.session_id)
+    if args.command == "demo":
+        write_entries(log, synthetic_history(int(args.years * 365)))
+    start = time.perf_counter()
+    entries = log.load()
+    if not len(entries):
+        parser.error("no entries logged")
+    summary = progress_summary(entries)
+    print(json.dumps({"entries": summary["entries"], "first": str(to_date(entries["day"][0])),
+                      "last": str(to_date(entries["day"][-1])), "segments": len(log.years()),
+                      "current_weight": round(summary["current_weight"], 1),
+                      "weekly_change": None if summary["weekly_change"] is None else round(summary["weekly_change"], 3),
+                      "load_and_analyze_ms": round((time.perf_counter() - start) * 1000, 2)}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+# replicas.py
+# Multi-replica deployment on one host: N Streamlit app processes plus the HTTP API
+# with M workers, all sharing sessions and caches.
+#
+#   python replicas.py --app 3 --api-workers 4
+#   python replicas.py --app 2 --api-workers 0 --shared-cache redis://cache:6379/0 \
+#       --session-store redis://cache:6379/1
+#
+# App replicas listen on consecutive ports from --app-port; put any load
+# balancer in front (sticky sessions are not required: the session id rides in
+# the URL and histories/profiles live in the session store). The SQLite
+# defaults only work for replicas on this host: SQLite's WAL mode does not
+# work on network file systems. For several nodes, run this on each one
+# against the same Redis-compatible server for both the cache and the session
+# store. With --thin-client the app replicas call the local
+# API instead of Gemini directly.
+import argparse
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+
+
+def replica_env(args):
+    env = dict(os.environ, NUTRIX_SHARED_CACHE=args.shared_cache, NUTRIX_SESSION_STORE=args.session_store)
+    if args.thin_client and args.api_workers:
+        env["NUTRIX_API_URL"] = f"http://127.0.0.1:{args.api_port}"
+    return env
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run several NutriX replicas with shared sessions and caches.")
+    parser.add_argument("--app", type=int, default=2, help="Streamlit app replicas")
+    parser.add_argument("--app-port", type=int, default=8501)
+    parser.add_argument("--api-workers", type=int, default=2, help="uvicorn workers for api.py (0 = no API)")
+    parser.add_argument("--api-port", type=int, default=8000)
+    parser.add_argument("--shared-cache", default=os.getenv("NUTRIX_SHARED_CACHE", "sqlite:///data/cache.db"))
+    parser.add_argument("--session-store", default=os.getenv("NUTRIX_SESSION_STORE", "sqlite:///data/sessions.db"))
+    parser.add_argument("--thin-client", action="store_true", help="app replicas call the API (NUTRIX_API_URL)")
+    args = parser.parse_args(argv)
+    if args.session_store == "memory":
+        parser.error("replicas need a shared --session-store (sqlite:///... on this host, redis://... across hosts)")
+    if args.api_workers and args.app_port <= args.api_port < args.app_port + args.app:
+        parser.error(f"--api-port {args.api_port} collides with the app replica ports")
+
+    env = replica_env(args)
+    procs = []
+    if args.api_workers:
+        procs.append(subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--host", "0.0.0.0",
+                                       "--port", str(args.api_port), "--workers", str(args.api_workers)],
+                                      cwd=ROOT, env=env))
+        print(f"api: http://0.0.0.0:{args.api_port} ({args.api_workers} workers)")
+    for i in range(args.app):
+        port = args.app_port + i
+        procs.append(subprocess.Popen([sys.executable, "-m", "streamlit", "run", "app.py",
+                                       "--server.port", str(port), "--server.headless", "true"],
+                                      cwd=ROOT, env=env))
+        print(f"app replica {i + 1}: http://0.0.0.0:{port}")
+    print(f"shared cache: {args.shared_cache} · session store: {args.session_store}")
+
+    def stop(*_):
+        for proc in procs:
+            proc.terminate()
+
+    signal.signal(signal.SIGTERM, stop)
+    try:
+        # Exit (and take the rest down) as soon as any replica dies
+        while all(proc.poll() is None for proc in procs):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop()
+        for proc in procs:
+            proc.wait()
+    return max((proc.returncode or 0) for proc in procs)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+# report_jobs.py
+# Background analysis of uploaded medical report images.
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from gemini_client import generate_text
+from instrumentation import registry, span
+from vision_prep import prepare_report
+
+REPORT_MODEL = "gemini-2.0-flash-exp-image-generation"
+REPORT_PROMPT = "Analyze this medical report image and summarize key findings clearly for a patient."
+# Readable reports are sent as OCR text to a text model: no image tokens, faster answers
+REPORT_TEXT_MODEL = "gemini-2.5-flash"
+REPORT_TEXT_PROMPT = ("The text below was extracted by OCR from a medical report. Summarize the key findings "
+                      "clearly for a patient, and say so if any values look garbled.\n\n{text}")
+
+
+def analyze_report_image(image_bytes, mime_type="image/jpeg"):
+    contents = [REPORT_PROMPT, {"mime_type": mime_type, "data": image_bytes}]
+    return generate_text(REPORT_MODEL, contents, key=(REPORT_MODEL, hashlib.sha256(image_bytes).hexdigest()))
+
+
+def analyze_report_text(text):
+    return generate_text(REPORT_TEXT_MODEL, REPORT_TEXT_PROMPT.format(text=text))
+
+
+def analyze_report(prepared):
+    if prepared.text is not None:
+        return analyze_report_text(prepared.text)
+    return analyze_report_image(prepared.image, prepared.image_mime)
+
+
+class ReportJob:
+    def __init__(self, job_id, original_bytes):
+        self.id = job_id
+        self.status = "queued"  # queued -> running -> done | error
+        self.result = None
+        self.error = None
+        self.original_bytes = original_bytes
+        self.upload_bytes = None
+        self.mode = None     # "text" (OCR) or "image"
+        self.timings = {}    # stage -> ms, including the model call ("analyze")
+        self.submitted_at = time.time()
+        self.finished_at = None
+
+    @property
+    def finished(self):
+        return self.status in ("done", "error")
+
+
+class ReportJobQueue:
+    """Thread-pool job queue; jobs are keyed by the SHA-256 of the uploaded bytes.
+
+    Submitting the same bytes again returns the existing job instead of
+    analysing the report a second time (failed jobs are retried).
+    """
+
+    def __init__(self, analyze_fn=analyze_report, prepare_fn=prepare_report,
+                 max_workers=2, max_jobs=256):
+        self.analyze_fn = analyze_fn
+        self.prepare_fn = prepare_fn
+        self.max_jobs = max_jobs
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="report-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self.submitted = 0
+        self.duplicates = 0
+        self.text_uploads = 0
+        self.image_uploads = 0
+        self.bytes_saved = 0
+        self.prepare_fallbacks = 0
+
+    def submit(self, data):
+        job_id = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job.status != "error":
+                self._jobs.move_to_end(job_id)
+                self.duplicates += 1
+                return job
+            job = ReportJob(job_id, len(data))
+            self._jobs[job_id] = job
+            self._jobs.move_to_end(job_id)
+            self._evict()
+            self.submitted += 1
+        self._executor.submit(self._run, job, data)
+        return job
+
+    def _evict(self):
+        # Drop the oldest finished jobs once over the cap; running jobs are kept
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_jobs:
+                break
+            if self._jobs[job_id].finished:
+                del self._jobs[job_id]
+
+    def _run(self, job, data):
+        job.status = "running"
+        try:
+            with span("report_prepare"):
+                prepared = self.prepare_fn(data)
+            job.mode, job.upload_bytes = prepared.mode, prepared.upload_bytes
+            job.timings = dict(prepared.timings)
+            with self._lock:
+                self.text_uploads += prepared.mode == "text"
+                self.image_uploads += prepared.mode == "image"
+                self.prepare_fallbacks += prepared.fallback is not None
+                self.bytes_saved += max(0, len(data) - prepared.upload_bytes)
+            start = time.perf_counter()
+            job.result = self.analyze_fn(prepared)
+            job.timings["analyze"] = round((time.perf_counter() - start) * 1000, 1)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "error"
+        job.finished_at = time.time()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            pending = sum(1 for job in self._jobs.values() if not job.finished)
+            return {"jobs": len(self._jobs), "pending": pending,
+                    "submitted": self.submitted, "duplicates": self.duplicates,
+                    "text_uploads": self.text_uploads, "image_uploads": self.image_uploads,
+                    "bytes_saved": self.bytes_saved, "prepare_fallbacks": self.prepare_fallbacks}
+
+
+# One queue per process, shared by every Streamlit session.
+report_jobs = ReportJobQueue(max_workers=int(os.getenv("NUTRIX_REPORT_WORKERS", "2")))
+registry.register_collector("nutrix_report_jobs", report_jobs.stats)
@@ -0,0 +1,211 @@
+# response_cache.py
+# In-process cache of Gemini answers for repeated health questions, optionally
+# backed by the shared cache tier (shared_cache.py) so replicas reuse each other's answers.
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+from instrumentation import registry
+from shared_cache import shared_cache
+
+_PUNCT_RE = re.compile(r"[^\w\s]")
+_SPACE_RE = re.compile(r"\s+")
+_NUMBER_RE = re.compile(r"\d+")
+# Words that flip a question's meaning; bag-of-tokens embeddings barely notice them.
+# normalize_prompt turns "don't" into "don t", hence the lone "t".
+NEGATIONS = frozenset({"no", "not", "t", "never", "without", "cannot", "nor", "none", "avoid", "free"})
+
+
+def normalize_prompt(text):
+    text = _PUNCT_RE.sub(" ", text.lower())
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def meaning_tokens(normalized):
+    """Numbers and negation words of a normalized prompt: these must match for a semantic hit."""
+    words = normalized.split()
+    return tuple(_NUMBER_RE.findall(normalized)), tuple(w for w in words if w in NEGATIONS)
+
+
+def context_key(*parts):
+    return tuple(normalize_prompt(str(p)) for p in parts)
+
+
+class ResponseCache:
+    """LRU + TTL cache keyed on (normalized prompt, context key).
+
+    With ``embed_fn`` set (opt-in), a miss on the exact key falls back to the
+    most similar cached prompt with the same context, if its cosine similarity
+    is at least ``similarity_threshold`` and both prompts carry the same
+    numbers and negation words ("1200 kcal" vs "1800 kcal", "with" vs
+    "without" sugar score as near-duplicates but need different answers). Vectors live in one preallocated
+    ``(max_entries, dim)`` array so the search is a single matrix-vector product.
+    With ``shared`` set, local misses are looked up there (exact keys only) and
+    new answers are written through; local entries from before the last
+    ``shared.invalidate("response")`` are dropped when next hit.
+    """
+
+    def __init__(self, max_entries=512, ttl_seconds=24 * 3600, embed_fn=None,
+                 similarity_threshold=0.9, clock=time.monotonic, shared=None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self._clock = clock
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # key -> (answer, expires_at, slot, generation)
+        self._vectors = None
+        self._slot_context = np.full(max_entries, -1, dtype=np.int64)
+        self._slot_key = [None] * max_entries
+        self._free_slots = list(range(max_entries - 1, -1, -1))
+        self.hits = 0
+        self.semantic_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    # Internal helpers (call with the lock held)
+    def _drop(self, key):
+        slot = self._entries.pop(key)[2]
+        self._slot_context[slot] = -1
+        self._slot_key[slot] = None
+        self._free_slots.append(slot)
+
+    def _lookup(self, key, now, generation):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[1] <= now:
+            self._drop(key)
+            self.expirations += 1
+            return None
+        if entry[3] != generation:
+            self._drop(key)
+            self.invalidations += 1
+            return None
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def _semantic_lookup(self, prompt, prompt_vec, ctx, now, generation):
+        if self._vectors is None:
+            return None
+        candidates = np.flatnonzero(self._slot_context == hash(ctx))
+        if candidates.size == 0:
+            return None
+        sims = self._vectors[candidates] @ prompt_vec
+        best = int(np.argmax(sims))
+        if sims[best] < self.similarity_threshold:
+            return None
+        key = self._slot_key[candidates[best]]
+        if key is None or key[1] != ctx or meaning_tokens(key[0]) != meaning_tokens(prompt):
+            return None
+        return self._lookup(key, now, generation)
+
+    # Public API
+    def get(self, prompt, context=(), record=True):
+        """Cached answer or None; ``record=False`` keeps probes (e.g. prefetch checks) out of the stats."""
+        key = (normalize_prompt(prompt), tuple(context))
+        vec = self.embed_fn(key[0]) if self.embed_fn is not None else None
+        generation = self._generation()
+        with self._lock:
+            now = self._clock()
+            answer = self._lookup(key, now, generation)
+            if answer is not None:
+                self.hits += record
+                return answer
+            if vec is not None:
+                answer = self._semantic_lookup(key[0], vec, key[1], now, generation)
+                if answer is not None:
+                    self.semantic_hits += record
+                    return answer
+        if self.shared is not None:
+            value = self.shared.get("response", key)
+            if value is not None:
+                answer = value.decode("utf-8")
+                self._store(key, vec, answer)
+                with self._lock:
+                    self.shared_hits += record
+                return answer
+        with self._lock:
+            self.misses += record
+        return None
+
+    def put(self, prompt, context, answer):
+        key = (normalize_prompt(prompt), tuple(context))
+        vec = self.embed_fn(key[0]) if self.embed_fn is not None else None
+        self._store(key, vec, answer)
+        if self.shared is not None:
+            self.shared.set("response", key, answer.encode("utf-8"), self.ttl_seconds)
+
+    def _generation(self):
+        return self.shared.generation("response") if self.shared is not None else 0
+
+    def _store(self, key, vec, answer):
+        generation = self._generation()
+        with self._lock:
+            if key in self._entries:
+                self._drop(key)
+            while not self._free_slots:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free_slots.pop()
+            if vec is not None:
+                if self._vectors is None:
+                    self._vectors = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+                self._vectors[slot] = vec
+            self._slot_context[slot] = hash(key[1])
+            self._slot_key[slot] = key
+            self._entries[key] = (answer, self._clock() + self.ttl_seconds, slot, generation)
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._entries):
+                self._drop(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        with self._lock:
+            hits = self.hits + self.semantic_hits + self.shared_hits
+            lookups = hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "semantic_hits": self.semantic_hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
+
+
+def _default_cache():
+    # Exact matches only unless NUTRIX_SEMANTIC_CACHE=1: near-duplicate medical
+    # questions can need different answers
+    embed_fn = None
+    if os.getenv("NUTRIX_SEMANTIC_CACHE", "0") not in ("", "0", "false", "off"):
+        from embeddings import hash_embed
+        embed_fn = hash_embed
+    return ResponseCache(
+        max_entries=int(os.getenv("NUTRIX_CACHE_SIZE", "512")),
+        ttl_seconds=float(os.getenv("NUTRIX_CACHE_TTL", str(24 * 3600))),
+        embed_fn=embed_fn,
+        similarity_threshold=float(os.getenv("NUTRIX_CACHE_SIMILARITY", "0.95")),
+        shared=shared_cache if shared_cache.enabled else None,
+    )
+
+
+# One cache per process, shared by every Streamlit session.
+response_cache = _default_cache()
+registry.register_collector("nutrix_response_cache", response_cache.stats)
@@ -0,0 +1,296 @@
+# session_store.py
+# Pluggable store for chat turns and planner profiles, so sessions survive
+# reconnects and can be served by any app replica.
+#
+#   NUTRIX_SESSION_STORE=memory                   (default; this process only)
+#   NUTRIX_SESSION_STORE=sqlite:///data/sessions.db   (replicas on one host)
+#   NUTRIX_SESSION_STORE=redis://cache:6379/1         (replicas on several hosts; needs `redis`)
+#
+# SQLite's WAL mode relies on shared memory between the processes using the
+# database, so it is not safe on a network file system (NFS, SMB, EFS); keep
+# the SQLite file on a local disk and use Redis once replicas span hosts.
+#
+# Turns are append-only rows: each new message is one small INSERT and
+# nothing already stored is rewritten. Histories are read once per session.
+#
+# Storage is bounded like ChatHistory itself: every backend keeps only the
+# newest MAX_TURNS turns per conversation, and drops sessions nothing has been
+# written to for NUTRIX_SESSION_TTL seconds (default 30 days). The memory
+# store also keeps at most NUTRIX_SESSION_MAX sessions, evicting the least
+# recently written.
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from collections import OrderedDict, deque
+
+from chat_history import MAX_TURNS, ChatHistory
+
+COMPRESS_OVER = 512  # bytes; shorter texts aren't worth deflating
+SESSION_TTL = float(os.getenv("NUTRIX_SESSION_TTL", str(30 * 24 * 3600)))
+MAX_SESSIONS = int(os.getenv("NUTRIX_SESSION_MAX", "10000"))
+
+
+def new_session_id():
+    return uuid.uuid4().hex
+
+
+def _pack(text):
+    raw = text.encode("utf-8")
+    if len(raw) > COMPRESS_OVER:
+        return zlib.compress(raw, 6), 1
+    return raw, 0
+
+
+def _unpack(blob, compressed):
+    return (zlib.decompress(blob) if compressed else bytes(blob)).decode("utf-8")
+
+
+def _dump_profile(profile):
+    return json.dumps(profile, separators=(",", ":"), sort_keys=True)
+
+
+class _MemorySession:
+    def __init__(self):
+        self.turns = {}  # conversation -> deque of (speaker, text)
+        self.profile = None  # compact JSON
+        self.written_at = 0.0
+
+
+class MemorySessionStore:
+    def __init__(self, max_turns=MAX_TURNS, ttl_seconds=SESSION_TTL, max_sessions=MAX_SESSIONS,
+                 clock=time.monotonic):
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self.max_sessions = max_sessions
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._sessions = OrderedDict()  # session_id -> _MemorySession, least recently written first
+        self.evictions = 0
+
+    # Internal helpers (call with the lock held)
+    def _get(self, session_id):
+        session = self._sessions.get(session_id)
+        if session is not None and session.written_at <= self._clock() - self.ttl_seconds:
+            del self._sessions[session_id]
+            self.evictions += 1
+            return None
+        return session
+
+    def _written(self, session_id):
+        now = self._clock()
+        session = self._get(session_id) or _MemorySession()
+        session.written_at = now
+        self._sessions[session_id] = session
+        self._sessions.move_to_end(session_id)
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and oldest.written_at > now - self.ttl_seconds:
+                break
+            del self._sessions[oldest_id]
+            self.evictions += 1
+        return session
+
+    # Public API
+    def append_turn(self, session_id, conversation, speaker, text):
+        with self._lock:
+            turns = self._written(session_id).turns
+            turns.setdefault(conversation, deque(maxlen=self.max_turns)).append((speaker, text))
+
+    def load_turns(self, session_id, conversation):
+        with self._lock:
+            session = self._get(session_id)
+            return list(session.turns.get(conversation, ())) if session is not None else []
+
+    def clear_turns(self, session_id, conversation):
+        with self._lock:
+            session = self._get(session_id)
+            if session is not None:
+                session.turns.pop(conversation, None)
+
+    def save_profile(self, session_id, profile):
+        with self._lock:
+            self._written(session_id).profile = _dump_profile(profile)
+
+    def load_profile(self, session_id):
+        with self._lock:
+            session = self._get(session_id)
+            data = session.profile if session is not None else None
+        return json.loads(data) if data else None
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """SQLite-backed store (WAL mode) that replicas on the same host can open together (local disk only).
+
+    Each append trims the conversation to ``max_turns``; every PURGE_EVERY
+    writes, sessions idle for ``ttl_seconds`` are deleted.
+    """
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS turns (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        session_id TEXT NOT NULL,
+        conversation TEXT NOT NULL,
+        speaker TEXT NOT NULL,
+        body BLOB NOT NULL,
+        compressed INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE INDEX IF NOT EXISTS turns_by_session ON turns (session_id, conversation, id);
+    CREATE TABLE IF NOT EXISTS profiles (
+        session_id TEXT PRIMARY KEY,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS sessions (
+        session_id TEXT PRIMARY KEY,
+        written_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS sessions_by_age ON sessions (written_at);
+    """
+    PURGE_EVERY = 500
+
+    def __init__(self, path, max_turns=MAX_TURNS, ttl_seconds=SESSION_TTL, clock=time.time):
+        self.path = str(path)
+        self.max_turns = max_turns
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        # sqlite3 connections can't be shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _written(self, conn, session_id):
+        conn.execute("INSERT INTO sessions (session_id, written_at) VALUES (?, ?) "
+                     "ON CONFLICT(session_id) DO UPDATE SET written_at = excluded.written_at",
+                     (session_id, self._clock()))
+        self._writes += 1
+        if self._writes % self.PURGE_EVERY == 0:
+            self.purge(conn)
+
+    def purge(self, conn=None):
+        """Delete sessions with nothing written for ``ttl_seconds`` (and rows from before session tracking)."""
+        conn = conn or self._connect()
+        cutoff = self._clock() - self.ttl_seconds
+        with conn:
+            live = "SELECT session_id FROM sessions WHERE written_at > ?"
+            conn.execute(f"DELETE FROM turns WHERE session_id NOT IN ({live})", (cutoff,))
+            conn.execute(f"DELETE FROM profiles WHERE session_id NOT IN ({live})", (cutoff,))
+            conn.execute("DELETE FROM sessions WHERE written_at <= ?", (cutoff,))
+
+    def append_turn(self, session_id, conversation, speaker, text):
+        body, compressed = _pack(text)
+        with self._connect() as conn:
+            conn.execute("INSERT INTO turns (session_id, conversation, speaker, body, compressed) "
+                         "VALUES (?, ?, ?, ?, ?)", (session_id, conversation, speaker, body, compressed))
+            # Keep the newest max_turns rows (an index range scan on turns_by_session)
+            conn.execute("DELETE FROM turns WHERE session_id = ? AND conversation = ? AND id <= "
+                         "(SELECT id FROM turns WHERE session_id = ? AND conversation = ? "
+                         "ORDER BY id DESC LIMIT 1 OFFSET ?)",
+                         (session_id, conversation, session_id, conversation, self.max_turns))
+            self._written(conn, session_id)
+
+    def load_turns(self, session_id, conversation):
+        rows = self._connect().execute(
+            "SELECT speaker, body, compressed FROM turns WHERE session_id = ? AND conversation = ? ORDER BY id",
+            (session_id, conversation)).fetchall()
+        return [(speaker, _unpack(body, compressed)) for speaker, body, compressed in rows]
+
+    def clear_turns(self, session_id, conversation):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM turns WHERE session_id = ? AND conversation = ?", (session_id, conversation))
+
+    def save_profile(self, session_id, profile):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO profiles (session_id, data) VALUES (?, ?) "
+                         "ON CONFLICT(session_id) DO UPDATE SET data = excluded.data",
+                         (session_id, _dump_profile(profile)))
+            self._written(conn, session_id)
+
+    def load_profile(self, session_id):
+        row = self._connect().execute("SELECT data FROM profiles WHERE session_id = ?", (session_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class RedisSessionStore:
+    """Any Redis-compatible server; turns are one list per conversation. ``redis`` is imported on use.
+
+    Lists are trimmed to ``max_turns`` on append, and every write renews a
+    ``ttl_seconds`` expiry, so idle sessions expire on the server.
+    """
+
+    def __init__(self, url, max_turns=MAX_TURNS, ttl_seconds=SESSION_TTL):
+        import redis
+        self._client = redis.Redis.from_url(url, socket_timeout=2.0, socket_connect_timeout=2.0)
+        self.max_turns = max_turns
+        self.ttl_seconds = int(ttl_seconds)
+
+    @staticmethod
+    def _turns_key(session_id, conversation):
+        return f"nutrix:turns:{session_id}:{conversation}"
+
+    def append_turn(self, session_id, conversation, speaker, text):
+        body, compressed = _pack(text)
+        record = json.dumps([speaker, compressed]).encode("utf-8") + b"\n" + body
+        key = self._turns_key(session_id, conversation)
+        pipe = self._client.pipeline()
+        pipe.rpush(key, record)
+        pipe.ltrim(key, -self.max_turns, -1)
+        pipe.expire(key, self.ttl_seconds)
+        pipe.execute()
+
+    def load_turns(self, session_id, conversation):
+        turns = []
+        for record in self._client.lrange(self._turns_key(session_id, conversation), 0, -1):
+            header, body = record.split(b"\n", 1)
+            speaker, compressed = json.loads(header)
+            turns.append((speaker, _unpack(body, compressed)))
+        return turns
+
+    def clear_turns(self, session_id, conversation):
+        self._client.delete(self._turns_key(session_id, conversation))
+
+    def save_profile(self, session_id, profile):
+        self._client.set(f"nutrix:profile:{session_id}", _dump_profile(profile), ex=self.ttl_seconds)
+
+    def load_profile(self, session_id):
+        data = self._client.get(f"nutrix:profile:{session_id}")
+        return json.loads(data) if data else None
+
+
+def open_store(url=None):
+    url = url or os.getenv("NUTRIX_SESSION_STORE", "memory")
+    if url == "memory":
+        return MemorySessionStore()
+    if url.startswith("sqlite:///"):
+        return SQLiteSessionStore(url[len("sqlite:///"):])
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisSessionStore(url)
+    raise ValueError(f"Unknown session store: {url!r} (use 'memory', 'sqlite:///path.db' or 'redis://host')")
+
+
+def load_history(store, session_id, conversation, **kwargs):
+    """Rebuild a ChatHistory from stored turns; later appends are written through to ``store``."""
+    history = ChatHistory(**kwargs)
+    for speaker, text in store.load_turns(session_id, conversation):
+        history.append(speaker, text)
+    history.on_append = lambda speaker, text: store.append_turn(session_id, conversation, speaker, text)
+    return history
+
+
+# One store per process, shared by every Streamlit session.
+session_store = open_store()
@@ -0,0 +1,290 @@
+# shared_cache.py
+# Cache tier shared by every replica: Streamlit app processes and API workers,
+# on one host or across nodes.
+#
+#   NUTRIX_SHARED_CACHE=off                                  (default; per-process caches only)
+#   NUTRIX_SHARED_CACHE=sqlite:///data/cache.db              (replicas on one host only)
+#   NUTRIX_SHARED_CACHE=redis://cache:6379/0                 (any Redis-compatible server; needs `redis`)
+#   NUTRIX_SHARED_CACHE=redis://a:6379/0,redis://b:6379/0    (keys spread over nodes by consistent hashing)
+#
+# The in-process caches (response_cache, planner, asset_cache) stay in front
+# as the first level; this tier is consulted on their misses and written
+# through on fills. Values are bytes. Keys are a blake2b digest of the
+# namespace, its generation and a canonical JSON encoding of the key, so
+# every process derives the same key (Python's hash() is salted per process).
+#
+# SQLite's WAL mode needs shared memory between its processes, so it does not
+# work on a network file system (NFS, SMB, EFS): for replicas on several
+# hosts use Redis.
+#
+# invalidate(namespace) bumps the namespace's generation, stored in the tier
+# itself. The in-process caches in front compare each hit against
+# generation(namespace), so every replica stops serving the old entries,
+# from the tier and from its own memory, within GENERATION_TTL seconds;
+# the stale entries then age out. Tier errors count as misses.
+import argparse
+import bisect
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from instrumentation import registry
+
+GENERATION_TTL = float(os.getenv("NUTRIX_SHARED_CACHE_GENERATION_TTL", "2"))  # seconds
+DEFAULT_TTL = 24 * 3600
+NAMESPACES = ("response", "plan", "asset")
+
+
+def stable_digest(*parts):
+    """Same hex digest in every process for JSON-encodable ``parts`` (tuples encode as lists)."""
+    raw = json.dumps(parts, separators=(",", ":"), sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+# -------------------------
+# Backends
+# -------------------------
+class SQLiteTier:
+    """Entries in one SQLite table (WAL mode); expired rows are purged every few hundred writes."""
+
+    SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS counters (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL
+    );
+    """
+    PURGE_EVERY = 500
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.name = f"sqlite:///{self.path}"
+        self._local = threading.local()
+        self._writes = 0
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connect().execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[1] <= time.time():
+            return None
+        return bytes(row[0])
+
+    def set(self, key, value, ttl):
+        with self._connect() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+                         (key, value, time.time() + ttl))
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),))
+
+    def delete(self, key):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def counter(self, key):
+        row = self._connect().execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else 0
+
+    def incr(self, key):
+        with self._connect() as conn:
+            conn.execute("INSERT INTO counters (key, value) VALUES (?, 1) "
+                         "ON CONFLICT(key) DO UPDATE SET value = value + 1", (key,))
+            return conn.execute("SELECT value FROM counters WHERE key = ?", (key,)).fetchone()[0]
+
+
+class RedisTier:
+    """Any Redis-compatible server (Redis, Valkey, KeyDB, ...); the ``redis`` package is imported on use."""
+
+    def __init__(self, url):
+        import redis
+        self.name = url
+        self._client = redis.Redis.from_url(url, socket_timeout=1.0, socket_connect_timeout=1.0)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=max(1, int(ttl)))
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def counter(self, key):
+        return int(self._client.get(key) or 0)
+
+    def incr(self, key):
+        return int(self._client.incr(key))
+
+
+class HashRing:
+    """Consistent hashing over tier nodes: adding or removing a node only remaps ~1/N of the keys."""
+
+    def __init__(self, nodes, vnodes=160):
+        self.nodes = list(nodes)
+        points = sorted((int(stable_digest(node.name, i)[:16], 16), n)
+                        for n, node in enumerate(self.nodes) for i in range(vnodes))
+        self._points = [p for p, _ in points]
+        self._owners = [n for _, n in points]
+
+    def node_for(self, key):
+        i = bisect.bisect(self._points, int(key[:16], 16)) % len(self._points)
+        return self.nodes[self._owners[i]]
+
+
+# -------------------------
+# Cache front
+# -------------------------
+class SharedCache:
+    def __init__(self, nodes=()):
+        self.ring = HashRing(nodes) if nodes else None
+        self._lock = threading.Lock()
+        self._generations = {}  # namespace -> (generation, fetched_at)
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+        self.errors = 0
+
+    @property
+    def enabled(self):
+        return self.ring is not None
+
+    def _generation(self, namespace):
+        now = time.monotonic()
+        with self._lock:
+            cached = self._generations.get(namespace)
+        if cached is not None and now - cached[1] < GENERATION_TTL:
+            return cached[0]
+        generation = self.ring.node_for(stable_digest("generation", namespace)).counter(f"nutrix:gen:{namespace}")
+        with self._lock:
+            self._generations[namespace] = (generation, now)
+        return generation
+
+    def generation(self, namespace):
+        """Current generation of ``namespace`` (0 with the tier off; the last known one if it fails)."""
+        if not self.enabled:
+            return 0
+        try:
+            return self._generation(namespace)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+                cached = self._generations.get(namespace)
+            return cached[0] if cached else 0
+
+    def key_for(self, namespace, key):
+        return f"nutrix:{namespace}:{stable_digest(namespace, self._generation(namespace), key)}"
+
+    def get(self, namespace, key):
+        """Cached bytes for ``key`` in ``namespace``, or None (also when the tier is off or failing)."""
+        if not self.enabled:
+            return None
+        try:
+            full = self.key_for(namespace, key)
+            value = self.ring.node_for(full.rsplit(":", 1)[1]).get(full)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def set(self, namespace, key, value, ttl=DEFAULT_TTL):
+        if not self.enabled:
+            return
+        try:
+            full = self.key_for(namespace, key)
+            self.ring.node_for(full.rsplit(":", 1)[1]).set(full, value, ttl)
+        except Exception:
+            with self._lock:
+                self.errors += 1
+            return
+        with self._lock:
+            self.sets += 1
+
+    def get_json(self, namespace, key):
+        value = self.get(namespace, key)
+        return None if value is None else json.loads(value)
+
+    def set_json(self, namespace, key, value, ttl=DEFAULT_TTL):
+        if self.enabled:
+            self.set(namespace, key, json.dumps(value, separators=(",", ":")).encode("utf-8"), ttl)
+
+    def invalidate(self, namespace):
+        """Drop every entry in ``namespace`` for all replicas (their in-process caches
+        included, within GENERATION_TTL); returns the new generation."""
+        if not self.enabled:
+            return 0
+        generation = self.ring.node_for(stable_digest("generation", namespace)).incr(f"nutrix:gen:{namespace}")
+        with self._lock:
+            self._generations[namespace] = (generation, time.monotonic())
+        return generation
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"enabled": int(self.enabled), "nodes": len(self.ring.nodes) if self.enabled else 0,
+                    "hits": self.hits, "misses": self.misses, "sets": self.sets, "errors": self.errors,
+                    "hit_rate": self.hits / lookups if lookups else 0.0}
+
+
+def open_shared_cache(url=None):
+    url = url or os.getenv("NUTRIX_SHARED_CACHE", "off")
+    if url in ("", "0", "off", "false"):
+        return SharedCache()
+    nodes = []
+    for part in url.split(","):
+        part = part.strip()
+        if part.startswith("sqlite:///"):
+            nodes.append(SQLiteTier(part[len("sqlite:///"):]))
+        elif part.startswith(("redis://", "rediss://", "unix://")):
+            nodes.append(RedisTier(part))
+        else:
+            raise ValueError(f"Unknown shared cache: {part!r} (use 'off', 'sqlite:///path.db' or 'redis://host')")
+    return SharedCache(nodes)
+
+
+# One client per process; the data itself lives in the tier.
+shared_cache = open_shared_cache()
+registry.register_collector("nutrix_shared_cache", shared_cache.stats)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or invalidate the shared cache tier.")
+    parser.add_argument("--url", default=None, help="tier URL (default: $NUTRIX_SHARED_CACHE)")
+    sub = parser.add_subparsers(dest="command", required=True)
+    inv = sub.add_parser("invalidate", help="drop every entry in the given namespaces")
+    inv.add_argument("namespaces", nargs="+", choices=NAMESPACES)
+    sub.add_parser("generations", help="show each namespace's generation")
+    args = parser.parse_args(argv)
+
+    cache = open_shared_cache(args.url) if args.url else shared_cache
+    if not cache.enabled:
+        parser.error("no shared cache configured (set NUTRIX_SHARED_CACHE or --url)")
+    for ns in (args.namespaces if args.command == "invalidate" else NAMESPACES):
+        generation = cache.invalidate(ns) if args.command == "invalidate" else cache._generation(ns)
+        print(f"{ns}: generation {generation}")
+
+
+if __name__ == "__main__":
+    main()
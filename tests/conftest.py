@@ -0,0 +1,25 @@
+# Tests import the app modules from the repository root, offline (fake Gemini, no shared tier).
+import os
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ["NUTRIX_FAKE_GEMINI"] = "1"
+os.environ.setdefault("NUTRIX_SHARED_CACHE", "off")
+
+
+class FakeClock:
+    """Injectable clock: call it for the time, move ``now`` to travel."""
+
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
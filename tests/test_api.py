@@ -0,0 +1,119 @@
+# API input validation (400) and upstream failures (502), streamed or not.
+import asyncio
+import json
+
+import pytest
+
+import api
+import gemini_client
+from gemini_client import FakeModel
+from response_cache import ResponseCache
+
+
+def call(method, path, body=None):
+    """(status, headers, body bytes) of one request, driven straight through the ASGI app."""
+    async def run():
+        raw = body if isinstance(body, bytes) else json.dumps(body).encode() if body is not None else b""
+        requests = [{"type": "http.request", "body": raw, "more_body": False}]
+        sent = []
+
+        async def receive():
+            if requests:
+                return requests.pop()
+            await asyncio.Event().wait()  # the client never disconnects
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+                 "scheme": "http", "path": path, "raw_path": path.encode(), "query_string": b"",
+                 "root_path": "", "headers": [(b"content-type", b"application/json")],
+                 "server": ("test", 80), "client": ("test", 1234)}
+        await api.app(scope, receive, send)
+        return sent
+    sent = asyncio.run(run())
+    start = next(m for m in sent if m["type"] == "http.response.start")
+    headers = {k.decode(): v.decode() for k, v in start["headers"]}
+    return start["status"], headers, b"".join(m.get("body", b"") for m in sent if m["type"] == "http.response.body")
+
+
+class BrokenModel(FakeModel):
+    def generate_content(self, contents, stream=False, **kwargs):
+        raise ValueError("model unavailable")
+
+
+@pytest.fixture
+def model(monkeypatch):
+    """Fresh response cache and a fake model with no delay; set ``.broken = True`` to make it fail."""
+    state = type("State", (), {"broken": False})()
+
+    def factory(name, cfg):
+        return (BrokenModel if state.broken else FakeModel)(name, first_token_delay=0, chunk_delay=0)
+    monkeypatch.setattr(gemini_client, "model_pool", gemini_client.ModelPool(factory=factory))
+    monkeypatch.setattr(api, "response_cache", ResponseCache())
+    return state
+
+
+CHAT = {"query": "what should I eat for breakfast", "issue": "Diabetes", "meal_pref": "Vegan",
+        "goal": "Maintain", "activity_level": "Active"}
+
+
+@pytest.mark.parametrize("field, value", [("issue", ["Diabetes"]), ("issue", "Gout"), ("meal_pref", "Keto"),
+                                          ("goal", 3), ("activity_level", {"x": 1}), ("query", "")])
+def test_chat_rejects_values_outside_the_choices(model, field, value):
+    status, _, body = call("POST", "/v1/chat", dict(CHAT, **{field: value}))
+    assert status == 400
+    assert field in json.loads(body)["error"]
+
+
+def test_chat_answers_then_serves_from_cache(model):
+    status, _, body = call("POST", "/v1/chat", CHAT)
+    assert status == 200 and not json.loads(body)["cached"]
+    status, _, body = call("POST", "/v1/chat", dict(CHAT, query="What should I eat for breakfast?"))
+    assert status == 200 and json.loads(body)["cached"]
+
+
+def test_chat_defaults_match_the_chat_page(model):
+    status, _, _ = call("POST", "/v1/chat", {"query": "is rice ok at night"})
+    assert status == 200
+
+
+def test_streamed_chat(model):
+    status, headers, body = call("POST", "/v1/chat", dict(CHAT, stream=True))
+    assert status == 200 and headers["x-nutrix-cache"] == "miss"
+    assert body.decode().startswith("(offline answer)")
+    status, headers, cached = call("POST", "/v1/chat", dict(CHAT, stream=True))
+    assert headers["x-nutrix-cache"] == "hit" and cached == body
+
+
+@pytest.mark.parametrize("path, payload", [("/v1/chat", CHAT), ("/v1/doctor", {"doc_type": "Ayurvedic",
+                                                                               "question": "headache"})])
+@pytest.mark.parametrize("stream", [False, True])
+def test_upstream_failures_map_to_502(model, path, payload, stream):
+    model.broken = True
+    status, _, body = call("POST", path, dict(payload, stream=stream))
+    assert status == 502
+    assert "model unavailable" in json.loads(body)["error"]
+
+
+@pytest.mark.parametrize("path, payload", [
+    ("/v1/bmi", {"weight": "70", "height": 170}),
+    ("/v1/bmi", {"weight": 70, "height": 0}),
+    ("/v1/meal-plan", {"meal_pref": "Keto", "goal": "Maintain"}),
+    ("/v1/meal-plan", {"meal_pref": "Vegan", "goal": "Maintain", "revision": -1}),
+    ("/v1/report", {"age": 30, "height": 170, "weight": 70, "activity_level": "Active", "meal_pref": "Vegan",
+                    "goal": "Maintain", "stress_level": "Extreme"}),
+    ("/v1/doctor", {"doc_type": "Surgeon", "question": "headache"}),
+])
+def test_bad_input_is_a_400(model, path, payload):
+    assert call("POST", path, payload)[0] == 400
+
+
+def test_body_must_be_a_json_object(model):
+    assert call("POST", "/v1/bmi", b"not json")[0] == 400
+    assert call("POST", "/v1/bmi", [1, 2])[0] == 400
+
+
+def test_meal_plan(model):
+    status, _, body = call("POST", "/v1/meal-plan", {"meal_pref": "Vegan", "goal": "Maintain", "week": 202601})
+    assert status == 200 and len(json.loads(body)["meal_plan"]) == 7
@@ -0,0 +1,58 @@
+# Debug panel gate and page timing in the Streamlit app.
+from pathlib import Path
+
+import pytest
+from streamlit.testing.v1 import AppTest
+
+from instrumentation import registry
+
+APP = str(Path(__file__).resolve().parent.parent / "app.py")
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.delenv("NUTRIX_DEBUG", raising=False)
+    monkeypatch.delenv("NUTRIX_DEBUG_TOKEN", raising=False)
+    monkeypatch.delenv("NUTRIX_API_URL", raising=False)
+    return AppTest.from_file(APP, default_timeout=60)
+
+
+def has_debug_toggle(at):
+    return any(box.key == "debug_panel" for box in at.sidebar.checkbox)
+
+
+def test_debug_panel_is_off_by_default_and_ignores_guessable_values(app):
+    app.query_params["debug"] = "1"
+    app.run()
+    assert not app.exception and not has_debug_toggle(app)
+
+
+def test_debug_panel_needs_the_exact_token(app, monkeypatch):
+    monkeypatch.setenv("NUTRIX_DEBUG_TOKEN", "s3cret-token")
+    app.query_params["debug"] = "s3cret"
+    app.run()
+    assert not has_debug_toggle(app)
+
+    app.query_params["debug"] = "s3cret-token"
+    app.run()
+    assert has_debug_toggle(app)
+    app.sidebar.checkbox(key="debug_panel").check().run()
+    assert not app.exception
+    assert any(e.label.startswith("🛠 Debug") for e in app.expander)
+
+
+def test_nutrix_debug_turns_it_on_for_everyone(app, monkeypatch):
+    monkeypatch.setenv("NUTRIX_DEBUG", "1")
+    app.run()
+    assert has_debug_toggle(app)
+
+
+def test_page_span_is_recorded_when_the_page_stops_early(app):
+    app.run()
+    app.sidebar.radio(key="main_navigation").set_value("Health Planner")
+    app.session_state["hp_report_error"] = "upstream down"
+    registry.recent.clear()
+    app.run()
+    assert any("upstream down" in e.value for e in app.error)
+    pages = [s for s in registry.recent if s["span"] == "page"]
+    assert [s["page"] for s in pages] == ["Health Planner"]
@@ -0,0 +1,81 @@
+# Asset cache: images decoded and resized once, bounded by encoded bytes, refreshed when the file changes.
+import io
+import os
+
+import numpy as np
+import pytest
+from PIL import Image
+
+from asset_cache import AssetCache
+from shared_cache import SharedCache, SQLiteTier
+
+
+def write_image(path, size=(400, 200), seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, size[::-1] + (3,), dtype=np.uint8)
+    Image.fromarray(pixels).save(path, format="PNG")
+    return path
+
+
+def decoded_size(data):
+    with Image.open(io.BytesIO(data)) as img:
+        return img.size
+
+
+@pytest.fixture
+def images(tmp_path):
+    return [write_image(tmp_path / f"img{i}.png", seed=i) for i in range(4)]
+
+
+def test_images_are_scaled_down_but_never_up(images):
+    cache = AssetCache()
+    assert decoded_size(cache.get(images[0], 100)) == (100, 50)
+    assert decoded_size(cache.get(images[0], 1000)) == (400, 200)
+    assert decoded_size(cache.get(images[0])) == (400, 200)
+    assert cache.get(images[0], 100) == cache.get(images[0], 100)
+    stats = cache.stats()
+    assert (stats["misses"], stats["hits"], stats["entries"]) == (3, 2, 3)
+
+
+def test_evicts_least_recently_used_to_stay_under_max_bytes(images):
+    size = len(AssetCache().get(images[0], 100))
+    cache = AssetCache(max_bytes=int(size * 2.5))
+    cache.get(images[0], 100)
+    cache.get(images[1], 100)
+    cache.get(images[0], 100)  # images[1] is now the oldest
+    cache.get(images[2], 100)
+    stats = cache.stats()
+    assert stats["evictions"] == 1 and stats["entries"] == 2 and stats["bytes"] <= cache.max_bytes
+    cache.get(images[0], 100)
+    assert cache.stats()["hits"] == 2
+    cache.get(images[1], 100)
+    assert cache.stats()["misses"] == 4
+
+
+def test_a_single_oversized_image_is_still_served(images):
+    cache = AssetCache(max_bytes=10)
+    assert cache.get(images[0], 100)
+    assert cache.stats()["entries"] == 1
+
+
+def test_edited_files_are_decoded_again(images):
+    cache = AssetCache()
+    before = cache.get(images[0], 100)
+    write_image(images[0], seed=99)
+    stat = os.stat(images[0])
+    os.utime(images[0], ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    assert cache.get(images[0], 100) != before
+    assert cache.stats()["misses"] == 2
+
+
+def test_warm_skips_missing_files(images, tmp_path):
+    cache = AssetCache()
+    cache.warm([(images[0], 100), (tmp_path / "missing.png", 100), (images[1], None)])
+    assert cache.stats()["entries"] == 2
+
+
+def test_replicas_share_decoded_images(images, tmp_path, monkeypatch):
+    tier = SharedCache([SQLiteTier(tmp_path / "cache.db")])
+    first, second = AssetCache(shared=tier), AssetCache(shared=tier)
+    data = first.get(images[0], 100)
+    monkeypatch.setattr(second, "_encode", lambda *args: pytest.fail("decoded twice"))
+    assert second.get(images[0], 100) == data
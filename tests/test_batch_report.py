@@ -0,0 +1,87 @@
+# Batch reports: invalid rows go to the rejects file and the rest of the batch still runs.
+import csv
+import json
+
+import pytest
+
+import batch_report
+import planner
+
+HEADER = ["id", "age", "height", "weight", "activity_level", "meal_pref", "goal", "sex"]
+GOOD = ["a1", "30", "170", "70", "Sedentary", "Vegan", "Maintain", "Female"]
+
+
+@pytest.fixture(autouse=True)
+def default_seed():
+    yield
+    planner.seed_plans(None)
+
+
+def write_csv(path, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        csv.writer(f).writerows([HEADER] + rows)
+    return str(path)
+
+
+def read_jsonl(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+@pytest.mark.parametrize("field, value, error", [
+    ("age", "", "'age' must be a number"),
+    ("height", "tall", "'height' must be a number"),
+    ("weight", "-5", "'weight' must be positive"),
+    ("weight", "nan", "'weight' must be positive"),
+    ("activity_level", "Couch", "'activity_level' must be one of"),
+    ("meal_pref", "Keto", "'meal_pref' must be one of"),
+    ("goal", "Bulk", "'goal' must be one of"),
+])
+def test_row_error_names_the_bad_field(field, value, error):
+    row = dict(zip(HEADER, GOOD), **{field: value})
+    assert batch_report.row_error(row).startswith(error)
+
+
+def test_row_error_accepts_valid_rows_and_checks_sex_only_for_target_plans():
+    row = dict(zip(HEADER, GOOD), sex="Robot")
+    assert batch_report.row_error(row) is None
+    assert batch_report.row_error(row, "target").startswith("'sex' must be one of")
+    assert batch_report.row_error("{not json") == "not a JSON object"
+
+
+def test_run_writes_rejects_and_keeps_going(tmp_path):
+    bad_age = ["b2"] + ["old"] + GOOD[2:]
+    bad_goal = GOOD[:6] + ["Bulk", ""]
+    source = write_csv(tmp_path / "members.csv", [GOOD, bad_age, GOOD[:1] + ["41"] + GOOD[2:], bad_goal])
+    out = tmp_path / "reports.jsonl"
+
+    reports, rejected, _ = batch_report.run(source, str(out), workers=1, chunk_size=2)
+    assert (reports, rejected) == (2, 2)
+    assert [r["id"] for r in read_jsonl(out)] == ["a1", "a1"]
+    rejects = read_jsonl(tmp_path / "reports.rejects.jsonl")
+    assert [r["row"] for r in rejects] == [1, 3]
+    assert rejects[0]["error"] == "'age' must be a number" and rejects[0]["input"]["id"] == "b2"
+
+
+def test_unparseable_json_lines_are_rejected(tmp_path):
+    source = tmp_path / "members.jsonl"
+    good = dict(zip(HEADER, GOOD))
+    del good["id"]
+    source.write_text(json.dumps(good) + "\n{broken\n\n" + json.dumps(good) + "\n", encoding="utf-8")
+    out, rejects_path = tmp_path / "reports.csv", tmp_path / "bad.jsonl"
+
+    reports, rejected, _ = batch_report.run(str(source), str(out), workers=1, plan_mode="target",
+                                            rejects_path=str(rejects_path))
+    assert (reports, rejected) == (2, 1)
+    with open(out, newline="", encoding="utf-8") as f:
+        rows = list(csv.DictReader(f))
+    assert [r["id"] for r in rows] == ["0", "2"]  # default id: the input row number
+    assert all(r["kcal_target"] and r["on_target"] in ("True", "False") for r in rows)
+    assert read_jsonl(rejects_path) == [{"row": 1, "error": "not a JSON object", "input": "{broken"}]
+
+
+def test_main_reports_rejected_rows(tmp_path, capsys):
+    source = write_csv(tmp_path / "members.csv", [GOOD, GOOD[:4] + ["Couch"] + GOOD[5:]])
+    batch_report.main([source, "-o", str(tmp_path / "out.jsonl"), "--workers", "1"])
+    err = capsys.readouterr().err
+    assert err.startswith("1 rows in ") and "1 invalid rows skipped" in err
@@ -0,0 +1,81 @@
+# ChatHistory: older turns fold into a summary so the model context stays within budget.
+from chat_history import ChatHistory, estimate_tokens, extractive_summary
+
+
+def recent_part(history):
+    context = history.context()
+    return context.split("Recent conversation:\n", 1)[1] if "Recent conversation:" in context else ""
+
+
+def long_chat(history, turns=20):
+    for i in range(turns):
+        history.append("You" if i % 2 == 0 else "NutriX", f"Message number {i}. " + "detail " * 5)
+
+
+def test_context_stays_within_budget():
+    history = ChatHistory(token_budget=60, summary_tokens=20)
+    long_chat(history)
+    assert len(history) == 20  # all turns kept for display
+    assert history.summary
+    assert estimate_tokens(recent_part(history)) <= history.token_budget
+    assert estimate_tokens(history.context()) <= history.token_budget + history.summary_tokens + 20
+
+
+def test_old_turns_move_to_the_summary_and_new_ones_stay_verbatim():
+    history = ChatHistory(token_budget=60, summary_tokens=20)
+    long_chat(history)
+    recent = recent_part(history)
+    assert "Message number 19. detail" in recent
+    assert "Message number 0." not in recent
+    assert "Message number" in history.summary and "detail" not in history.summary  # first sentences only
+    folded = [text for _, text in history if text not in recent]
+    assert folded and all(text.startswith("Message number") for text in folded)
+
+
+def test_short_chat_is_not_summarized():
+    history = ChatHistory(token_budget=1000)
+    history.append("You", "hi")
+    history.append("NutriX", "hello")
+    assert history.summary == ""
+    assert history.context() == "Recent conversation:\nYou: hi\nNutriX: hello"
+
+
+def test_newest_turn_is_always_verbatim_and_turns_are_capped():
+    history = ChatHistory(token_budget=10, max_turns=5)
+    for i in range(8):
+        history.append("You", f"turn {i}")
+    history.append("You", "x" * 400)  # over budget on its own
+    assert len(history) == 5
+    assert list(history)[-1] == ("You", "x" * 400)
+    assert history.context().endswith("You: " + "x" * 400)
+
+
+def test_custom_summarizer_and_append_hook():
+    seen, calls = [], []
+
+    def summarize(summary, turns, max_tokens):
+        calls.append(len(turns))
+        return f"{summary}+{len(turns)}"
+
+    history = ChatHistory(token_budget=20, summarize_fn=summarize)
+    history.on_append = lambda speaker, text: seen.append(speaker)
+    long_chat(history, 6)
+    assert seen == ["You", "NutriX"] * 3
+    assert calls and history.summary == "+" + "+".join(map(str, calls))
+
+
+def test_extractive_summary_is_trimmed_from_the_front():
+    summary = extractive_summary("", [("You", "First sentence. Second."), ("NutriX", "Reply here! More.")], 300)
+    assert summary == "You: First sentence.\nNutriX: Reply here!"
+    assert len(extractive_summary("x" * 1000, [("You", "end.")], max_tokens=10)) == 40
+
+
+def test_prompt_tokens_and_paging():
+    history = ChatHistory(max_turns=10)
+    for i in range(7):
+        history.append("You", f"turn {i}")
+    prompt = history.build_prompt("What now?")
+    assert prompt.endswith("What now?") and history.prompt_tokens == [estimate_tokens(prompt)]
+    assert history.page_count(3) == 3
+    assert history.page(1, 3) == [("You", f"turn {i}") for i in (4, 5, 6)]
+    assert history.page(3, 3) == [("You", "turn 0")]
@@ -0,0 +1,91 @@
+# "Compare all doctors": personas stream concurrently; timeouts and cancellation stop the stragglers.
+import threading
+import time
+
+from consultation import consult_all
+
+PERSONAS = ["Homeopathic", "Ayurvedic", "Allopathic"]
+
+
+class FakeStreams:
+    """``open_stream`` stand-in: per-persona chunks with a delay; records which streams were closed."""
+
+    def __init__(self, chunks, delay=0.01, fail=None):
+        self.chunks, self.delay, self.fail = chunks, delay, fail or {}
+        self.closed = set()
+        self.lock = threading.Lock()
+
+    def __call__(self, persona, stats):
+        if persona in self.fail:
+            raise self.fail[persona]
+        return self._stream(persona)
+
+    def _stream(self, persona):
+        try:
+            for text in self.chunks[persona]:
+                time.sleep(self.delay)
+                yield text
+        finally:
+            with self.lock:
+                self.closed.add(persona)
+
+
+def final(updates):
+    answers = None
+    for answers in updates:
+        pass
+    return answers
+
+
+def test_every_persona_answers_concurrently():
+    streams = FakeStreams({p: [f"{p} ", "says ", "hi"] for p in PERSONAS}, delay=0.05)
+    start = time.perf_counter()
+    answers = final(consult_all("q", personas=PERSONAS, open_stream=streams))
+    assert time.perf_counter() - start < 3 * 3 * 0.05  # not one persona after the other
+    assert {p: (a.status, a.text) for p, a in answers.items()} == {p: ("done", f"{p} says hi") for p in PERSONAS}
+
+
+def test_a_failing_persona_does_not_stop_the_others():
+    boom = ConnectionError("upstream down")
+    streams = FakeStreams({p: ["ok"] for p in PERSONAS}, fail={"Ayurvedic": boom})
+    answers = final(consult_all("q", personas=PERSONAS, open_stream=streams))
+    assert answers["Ayurvedic"].status == "error" and answers["Ayurvedic"].error is boom
+    assert [answers[p].status for p in ("Homeopathic", "Allopathic")] == ["done", "done"]
+
+
+def test_slow_personas_time_out_and_their_workers_stop():
+    chunks = {p: ["ok"] for p in PERSONAS}
+    chunks["Allopathic"] = ["slow"] * 1000
+    streams = FakeStreams(chunks, delay=0.02)
+    start = time.perf_counter()
+    answers = final(consult_all("q", personas=PERSONAS, open_stream=streams, timeout=0.3))
+    assert time.perf_counter() - start < 1.0
+    assert answers["Allopathic"].status == "timeout" and answers["Allopathic"].text.startswith("slow")
+    assert answers["Homeopathic"].status == "done"
+    deadline = time.monotonic() + 2
+    while "Allopathic" not in streams.closed and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "Allopathic" in streams.closed
+
+
+def test_cancel_event_stops_every_unfinished_persona():
+    streams = FakeStreams({p: ["x"] * 1000 for p in PERSONAS}, delay=0.01)
+    cancel = threading.Event()
+    updates = consult_all("q", personas=PERSONAS, open_stream=streams, cancel=cancel)
+    next(updates)
+    cancel.set()
+    answers = final(updates)
+    assert {a.status for a in answers.values()} == {"cancelled"}
+    assert all(a.finished for a in answers.values())
+
+
+def test_closing_the_generator_cancels_the_workers():
+    streams = FakeStreams({p: ["x"] * 1000 for p in PERSONAS}, delay=0.01)
+    updates = consult_all("q", personas=PERSONAS, open_stream=streams)
+    answers = next(updates)
+    updates.close()  # e.g. a Streamlit rerun
+    assert {a.status for a in answers.values()} == {"cancelled"}
+    deadline = time.monotonic() + 2
+    while len(streams.closed) < len(PERSONAS) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert streams.closed == set(PERSONAS)
@@ -0,0 +1,57 @@
+# Food table: name lookup (exact, prefix, fuzzy), mentions in free text, and portion scaling.
+import numpy as np
+import pytest
+
+from food_db import NUTRIENTS, FoodStore, foods, format_nutrients
+
+
+@pytest.fixture
+def store():
+    names = ["Poha", "Poha with boiled egg", "Paneer tikka", "Palak paneer", "Oats porridge"]
+    values = [[250, 6, 45, 5, 3, 300], [350, 14, 46, 11, 3, 420], [300, 18, 8, 22, 2, 500],
+              [280, 14, 10, 20, 4, 450], [200, 7, 34, 4, 5, 80]]
+    return FoodStore(names, values)
+
+
+def test_get_ignores_case_and_punctuation(store):
+    assert store.get("PANEER-tikka!") == 2
+    assert store.get("paneer") is None
+
+
+def test_prefix_matches_come_first(store):
+    hits = store.search("poha", limit=2)
+    assert [store.name[i] for i, _ in hits] == ["Poha", "Poha with boiled egg"]
+    assert all(score == 1.0 for _, score in hits)
+
+
+def test_fuzzy_search_tolerates_typos(store):
+    (best, score), *_ = store.search("panner tika")
+    assert store.name[best] == "Paneer tikka" and 0.3 <= score < 1.0
+    assert store.search("xyzzy") == [] and store.search("  ") == []
+    assert len(store.search("p", limit=3)) == 3
+
+
+def test_mentioned_in_prefers_the_longest_name(store):
+    text = "I had poha with boiled egg and some palak paneer for lunch"
+    assert [store.name[i] for i in store.mentioned_in(text)] == ["Poha with boiled egg", "Palak paneer"]
+    assert store.mentioned_in("") == []
+
+
+def test_nutrients_scale_linearly_with_kcal(store):
+    rows = store.nutrients(np.array([[0, 4]]), np.array([[500, 100]]))
+    assert rows.shape == (1, 2, len(NUTRIENTS))
+    np.testing.assert_allclose(rows[0, 0], [500, 12, 90, 10, 6, 600], rtol=1e-5)
+    np.testing.assert_allclose(rows[0, 1], [100, 3.5, 17, 2, 2.5, 40], rtol=1e-5)
+
+
+def test_format_nutrients():
+    row = dict(zip(NUTRIENTS, [2000, 62.4, 180, 55, 30.6, 1800]))
+    assert format_nutrients(row) == "Protein 62 g · Carbs 180 g · Fat 55 g · Fiber 31 g · Sodium 1800 mg"
+    assert format_nutrients(row, keys=("kcal",)) == "Energy 2000 kcal"
+
+
+def test_shipped_table_loads_and_finds_its_own_names():
+    assert len(foods) > 0 and np.isfinite(foods.values).all() and (foods.values[:, 0] > 0).all()
+    for i in range(0, len(foods), max(1, len(foods) // 20)):
+        assert foods.get(foods.name[i]) == i
+        assert foods.search(foods.name[i], limit=1)[0][1] == 1.0
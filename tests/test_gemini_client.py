@@ -0,0 +1,77 @@
+# Streamed answers: chunks are yielded as they arrive, with time-to-first-token and total time recorded.
+import time
+
+import pytest
+
+import gemini_client
+from gemini_client import FakeModel, FakeResponse, StreamStats, stream_generate
+from gemini_gateway import GeminiGateway
+
+
+class Textless:
+    @property
+    def text(self):
+        raise ValueError("no text parts")  # what the SDK does for e.g. a trailing finish chunk
+
+
+class ScriptedModel:
+    """Streams ``script`` items in order; exceptions in it are raised on the attempt they belong to."""
+    model_name = "scripted"
+
+    def __init__(self, *attempts):
+        self.attempts = list(attempts)
+
+    def generate_content(self, prompt, stream=False):
+        script = self.attempts.pop(0)
+        if isinstance(script, Exception):
+            raise script
+        return iter(script)
+
+
+@pytest.fixture(autouse=True)
+def fast_gateway(monkeypatch):
+    gw = GeminiGateway(rate=1000, burst=1000, max_retries=2, sleep=lambda s: None)
+    monkeypatch.setattr(gemini_client, "gateway", gw)
+    return gw
+
+
+def test_chunks_arrive_before_the_answer_is_complete():
+    model = FakeModel(reply="x" * 64, first_token_delay=0.05, chunk_delay=0.05, chunk_size=16)
+    stats = StreamStats()
+    start = time.perf_counter()
+    chunks = stream_generate(model, "hi", stats)
+    first = next(chunks)
+    first_at = time.perf_counter() - start
+    rest = list(chunks)
+
+    assert first + "".join(rest) == "x" * 64 and len(rest) == 3
+    assert first_at < stats.total - 0.05  # well before the last chunk
+    assert stats.chunks == 4 and stats.chars == 64
+    assert 0.05 <= stats.ttft < stats.total
+    assert stats.total >= 0.05 + 3 * 0.05
+
+
+def test_chunks_without_text_are_skipped_and_not_timed():
+    model = ScriptedModel([Textless(), FakeResponse(""), FakeResponse("Eat "), Textless(), FakeResponse("well")])
+    stats = StreamStats()
+    assert list(stream_generate(model, "hi", stats)) == ["Eat ", "well"]
+    assert stats.chunks == 2 and stats.ttft is not None and stats.total is not None
+
+
+def test_empty_stream_has_no_first_token():
+    stats = StreamStats()
+    assert list(stream_generate(ScriptedModel([]), "hi", stats)) == []
+    assert stats.ttft is None and stats.total is not None
+
+
+def test_opening_the_stream_is_retried(fast_gateway):
+    model = ScriptedModel(ConnectionError("reset"), [FakeResponse("ok")])
+    assert list(stream_generate(model, "hi")) == ["ok"]
+    assert fast_gateway.retries == 1
+
+
+def test_unfinished_stats_report_none():
+    stats = StreamStats()
+    assert stats.ttft is None and stats.total is None
+    stats.start()
+    assert stats.ttft is None and stats.total is None
@@ -0,0 +1,92 @@
+# Gemini gateway: token-bucket rate limit, retries with capped backoff, single-flight coalescing.
+import threading
+import time
+
+import pytest
+
+from gemini_client import FakeModel
+from gemini_gateway import GeminiGateway, TokenBucket
+
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.001)
+
+
+def test_token_bucket_allows_bursts_then_refills(clock):
+    bucket = TokenBucket(rate=1.0, capacity=2, clock=clock)
+    assert bucket.acquire(timeout=0)
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    clock.now += 1.0
+    assert bucket.acquire(timeout=0)
+    assert not bucket.acquire(timeout=0)
+    clock.now += 60.0  # never more than ``capacity`` saved up
+    assert [bucket.acquire(timeout=0) for _ in range(3)] == [True, True, False]
+
+
+def test_gateway_retries_retryable_errors_with_capped_backoff():
+    sleeps = []
+    gw = GeminiGateway(rate=1000, burst=1000, max_retries=4, base_delay=0.5, max_delay=1.0, sleep=sleeps.append)
+    model = FakeModel(reply="ok", first_token_delay=0, chunk_delay=0)
+    failures = iter([ConnectionError(), TimeoutError(), ConnectionError()])
+
+    def flaky():
+        error = next(failures, None)
+        if error is not None:
+            raise error
+        return model.generate_content("hi").text
+
+    assert gw.call(flaky) == "ok"
+    assert gw.retries == 3 and gw.failures == 0
+    assert len(sleeps) == 3
+    assert all(0 <= s <= min(1.0, 0.5 * 2 ** i) for i, s in enumerate(sleeps))
+
+
+def test_gateway_gives_up_after_max_retries_and_skips_non_retryable():
+    sleeps = []
+    gw = GeminiGateway(rate=1000, burst=1000, max_retries=2, sleep=sleeps.append)
+
+    def down():
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(ConnectionError):
+        gw.call(down)
+    assert len(sleeps) == 2 and gw.failures == 1
+
+    def bad_request():
+        raise ValueError("bad prompt")
+
+    with pytest.raises(ValueError):
+        gw.call(bad_request)
+    assert len(sleeps) == 2 and gw.failures == 2
+
+
+def test_gateway_coalesces_identical_inflight_calls():
+    gw = GeminiGateway(rate=1000, burst=1000)
+    model = FakeModel(first_token_delay=0, chunk_delay=0)
+    release = threading.Event()
+    upstream = []
+
+    def generate():
+        upstream.append(1)
+        release.wait(5)
+        return model.generate_content("what is a healthy breakfast").text
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(gw.call(generate, key="same"))) for _ in range(5)]
+    threads[0].start()
+    wait_until(lambda: gw.stats()["inflight_keys"] == 1)
+    for t in threads[1:]:
+        t.start()
+    wait_until(lambda: gw.coalesced == 4)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(upstream) == 1 and gw.calls == 1
+    assert len(results) == 5 and len(set(results)) == 1
+    assert gw.stats()["inflight_keys"] == 0
+
@@ -0,0 +1,48 @@
+# Retrieval is scoped to the chosen issue; a bad index file is rebuilt, never fatal.
+import pytest
+
+import knowledge_base
+from knowledge_base import GENERAL_ISSUE, LOAD_ERRORS, KnowledgeIndex, build_index
+
+
+@pytest.fixture(scope="module")
+def index():
+    return build_index()[0]
+
+
+@pytest.mark.parametrize("issue", ["Diabetes", "PCOS", "Thyroid", "Weight Loss"])
+def test_search_returns_only_general_and_chosen_issue(index, issue):
+    for query in ["what snacks are safe", "how much sugar can I have", "best breakfast for energy"]:
+        issues = {hit_issue for _, _, hit_issue in index.search(query, issue, k=10, min_score=-0.5)}
+        assert issues <= {GENERAL_ISSUE, issue}
+
+
+def test_search_without_issue_returns_general_guidance_only(index):
+    hits = index.search("what should a diabetic eat", None, k=10, min_score=-0.5)
+    assert hits and {issue for _, _, issue in hits} == {GENERAL_ISSUE}
+    assert index.search("what should a diabetic eat", "None", k=10, min_score=-0.5) == hits
+
+
+def test_low_scoring_passages_are_dropped(index):
+    assert index.search("zxqv wplk", "Diabetes") == []
+
+
+def test_save_load_round_trip_leaves_no_temp_file(tmp_path, index):
+    path = tmp_path / "index.npz"
+    index.save(path)
+    assert [p.name for p in tmp_path.iterdir()] == ["index.npz"]
+    loaded = KnowledgeIndex.load(path)
+    assert loaded.manifest == index.manifest and len(loaded) == len(index)
+
+
+def test_corrupt_index_is_rebuilt(tmp_path, monkeypatch):
+    corrupt = tmp_path / "index.npz"
+    corrupt.write_bytes(b"PK\x03\x04 half-written")
+    with pytest.raises(LOAD_ERRORS):
+        KnowledgeIndex.load(corrupt)
+
+    monkeypatch.setattr(knowledge_base, "INDEX_PATH", corrupt)
+    monkeypatch.setattr(knowledge_base, "_index", None)
+    index = knowledge_base.get_index()
+    assert len(index) > 0
+    assert len(KnowledgeIndex.load(corrupt)) == len(index)  # replaced by the rebuilt index
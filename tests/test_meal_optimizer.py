@@ -0,0 +1,47 @@
+# Calorie-target planning: every day is on target or flagged as missing it.
+import numpy as np
+import pytest
+
+import planner
+from meal_catalog import DIETS, GOALS
+from meal_optimizer import TARGET_TOLERANCE, daily_energy_target, optimize_week
+
+
+@pytest.mark.parametrize("diet", DIETS)
+@pytest.mark.parametrize("goal", GOALS)
+@pytest.mark.parametrize("target", [1200, 1800, 2600, 3262, 4411])
+def test_every_day_is_within_tolerance_or_flagged(diet, goal, target):
+    picks, portions, totals, on_target = optimize_week(goal, diet, target, rng=np.random.default_rng(0))
+    assert picks.shape == portions.shape == (7, 4)
+    within = np.abs(totals - target) <= TARGET_TOLERANCE * target
+    assert (on_target == within).all()
+
+
+def test_reachable_target_is_met_every_day():
+    _, _, totals, on_target = optimize_week("Maintain", "Non-Veg", 2000, rng=np.random.default_rng(0))
+    assert on_target.all()
+    assert np.all(np.abs(totals - 2000) <= TARGET_TOLERANCE * 2000)
+
+
+@pytest.mark.parametrize("diet, goal, weight", [("Vegan", "Weight Loss", 100), ("Vegetarian", "Weight Gain", 113)])
+def test_report_flags_targets_the_catalog_cannot_reach(diet, goal, weight):
+    report = planner.build_health_report(30, 180, weight, "Very Active", diet, goal,
+                                         plan_mode="Calorie Target", sex="Male", week=202601)
+    target = daily_energy_target(30, weight, 180, "Very Active", goal, "Male")
+    assert report["kcal_target"] == target
+    flags = [abs(total - target) <= TARGET_TOLERANCE * target for total in report["day_totals"]]
+    assert report["day_on_target"] == flags
+    assert report["on_target"] is all(flags)
+    assert not report["on_target"]
+
+
+def test_generate_target_meal_plan_returns_day_flags():
+    plan, target, totals, on_target = planner.generate_target_meal_plan("Vegan", "Maintain", 30, 70, 170,
+                                                                        "Moderately Active", week=202601)
+    assert len(plan) == len(totals) == len(on_target) == 7
+    assert all(on_target)
+
+
+def test_quick_reports_have_no_target_flags():
+    report = planner.build_health_report(30, 170, 70, "Sedentary", "Vegan", "Maintain", week=202601)
+    assert report["on_target"] is None and report["day_on_target"] is None
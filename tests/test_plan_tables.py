@@ -0,0 +1,73 @@
+# Plan tables serve exactly the plans the live path computes.
+import numpy as np
+import pytest
+
+import plan_tables
+import planner
+from meal_catalog import DIETS, GOALS, MEALS
+from plan_tables import (DAYS, PORTIONS, TARGET_POOL, PlanTables, _build_quick, load_tables, save_tables,
+                         target_bucket, target_buckets, target_entry)
+
+TARGET_DIET, TARGET_GOAL, TARGET_KCAL = "Vegan", "Maintain", 2000
+
+
+@pytest.fixture(scope="module")
+def tables():
+    # Every Quick pool, and the Calorie Target pool of one bucket (the full build takes about a minute)
+    bucket = target_bucket(TARGET_KCAL)
+    shape = (len(DIETS) * len(GOALS), len(target_buckets()), TARGET_POOL, DAYS, len(MEALS))
+    arrays = {"quick_picks": np.stack([_build_quick((d, g), 0) for d in DIETS for g in GOALS]),
+              "target_picks": np.zeros(shape, dtype=np.int16),
+              "target_portions": np.zeros(shape, dtype=np.uint8),
+              "target_valid": np.zeros(shape[:3], dtype=bool)}
+    combo = DIETS.index(TARGET_DIET) * len(GOALS) + GOALS.index(TARGET_GOAL)
+    for i in range(TARGET_POOL):
+        found = target_entry(TARGET_DIET, TARGET_GOAL, bucket, i)
+        if found is not None:
+            arrays["target_picks"][combo, bucket, i] = found[0]
+            arrays["target_portions"][combo, bucket, i] = np.searchsorted(PORTIONS, found[1])
+            arrays["target_valid"][combo, bucket, i] = True
+    return PlanTables(arrays, {"seed": 0})
+
+
+def _plans(monkeypatch, tables):
+    monkeypatch.setattr(planner, "plan_tables", tables)
+    for fn in (planner._quick_pool_plan, planner._target_pool_plan, planner._target_plan):
+        fn.cache_clear()
+    quick = [planner.build_health_report(30, 170, 70, "Sedentary", d, g, week=202601, revision=r)
+             for d in DIETS for g in GOALS for r in range(3)]
+    target = [planner.build_health_report(30, 170, 70, "Sedentary", TARGET_DIET, TARGET_GOAL,
+                                          plan_mode="Calorie Target", week=202601, revision=r)
+              for r in range(TARGET_POOL)]
+    return quick, target
+
+
+def test_table_plans_match_live_plans(monkeypatch, tables):
+    monkeypatch.setattr(planner, "daily_energy_target", lambda *args: TARGET_KCAL)
+    live_quick, live_target = _plans(monkeypatch, None)
+    table_quick, table_target = _plans(monkeypatch, tables)
+
+    assert {r["plan_source"] for r in live_quick + live_target} == {"live"}
+    assert {r["plan_source"] for r in table_quick + table_target} == {"table"}
+    for live, table in zip(live_quick + live_target, table_quick + table_target):
+        assert live["meal_plan"] == table["meal_plan"]
+        assert live["day_nutrients"] == table["day_nutrients"]
+
+
+def test_load_tables_ignores_missing_or_corrupt_files(tmp_path, tables):
+    assert load_tables(str(tmp_path / "missing.npz")) is None
+    corrupt = tmp_path / "corrupt.npz"
+    corrupt.write_bytes(b"PK\x03\x04 truncated")
+    assert load_tables(str(corrupt)) is None
+
+
+def test_saved_tables_round_trip(tmp_path, tables):
+    arrays = {name: getattr(tables, name) for name in ("quick_picks", "target_picks", "target_portions", "target_valid")}
+    meta = {"version": plan_tables.TABLES_VERSION, "catalog": plan_tables.catalog_digest(), "seed": 0}
+    path = tmp_path / "tables.npz"
+    save_tables(arrays, meta, path)
+    assert [p.name for p in tmp_path.iterdir()] == ["tables.npz"]  # no temp file left behind
+    loaded = load_tables(str(path))
+    assert loaded.meta == meta
+    assert np.array_equal(loaded.target_valid, tables.target_valid)
+    assert loaded.quick("Vegan", "Maintain", 5).tolist() == tables.quick("Vegan", "Maintain", 5).tolist()
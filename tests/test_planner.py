@@ -0,0 +1,60 @@
+# Meal plans are seeded per (profile, week, revision) and memoized.
+import datetime
+
+import pytest
+
+import planner
+from meal_catalog import DIETS, GOALS
+
+
+@pytest.fixture(autouse=True)
+def live_plans(monkeypatch):
+    monkeypatch.setattr(planner, "plan_tables", None)
+    for fn in (planner._quick_pool_plan, planner._target_pool_plan, planner._target_plan):
+        fn.cache_clear()
+    yield
+    planner.seed_plans(None)
+
+
+def test_current_week_is_iso_year_and_week():
+    assert planner.current_week(datetime.date(2026, 10, 14)) == 202642
+    assert planner.current_week(datetime.date(2027, 1, 1)) == 202653  # ISO week of the previous year
+
+
+def test_same_profile_and_week_give_the_same_plan():
+    first = planner.generate_meal_plan("Vegan", "Maintain", week=202642)
+    misses = planner.plan_cache_stats()["misses"]
+    assert planner.generate_meal_plan("Vegan", "Maintain", week=202642) == first
+    stats = planner.plan_cache_stats()
+    assert stats["misses"] == misses and stats["hits"] >= 1  # served from the memo
+
+
+def test_revisions_change_the_plan():
+    plans = [planner.generate_meal_plan("Non-Veg", "Weight Loss", week=202642, revision=r) for r in range(4)]
+    assert all(a != b for a, b in zip(plans, plans[1:]))
+    assert planner.generate_meal_plan("Non-Veg", "Weight Loss", week=202642, revision=2) == plans[2]
+
+
+def test_plans_differ_across_weeks_and_profiles():
+    weeks = {repr(planner.generate_meal_plan("Vegetarian", "Weight Gain", week=202601 + w)) for w in range(6)}
+    assert len(weeks) > 1
+    profiles = {repr(planner.generate_meal_plan(d, g, week=202642)) for d in DIETS for g in GOALS}
+    assert len(profiles) == len(DIETS) * len(GOALS)
+
+
+def test_seed_plans_salts_every_seed():
+    default = [planner.generate_meal_plan("Eggetarian", "Maintain", week=202642 + w) for w in range(4)]
+    seed = planner.plan_seed(("Eggetarian", "Maintain"), 202642)
+    planner.seed_plans(7)
+    assert planner.plan_seed(("Eggetarian", "Maintain"), 202642) != seed
+    salted = [planner.generate_meal_plan("Eggetarian", "Maintain", week=202642 + w) for w in range(4)]
+    assert salted != default
+    planner.seed_plans(None)
+    assert [planner.generate_meal_plan("Eggetarian", "Maintain", week=202642 + w) for w in range(4)] == default
+
+
+def test_calorie_target_plans_are_seeded_too():
+    args = ("Vegan", "Maintain", 30, 70, 170, "Sedentary")
+    first = planner.generate_target_meal_plan(*args, week=202642)
+    assert planner.generate_target_meal_plan(*args, week=202642) == first
+    assert planner.generate_target_meal_plan(*args, week=202642, revision=1)[0] != first[0]
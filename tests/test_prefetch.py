@@ -0,0 +1,108 @@
+# Follow-up prefetching: answers land in the response cache, clicks claim them, and the budget is respected.
+import threading
+
+import pytest
+
+from prefetch import Prefetcher
+from response_cache import ResponseCache, context_key
+
+CONTEXT = ("Diabetes", "Vegan", "Weight Loss", "Sedentary")
+
+
+class FakeFetch:
+    def __init__(self, gate=None):
+        self.calls = []
+        self.gate = gate
+
+    def __call__(self, question, *context):
+        self.calls.append(question)
+        if self.gate is not None:
+            self.gate.wait(5)
+        if "fail" in question:
+            raise ConnectionError("upstream down")
+        return f"answer: {question}"
+
+
+@pytest.fixture
+def cache():
+    return ResponseCache(max_entries=64)
+
+
+def make(cache, fetch, **kwargs):
+    kwargs.setdefault("busy", lambda: False)
+    return Prefetcher(fetch_fn=fetch, cache=cache, **kwargs)
+
+
+def drain(prefetcher):
+    prefetcher._executor.shutdown(wait=True)
+
+
+def test_suggest_skips_topics_already_asked_and_ranks_by_clicks(cache):
+    p = make(cache, FakeFetch())
+    topics = [t for t, _ in p.suggest("Give me a recipe to cook", *CONTEXT[:3], k=5)]
+    assert "recipe" not in topics and len(topics) == 4
+    _, question = p.suggest("hi", *CONTEXT[:3])[0]
+    assert question == "Give me a simple vegan recipe for diabetes"
+    p.claim("anything", *CONTEXT, topic="avoid")
+    assert p.suggest("hi", *CONTEXT[:3])[0][0] == "avoid"
+
+
+def test_prefetched_answer_is_cached_and_claimed_once(cache):
+    fetch = FakeFetch()
+    p = make(cache, fetch, top=2)
+    suggestions = p.suggest("hi", *CONTEXT[:3])
+    assert p.schedule(suggestions, *CONTEXT) == 2
+    assert p.schedule(suggestions, *CONTEXT) == 0  # already running or done
+    drain(p)
+    (topic, question), other = suggestions[:2]
+    assert cache.get(question, context_key(*CONTEXT)) == f"answer: {question}"
+
+    assert p.claim(question, *CONTEXT, topic=topic)
+    assert not p.claim(question, *CONTEXT, topic=topic)  # a second click isn't a prefetch hit
+    assert not p.claim("something else", *CONTEXT)
+    stats = p.stats()
+    assert (stats["prefetched"], stats["claimed"], stats["clicks"], stats["hits"]) == (2, 1, 2, 1)
+    assert stats["hit_rate"] == 0.5 and stats["wasted_rate"] == 0.5
+    assert len(fetch.calls) == 2
+
+
+def test_claim_waits_for_a_running_prefetch(cache):
+    gate = threading.Event()
+    p = make(cache, FakeFetch(gate), top=1)
+    (topic, question), = p.suggest("hi", *CONTEXT[:3], k=1)
+    p.schedule([(topic, question)], *CONTEXT)
+    assert not p.claim(question, *CONTEXT, timeout=0.05)  # still running
+    gate.set()
+    assert p.claim(question, *CONTEXT, topic=topic)
+    assert p.stats()["pending_hits"] == 1
+
+
+def test_cached_questions_and_failures_are_not_counted_as_prefetched(cache):
+    fetch = FakeFetch()
+    p = make(cache, fetch, top=2)
+    cache.put("already answered", context_key(*CONTEXT), "cached")
+    assert p.schedule([("a", "already answered"), ("b", "this will fail")], *CONTEXT) == 1
+    drain(p)
+    stats = p.stats()
+    assert (stats["skipped_cached"], stats["errors"], stats["prefetched"]) == (1, 1, 0)
+    assert fetch.calls == ["this will fail"]
+    assert cache.stats()["misses"] == 0  # probes don't count as misses
+
+
+def test_budget_queue_and_live_traffic_limit_prefetching():
+    questions = [("t", f"question {i}") for i in range(6)]
+
+    p = make(ResponseCache(), FakeFetch(), top=6, per_minute=1, burst=2)
+    assert p.schedule(questions, *CONTEXT) == 2
+    assert p.stats()["skipped_budget"] == 4
+
+    gate = threading.Event()
+    p = make(ResponseCache(), FakeFetch(gate), top=6, burst=10, max_pending=3)
+    assert p.schedule(questions, *CONTEXT) == 3
+    assert p.stats()["skipped_queue"] == 3
+    gate.set()
+
+    p = make(ResponseCache(), FakeFetch(), top=6, busy=lambda: True)
+    assert p.schedule(questions, *CONTEXT) == 0 and p.stats()["skipped_busy"] == 6
+
+    assert make(ResponseCache(), FakeFetch(), enabled=False).schedule(questions, *CONTEXT) == 0
@@ -0,0 +1,79 @@
+# Progress log: per-year day slots on disk, and the trend maths behind the Progress card.
+import datetime
+
+import numpy as np
+import pytest
+
+from progress_log import (EMPTY_DAY, ENTRY_DTYPE, ProgressLog, day_number, linear_trend, moving_average,
+                          progress_summary, project_goal_date, synthetic_history, to_date, write_entries)
+
+SESSION = "0123456789abcdef"
+
+
+def test_session_ids_are_never_paths(tmp_path):
+    for bad in ("../../etc", "ABCDEF12", "abc"):
+        with pytest.raises(ValueError):
+            ProgressLog(bad, root=tmp_path)
+
+
+def test_log_writes_one_slot_and_corrections_replace_it(tmp_path):
+    log = ProgressLog(SESSION, root=tmp_path)
+    log.log(datetime.date(2025, 12, 31), 80.0, 7.0, "Low", 27.7)
+    log.log(datetime.date(2026, 1, 2), 79.5, 6.5, "High", 27.5)
+    log.log(datetime.date(2026, 1, 2), 79.0, 6.0, "Medium", 27.3)  # correction
+
+    assert log.years() == [2025, 2026]
+    entries = log.load()
+    assert [to_date(d) for d in entries["day"]] == [datetime.date(2025, 12, 31), datetime.date(2026, 1, 2)]
+    assert entries["weight"].tolist() == [80.0, 79.0] and entries["stress"].tolist() == [0, 1]
+    assert len(log.load(since=datetime.date(2026, 1, 1))) == 1
+    seg = np.load(tmp_path / SESSION / "2026.npy")
+    assert (seg["day"] != EMPTY_DAY).sum() == 1
+    assert not list((tmp_path / SESSION).glob("*.tmp"))
+    assert len(ProgressLog("fedcba9876543210", root=tmp_path).load()) == 0
+
+
+def test_write_entries_matches_logging_day_by_day(tmp_path):
+    history = synthetic_history(500, end=datetime.date(2026, 3, 1))
+    bulk = ProgressLog(SESSION, root=tmp_path / "bulk")
+    write_entries(bulk, history)
+    np.testing.assert_array_equal(bulk.load(), history)
+    assert bulk.years() == [2024, 2025, 2026]
+
+
+def test_moving_average_skips_gaps():
+    values = np.array([1.0, np.nan, 3.0, np.nan, np.nan, np.nan, 7.0])
+    np.testing.assert_allclose(moving_average(values, 3), [1, 1, 2, 3, 3, np.nan, 7])
+
+
+def test_linear_trend_uses_the_recent_window():
+    days = np.arange(100)
+    values = np.where(days < 60, 90.0, 90.0 - 0.1 * (days - 60))
+    assert linear_trend(days, values, window=28) == pytest.approx(-0.1)
+    assert linear_trend(days[:2], values[:2]) is None
+    assert linear_trend(np.array([5, 5, 5]), np.array([1.0, 2.0, 3.0])) is None
+
+
+def test_project_goal_date():
+    today = datetime.date(2026, 1, 1)
+    assert project_goal_date(80.0, 75.0, -0.1, today) == datetime.date(2026, 2, 20)
+    assert project_goal_date(80.0, 85.0, -0.1, today) is None  # moving away
+    assert project_goal_date(80.0, 40.0, -0.01, today) is None  # more than three years out
+    assert project_goal_date(80.0, 75.0, None, today) is None
+
+
+def test_progress_summary_follows_a_steady_loss():
+    end = datetime.date(2026, 6, 30)
+    days = np.arange(day_number(end) - 59, day_number(end) + 1)
+    entries = np.zeros(len(days), dtype=ENTRY_DTYPE)
+    entries["day"] = days
+    entries["weight"] = 90.0 - 0.05 * np.arange(len(days))
+    entries["sleep"] = 7.5
+    entries["stress"] = 2
+    entries["bmi"] = entries["weight"] / 1.7 ** 2
+
+    summary = progress_summary(entries, goal_weight=85.0, today=end)
+    assert summary["entries"] == 60 and summary["weekly_change"] == pytest.approx(-0.35, abs=1e-3)
+    assert 41 <= (summary["goal_date"] - end).days <= 42  # 2.05 kg to go at 0.05 kg a day
+    assert summary["avg_sleep_7d"] == 7.5 and summary["stress_7d"] == "High"
+    assert len(summary["weights"]) == 60 and not np.isnan(summary["weight_ma7"]).any()
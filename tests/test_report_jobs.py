@@ -0,0 +1,82 @@
+# Report jobs: analysed in the background, deduplicated by upload content, failed jobs retried.
+import threading
+import time
+
+from report_jobs import ReportJobQueue
+from vision_prep import PreparedReport
+
+
+def prepare_as_text(data):
+    prepared = PreparedReport(len(data))
+    prepared.text = data.decode()[:4]
+    return prepared
+
+
+class FakeAnalyze:
+    def __init__(self, gate=None, fail_first=0):
+        self.calls = 0
+        self.gate = gate
+        self.fail_first = fail_first
+        self.lock = threading.Lock()
+
+    def __call__(self, prepared):
+        with self.lock:
+            self.calls += 1
+            calls = self.calls
+        if self.gate is not None:
+            self.gate.wait(5)
+        if calls <= self.fail_first:
+            raise ConnectionError("upstream down")
+        return f"summary of {prepared.text}"
+
+
+def wait_finished(*jobs, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not all(job.finished for job in jobs):
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.005)
+
+
+def test_same_upload_is_analysed_once():
+    gate = threading.Event()
+    analyze = FakeAnalyze(gate)
+    queue = ReportJobQueue(analyze_fn=analyze, prepare_fn=prepare_as_text)
+    first = queue.submit(b"glucose 110 mg/dL")
+    assert queue.submit(b"glucose 110 mg/dL") is first  # still running
+    gate.set()
+    wait_finished(first)
+    assert queue.submit(b"glucose 110 mg/dL") is first  # finished
+    other = queue.submit(b"hba1c 6.1%")
+    wait_finished(other)
+
+    assert first.status == "done" and first.result == "summary of gluc"
+    assert first.mode == "text" and first.upload_bytes == 4 and "analyze" in first.timings
+    assert analyze.calls == 2
+    stats = queue.stats()
+    assert (stats["submitted"], stats["duplicates"], stats["text_uploads"]) == (2, 2, 2)
+    assert stats["bytes_saved"] == (17 - 4) + (10 - 4)
+    assert queue.get(first.id) is first
+
+
+def test_failed_jobs_are_retried_on_resubmit():
+    queue = ReportJobQueue(analyze_fn=FakeAnalyze(fail_first=1), prepare_fn=prepare_as_text)
+    failed = queue.submit(b"report")
+    wait_finished(failed)
+    assert failed.status == "error" and "upstream down" in failed.error
+
+    retry = queue.submit(b"report")
+    assert retry is not failed
+    wait_finished(retry)
+    assert retry.status == "done" and queue.get(retry.id) is retry
+    assert queue.stats()["duplicates"] == 0
+
+
+def test_only_finished_jobs_are_evicted():
+    gate = threading.Event()
+    queue = ReportJobQueue(analyze_fn=FakeAnalyze(gate), prepare_fn=prepare_as_text, max_workers=4, max_jobs=2)
+    running = [queue.submit(f"report {i}".encode()) for i in range(3)]
+    assert queue.stats()["jobs"] == 3  # nothing finished yet, so nothing can go
+    gate.set()
+    wait_finished(*running)
+    queue.submit(b"report 3")
+    assert queue.get(running[0].id) is None and queue.stats()["jobs"] == 2
@@ -0,0 +1,70 @@
+# Response cache: exact keys with TTL and LRU, and the opt-in semantic match with its meaning guard.
+import numpy as np
+
+import response_cache as response_cache_module
+from response_cache import ResponseCache, meaning_tokens, normalize_prompt
+
+
+def same_vector(text):
+    # Every prompt embeds alike, so only the meaning guard tells prompts apart
+    return np.ones(4, dtype=np.float32) / 2
+
+
+def test_ttl_and_normalization(clock):
+    cache = ResponseCache(max_entries=4, ttl_seconds=60, clock=clock)
+    cache.put("What should I eat?", ("diabetes",), "oats")
+    assert cache.get("what  should i EAT", ("diabetes",)) == "oats"
+    assert cache.get("what should i eat", ("pcos",)) is None
+    clock.now += 61
+    assert cache.get("what should i eat", ("diabetes",)) is None
+    assert cache.stats()["expirations"] == 1 and len(cache) == 0
+
+
+def test_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", (), "A")
+    cache.put("b", (), "B")
+    assert cache.get("a") == "A"  # "b" is now the oldest
+    cache.put("c", (), "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+    assert cache.stats()["evictions"] == 1
+
+
+def test_put_replaces_an_answer():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", (), "old")
+    cache.put("a", (), "new")
+    assert cache.get("a") == "new" and len(cache) == 1
+
+
+def test_probes_stay_out_of_the_stats():
+    cache = ResponseCache()
+    cache.get("a", record=False)
+    cache.put("a", (), "A")
+    cache.get("a", record=False)
+    assert cache.stats()["hits"] == cache.stats()["misses"] == 0
+
+
+def test_semantic_cache_is_opt_in(monkeypatch):
+    monkeypatch.delenv("NUTRIX_SEMANTIC_CACHE", raising=False)
+    assert response_cache_module._default_cache().embed_fn is None
+    monkeypatch.setenv("NUTRIX_SEMANTIC_CACHE", "1")
+    cache = response_cache_module._default_cache()
+    assert cache.embed_fn is not None and cache.similarity_threshold == 0.95
+
+
+def test_semantic_match_requires_same_numbers_and_negations():
+    cache = ResponseCache(max_entries=8, embed_fn=same_vector, similarity_threshold=0.9)
+    cache.put("is a 1200 kcal diet safe", (), "1200 answer")
+    cache.put("foods with sugar", (), "sugar answer")
+    assert cache.get("is 1200 kcal diet safe") == "1200 answer"
+    assert cache.stats()["semantic_hits"] == 1
+    assert cache.get("is a 1800 kcal diet safe") is None
+    assert cache.get("foods without sugar") is None
+    assert cache.get("foods with sugar", ("diabetes",)) is None
+
+
+def test_negated_contractions_count_as_negations():
+    assert meaning_tokens(normalize_prompt("Can I eat rice?")) != meaning_tokens(normalize_prompt("Can't I eat rice?"))
+    assert meaning_tokens(normalize_prompt("I don't eat eggs")) == ((), ("t",))
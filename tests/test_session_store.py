@@ -0,0 +1,91 @@
+# Session stores: round trip, per-conversation turn cap and idle-session expiry.
+import pytest
+
+from session_store import MemorySessionStore, SQLiteSessionStore, load_history, open_store
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path, clock):
+    def make(**kwargs):
+        if request.param == "memory":
+            return MemorySessionStore(clock=clock, **kwargs)
+        return SQLiteSessionStore(tmp_path / "sessions.db", clock=clock, **kwargs)
+    make.clock = clock
+    return make
+
+
+def test_round_trip(make_store):
+    store = make_store()
+    long_text = "Eat more vegetables. " * 100  # stored compressed
+    store.append_turn("s1", "chat", "You", "hi")
+    store.append_turn("s1", "chat", "NutriX", long_text)
+    store.append_turn("s1", "doctor", "You", "headache")
+    store.save_profile("s1", {"age": 30, "goal": "Maintain"})
+
+    assert store.load_turns("s1", "chat") == [("You", "hi"), ("NutriX", long_text)]
+    assert store.load_turns("s1", "doctor") == [("You", "headache")]
+    assert store.load_turns("s2", "chat") == []
+    assert store.load_profile("s1") == {"age": 30, "goal": "Maintain"}
+    assert store.load_profile("s2") is None
+    store.clear_turns("s1", "chat")
+    assert store.load_turns("s1", "chat") == []
+    assert store.load_turns("s1", "doctor") == [("You", "headache")]
+
+
+def test_turns_are_capped_per_conversation(make_store):
+    store = make_store(max_turns=5)
+    for i in range(12):
+        store.append_turn("s1", "chat", "You", f"turn {i}")
+    store.append_turn("s1", "doctor", "You", "other conversation")
+    assert store.load_turns("s1", "chat") == [("You", f"turn {i}") for i in range(7, 12)]
+    assert len(store.load_turns("s1", "doctor")) == 1
+
+
+def test_idle_sessions_expire(make_store):
+    store = make_store(ttl_seconds=60)
+    store.append_turn("idle", "chat", "You", "hi")
+    store.save_profile("idle", {"age": 30})
+    make_store.clock.now += 30
+    store.append_turn("active", "chat", "You", "hi")
+    make_store.clock.now += 31
+    if isinstance(store, SQLiteSessionStore):
+        store.purge()
+    assert store.load_turns("idle", "chat") == [] and store.load_profile("idle") is None
+    assert store.load_turns("active", "chat") == [("You", "hi")]
+
+
+def test_sqlite_purge_runs_on_writes(tmp_path, clock):
+    store = SQLiteSessionStore(tmp_path / "sessions.db", ttl_seconds=60, clock=clock)
+    store.PURGE_EVERY = 3
+    store.append_turn("idle", "chat", "You", "hi")
+    clock.now += 120
+    store.append_turn("active", "chat", "You", "one")
+    store.append_turn("active", "chat", "You", "two")  # third write: purge
+    rows = store._connect().execute("SELECT DISTINCT session_id FROM turns").fetchall()
+    assert rows == [("active",)]
+
+
+def test_memory_store_evicts_least_recently_written_sessions():
+    store = MemorySessionStore(max_sessions=2)
+    for sid in ("a", "b"):
+        store.append_turn(sid, "chat", "You", sid)
+    store.save_profile("a", {"age": 30})  # "b" is now the oldest
+    store.append_turn("c", "chat", "You", "c")
+    assert len(store) == 2 and store.evictions == 1
+    assert store.load_turns("b", "chat") == []
+    assert store.load_profile("a") == {"age": 30}
+
+
+def test_load_history_writes_through_and_replays_at_most_max_turns(tmp_path):
+    store = open_store(f"sqlite:///{tmp_path / 'sessions.db'}")
+    store.max_turns = 4
+    history = load_history(store, "s1", "chat", max_turns=4)
+    for i in range(6):
+        history.append("You", f"turn {i}")
+    replayed = load_history(store, "s1", "chat", max_turns=4)
+    assert list(replayed) == list(history) == [("You", f"turn {i}") for i in range(2, 6)]
+
+
+def test_unknown_store_url():
+    with pytest.raises(ValueError):
+        open_store("mongodb://nope")
@@ -0,0 +1,119 @@
+# Shared cache tier: consistent hashing, cross-replica reads and invalidation down to in-process caches.
+import pytest
+
+import planner
+import shared_cache
+from asset_cache import AssetCache
+from response_cache import ResponseCache
+from shared_cache import HashRing, SharedCache, SQLiteTier, open_shared_cache, stable_digest
+
+
+class Node:
+    def __init__(self, name):
+        self.name = name
+
+
+class BrokenTier:
+    name = "broken"
+
+    def __getattr__(self, attr):
+        def fail(*args):
+            raise ConnectionError("tier down")
+        return fail
+
+
+@pytest.fixture
+def replicas(tmp_path, monkeypatch):
+    """Two replicas' clients on one tier, seeing each other's invalidations immediately."""
+    monkeypatch.setattr(shared_cache, "GENERATION_TTL", 0)
+    path = tmp_path / "cache.db"
+    return SharedCache([SQLiteTier(path)]), SharedCache([SQLiteTier(path)])
+
+
+def test_hash_ring_is_stable_and_moves_few_keys():
+    keys = [stable_digest("response", i) for i in range(2000)]
+    ring = HashRing([Node(f"node{i}") for i in range(4)])
+    before = {k: ring.node_for(k).name for k in keys}
+    rebuilt = HashRing([Node(f"node{i}") for i in range(4)])
+    assert all(rebuilt.node_for(k).name == before[k] for k in keys)
+    assert len(set(before.values())) == 4
+
+    grown = HashRing([Node(f"node{i}") for i in range(5)])
+    moved = [k for k in keys if grown.node_for(k).name != before[k]]
+    assert all(grown.node_for(k).name == "node4" for k in moved)
+    assert 0.1 < len(moved) / len(keys) < 0.35
+
+
+def test_stable_digest_is_canonical():
+    assert stable_digest("plan", ("Vegan", 1)) == stable_digest("plan", ["Vegan", 1])
+    assert stable_digest("plan", {"b": 1, "a": 2}) == stable_digest("plan", {"a": 2, "b": 1})
+    assert stable_digest("plan", 1) != stable_digest("response", 1)
+
+
+def test_replicas_share_entries_and_invalidations(replicas):
+    a, b = replicas
+    a.set("response", ("q", ()), b"answer")
+    assert b.get("response", ("q", ())) == b"answer"
+    assert b.invalidate("response") == 1
+    assert a.get("response", ("q", ())) is None
+    assert a.generation("response") == 1 and a.generation("plan") == 0
+
+
+def test_invalidation_reaches_the_response_cache(replicas):
+    a, b = replicas
+    cache = ResponseCache(shared=a)
+    cache.put("what should i eat", (), "oats")
+    assert cache.get("what should i eat") == "oats"
+    b.invalidate("response")
+    assert cache.get("what should i eat") is None
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_response_cache_reads_other_replicas_answers(replicas):
+    a, b = replicas
+    ResponseCache(shared=a).put("What should I eat?", ("diabetes",), "oats")
+    other = ResponseCache(shared=b)
+    assert other.get("what should i eat", ("diabetes",)) == "oats"
+    assert other.stats()["shared_hits"] == 1
+
+
+def test_invalidation_reaches_the_asset_cache(replicas, tmp_path):
+    from PIL import Image
+    a, b = replicas
+    path = tmp_path / "banner.png"
+    Image.new("RGB", (64, 32), "green").save(path)
+    cache = AssetCache(shared=a)
+    cache.get(path, 32)
+    cache.get(path, 32)
+    assert cache.stats()["hits"] == 1
+    b.invalidate("asset")
+    cache.get(path, 32)
+    assert cache.stats()["misses"] == 2
+
+
+def test_invalidation_reaches_the_planner_memo(replicas, monkeypatch):
+    a, b = replicas
+    monkeypatch.setattr(planner, "shared_cache", a)
+    planner.generate_meal_plan("Vegan", "Maintain", 202601)
+    misses = planner.plan_cache_stats()["misses"]
+    planner.generate_meal_plan("Vegan", "Maintain", 202601)
+    assert planner.plan_cache_stats()["misses"] == misses
+    b.invalidate("plan")
+    planner.generate_meal_plan("Vegan", "Maintain", 202601)
+    assert planner.plan_cache_stats()["misses"] == misses + 1
+
+
+def test_tier_errors_count_as_misses():
+    cache = SharedCache([BrokenTier()])
+    assert cache.get("response", "q") is None
+    cache.set("response", "q", b"x")
+    assert cache.generation("response") == 0
+    assert cache.stats()["errors"] == 3
+
+
+def test_disabled_tier_and_url_parsing(tmp_path):
+    off = open_shared_cache("off")
+    assert not off.enabled and off.get("response", "q") is None and off.invalidate("response") == 0
+    assert open_shared_cache(f"sqlite:///{tmp_path / 'c.db'}").enabled
+    with pytest.raises(ValueError):
+        open_shared_cache("memcached://x")
@@ -0,0 +1,106 @@
+# Report photo clean-up: crop, deskew, OCR choice, and sending the upload as-is when a stage fails.
+import io
+import types
+
+import numpy as np
+import pytest
+from PIL import Image, ImageDraw
+
+import vision_prep
+from vision_prep import content_box, encode_jpeg, estimate_skew, otsu_threshold, prepare_report, sniff_mime
+
+
+def page(size=(800, 1000), box=(100, 150, 700, 850), lines=20):
+    """White page with dark text-like bars inside ``box``."""
+    img = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(img)
+    left, top, right, bottom = box
+    for y in np.linspace(top, bottom - 10, lines).astype(int):
+        draw.rectangle((left, y, right, y + 8), fill=20)
+    return img
+
+
+def png_bytes(img):
+    buf = io.BytesIO()
+    img.save(buf, format="PNG")
+    return buf.getvalue()
+
+
+class FakeOCR:
+    """Stands in for pytesseract: returns ``words`` at ``conf`` confidence on one line."""
+    Output = types.SimpleNamespace(DICT="dict")
+
+    def __init__(self, words, conf):
+        self.words, self.conf = words, conf
+
+    def image_to_data(self, image, output_type=None):
+        n = len(self.words)
+        return {"text": self.words, "conf": [self.conf] * n, "block_num": [1] * n, "par_num": [1] * n,
+                "line_num": [1] * n}
+
+
+def test_otsu_threshold():
+    assert otsu_threshold(np.full((20, 20), 255, dtype=np.uint8)) == 128  # single colour
+    two_tone = np.array([[10] * 10 + [240] * 10] * 4, dtype=np.uint8)
+    assert 10 <= otsu_threshold(two_tone) < 240
+
+
+def test_content_box_finds_the_ink():
+    left, top, right, bottom = content_box(page())
+    assert 70 <= left <= 100 and 120 <= top <= 150
+    assert 700 <= right <= 730 and 840 <= bottom <= 880
+    assert content_box(Image.new("L", (300, 200), 255)) == (0, 0, 300, 200)
+
+
+@pytest.mark.parametrize("angle", [-4.0, 0.0, 3.0])
+def test_estimate_skew_levels_rotated_pages(angle):
+    rotated = page().rotate(angle, resample=Image.BILINEAR, expand=True, fillcolor=255)
+    assert estimate_skew(rotated) == pytest.approx(-angle, abs=0.5)
+
+
+def test_encode_jpeg_respects_size_limits():
+    noisy = Image.fromarray(np.random.default_rng(0).integers(0, 256, (1200, 2400), dtype=np.uint8))
+    roomy = encode_jpeg(noisy, max_side=1000, max_bytes=10 ** 7)
+    with Image.open(io.BytesIO(roomy)) as img:
+        assert max(img.size) == 1000
+    tight = encode_jpeg(noisy, max_side=1000, max_bytes=200 * 1024)
+    assert len(tight) <= 200 * 1024 < len(roomy)  # quality is lowered until it fits
+    floor = encode_jpeg(noisy, max_side=1000, max_bytes=1024)
+    assert len(floor) > 1024  # never below min_quality, even if the budget is missed
+
+
+def test_sniff_mime():
+    assert sniff_mime(b"\x89PNG\r\n") == "image/png"
+    assert sniff_mime(b"RIFF....WEBP") == "image/webp"
+    assert sniff_mime(b"unknown") == "image/jpeg"
+
+
+def test_clean_ocr_text_replaces_the_image():
+    prepared = prepare_report(png_bytes(page()), ocr=FakeOCR(["glucose"] * 30, 90.0))
+    assert prepared.mode == "text" and prepared.image is None
+    assert prepared.ocr_words == 30 and prepared.upload_bytes == len(prepared.text.encode())
+    assert {"decode", "crop", "deskew", "ocr"} <= set(prepared.timings)
+
+
+@pytest.mark.parametrize("ocr", [FakeOCR(["glucose"] * 30, 40.0), FakeOCR(["glucose"] * 3, 95.0), False])
+def test_unreliable_or_missing_ocr_sends_the_cleaned_image(ocr):
+    data = png_bytes(page(size=(2400, 3000), box=(300, 450, 2100, 2550)))
+    prepared = prepare_report(data, ocr=ocr)
+    assert prepared.mode == "image" and prepared.fallback is None
+    assert prepared.image.startswith(b"\xff\xd8") and prepared.image_mime == "image/jpeg"
+    with Image.open(io.BytesIO(prepared.image)) as img:
+        assert max(img.size) <= vision_prep.WORK_SIDE
+
+
+def test_unreadable_upload_is_sent_unchanged():
+    data = b"\x89PNG\r\n\x1a\n not really a png"
+    prepared = prepare_report(data, ocr=False)
+    assert prepared.image == data and prepared.text is None
+    assert prepared.image_mime == "image/png"
+    assert prepared.fallback
+
+
+def test_blank_page_is_prepared():
+    prepared = prepare_report(png_bytes(Image.new("RGB", (300, 400), "white")), ocr=False)
+    assert prepared.fallback is None
+    assert prepared.image.startswith(b"\xff\xd8")
@@ -0,0 +1,234 @@
+# vision_prep.py
+# Local clean-up of uploaded report photos before anything is sent to Gemini.
+#
+# Stages: decode (EXIF orientation, grayscale) -> crop to the content region
+# -> deskew (then trim again) -> optional OCR. When the OCR text reads cleanly only that
+# text is sent for analysis; otherwise the cleaned grayscale image is.
+#
+# OCR needs pytesseract and the tesseract binary. Without them (or with
+# NUTRIX_OCR=off) every upload takes the image path.
+import io
+import os
+import threading
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+WORK_SIDE = 1600          # px; the cropped page is downscaled to this
+PREVIEW_SIDE = 800        # px; the content region is located on a small copy
+SKEW_SIDE = 600           # px; skew is estimated on a small copy
+MAX_SKEW = 8.0            # degrees searched either way
+SKEW_STEP = 0.25
+MIN_SKEW = 0.3            # smaller angles aren't worth a resample
+CROP_MARGIN = 0.02        # fraction of the page kept around the content
+MIN_OCR_WORDS = 25
+MIN_OCR_CONFIDENCE = 70.0  # mean tesseract word confidence, 0-100
+OCR_ENABLED = os.getenv("NUTRIX_OCR", "auto") not in ("0", "off", "false")
+
+
+class PreparedReport:
+    """Result of :func:`prepare_report`: OCR ``text`` or JPEG ``image`` bytes, plus stage timings in ms."""
+
+    def __init__(self, original_bytes):
+        self.original_bytes = original_bytes
+        self.text = None
+        self.image = None
+        self.ocr_words = 0
+        self.ocr_confidence = None
+        self.skew = 0.0
+        self.image_mime = "image/jpeg"
+        self.fallback = None  # why the original bytes were sent as-is, if they were
+        self.timings = {}
+
+    @property
+    def mode(self):
+        return "text" if self.text is not None else "image"
+
+    @property
+    def upload_bytes(self):
+        return len(self.text.encode("utf-8")) if self.text is not None else len(self.image or b"")
+
+
+class _Stage:
+    def __init__(self, timings, name):
+        self.timings = timings
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.timings[self.name] = round((time.perf_counter() - self.start) * 1000, 1)
+
+
+# -------------------------
+# Image stages
+# -------------------------
+def otsu_threshold(gray):
+    """Gray level that best separates ink from paper (Otsu's method on the histogram)."""
+    hist = np.bincount(np.asarray(gray, dtype=np.uint8).ravel(), minlength=256).astype(np.float64)
+    if np.count_nonzero(hist) < 2:
+        return 128  # a single colour (blank page, tiny image): nothing to separate
+    levels = np.arange(256)
+    weight_bg = np.cumsum(hist)
+    weight_fg = weight_bg[-1] - weight_bg
+    mass = np.cumsum(hist * levels)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = mass / weight_bg
+        mean_fg = (mass[-1] - mass) / weight_fg
+        between = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    return int(np.nanargmax(between))
+
+
+def estimate_skew(gray, max_angle=MAX_SKEW, step=SKEW_STEP, max_points=20000):
+    """Rotation (degrees, counter-clockwise positive) that levels the text lines.
+
+    Dark pixels are projected onto the vertical axis at each candidate angle;
+    text lines line up, and the profile is sharpest, at the page's skew.
+    """
+    small = gray.copy()
+    small.thumbnail((SKEW_SIDE, SKEW_SIDE))
+    arr = np.asarray(small)
+    ys, xs = np.nonzero(arr < otsu_threshold(arr))
+    if len(ys) < 50:
+        return 0.0
+    if len(ys) > max_points:
+        keep = np.random.default_rng(0).choice(len(ys), max_points, replace=False)
+        ys, xs = ys[keep], xs[keep]
+    angles = np.arange(-max_angle, max_angle + step / 2, step)
+    # Row of each ink pixel after rotating the page by each angle: (angles, points)
+    rows = np.rint(ys[None, :] - xs[None, :] * np.tan(np.radians(angles))[:, None]).astype(np.int64)
+    rows -= rows.min()
+    width = int(rows.max()) + 1
+    flat = (rows + np.arange(len(angles))[:, None] * width).ravel()
+    profiles = np.bincount(flat, minlength=len(angles) * width).reshape(len(angles), width)
+    sharpness = (profiles.astype(np.float64) ** 2).sum(axis=1)
+    return float(angles[int(np.argmax(sharpness))])
+
+
+def content_box(gray, margin=CROP_MARGIN, min_ink=0.002, preview_side=PREVIEW_SIDE):
+    """(left, top, right, bottom) around the rows and columns that contain ink.
+
+    Found on a copy at most ``preview_side`` px, then scaled back to ``gray``.
+    """
+    w, h = gray.size
+    small = gray.reduce(max(1, -(-max(w, h) // preview_side)))  # box filter; fast and good enough here
+    arr = np.asarray(small)
+    ink = arr < otsu_threshold(arr)
+    rows = np.flatnonzero(ink.mean(axis=1) > min_ink)
+    cols = np.flatnonzero(ink.mean(axis=0) > min_ink)
+    if not len(rows) or not len(cols):
+        return 0, 0, w, h
+    sh, sw = arr.shape
+    sx, sy = w / sw, h / sh
+    pad_x, pad_y = w * margin, h * margin
+    return (max(0, int(cols[0] * sx - pad_x)), max(0, int(rows[0] * sy - pad_y)),
+            min(w, int((cols[-1] + 1) * sx + pad_x)), min(h, int((rows[-1] + 1) * sy + pad_y)))
+
+
+def encode_jpeg(img, max_side=1600, max_bytes=800 * 1024, quality=85, min_quality=50):
+    """Downscale and recompress to a JPEG of at most ``max_side`` px / ``max_bytes``."""
+    img = img.copy()
+    img.thumbnail((max_side, max_side), Image.LANCZOS)
+    while True:
+        buf = io.BytesIO()
+        img.save(buf, format="JPEG", quality=quality, optimize=True)
+        if buf.tell() <= max_bytes or quality <= min_quality:
+            return buf.getvalue()
+        quality -= 10
+
+
+# -------------------------
+# OCR (optional)
+# -------------------------
+_ocr_lock = threading.Lock()
+_tesseract = None
+
+
+def load_ocr():
+    """pytesseract if it and the tesseract binary are installed, else None."""
+    global _tesseract
+    if not OCR_ENABLED:
+        return None
+    if _tesseract is None:
+        with _ocr_lock:
+            if _tesseract is None:
+                try:
+                    import pytesseract
+                    pytesseract.get_tesseract_version()
+                    _tesseract = pytesseract
+                except Exception:
+                    _tesseract = False
+    return _tesseract or None
+
+
+def ocr_words(gray, engine):
+    """Return (text, word count, mean confidence) from tesseract's word boxes."""
+    data = engine.image_to_data(gray, output_type=engine.Output.DICT)
+    lines, words, confs = {}, 0, []
+    for i, word in enumerate(data["text"]):
+        conf = float(data["conf"][i])
+        if not word.strip() or conf < 0:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        lines.setdefault(key, []).append(word)
+        words += 1
+        confs.append(conf)
+    text = "\n".join(" ".join(ws) for ws in lines.values())
+    return text, words, (sum(confs) / len(confs) if confs else 0.0)
+
+
+# -------------------------
+# Pipeline
+# -------------------------
+_MAGIC = ((b"\x89PNG", "image/png"), (b"\xff\xd8", "image/jpeg"), (b"GIF8", "image/gif"),
+          (b"RIFF", "image/webp"))
+
+
+def sniff_mime(data):
+    return next((mime for magic, mime in _MAGIC if data.startswith(magic)), "image/jpeg")
+
+
+def prepare_report(data, ocr=None):
+    """Run every stage on an uploaded image; ``ocr`` overrides the tesseract engine (False disables OCR).
+
+    If any stage fails (unreadable or unusual image), the original bytes are sent unchanged.
+    """
+    prepared = PreparedReport(len(data))
+    try:
+        return _prepare(prepared, data, ocr)
+    except Exception as e:
+        prepared.text = None
+        prepared.image = data
+        prepared.image_mime = sniff_mime(data)
+        prepared.fallback = f"{type(e).__name__}: {e}"
+        return prepared
+
+
+def _prepare(prepared, data, ocr):
+    timings = prepared.timings
+    with _Stage(timings, "decode"), Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (WORK_SIDE, WORK_SIDE))  # JPEG: decode to grayscale, at a smaller scale if possible
+        img = ImageOps.exif_transpose(img)  # phone photos are often stored rotated
+        gray = ImageOps.grayscale(img.convert("RGB") if img.mode in ("P", "RGBA", "LA", "PA") else img)
+    # Crop at full resolution, then downscale: the page keeps as many pixels as possible,
+    # and deskewing (cost grows with area) runs on the smaller image
+    with _Stage(timings, "crop"):
+        gray = gray.crop(content_box(gray))
+        gray.thumbnail((WORK_SIDE, WORK_SIDE), Image.LANCZOS, reducing_gap=2.0)
+    with _Stage(timings, "deskew"):
+        prepared.skew = estimate_skew(gray)
+        if abs(prepared.skew) >= MIN_SKEW:
+            gray = gray.rotate(prepared.skew, resample=Image.BILINEAR, expand=True, fillcolor=255)
+            gray = gray.crop(content_box(gray))
+    engine = load_ocr() if ocr is None else (ocr or None)
+    if engine is not None:
+        with _Stage(timings, "ocr"):
+            text, prepared.ocr_words, prepared.ocr_confidence = ocr_words(gray, engine)
+        if prepared.ocr_words >= MIN_OCR_WORDS and prepared.ocr_confidence >= MIN_OCR_CONFIDENCE:
+            prepared.text = text
+            return prepared
+    with _Stage(timings, "encode"):
+        prepared.image = encode_jpeg(gray)
+    return prepared